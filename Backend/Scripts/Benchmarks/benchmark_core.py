@@ -0,0 +1,121 @@
+"""
+Benchmark Core Module
+Timing, latency percentiles, peak RSS and baseline comparison for the suites
+"""
+
+import sys
+import time
+import platform
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# A case regresses when p50 or p95 grows by more than this fraction...
+DEFAULT_THRESHOLD = 0.10
+# ...and by more than this many ms, so sub-millisecond jitter is not flagged
+NOISE_FLOOR_MS = 0.05
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of this process's resident memory in MB"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 3, items: int = 1,
+            setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Time `fn` over `iterations` runs; `setup` runs untimed before each call.
+
+    `items` is the work done per call (frames, faces, words) and only affects
+    the reported throughput.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    samples = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+
+    samples_ms = samples * 1000
+    total = float(samples.sum())
+    return {
+        "iterations": iterations,
+        "items_per_call": items,
+        "throughput_per_s": round(iterations * items / total, 2) if total else None,
+        "mean_ms": round(float(samples_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples_ms, 99)), 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_metadata() -> Dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Cases whose p50 or p95 latency regressed against the baseline results"""
+    regressions = []
+    for case, current in results.items():
+        previous = baseline.get(case)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            if after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS:
+                regressions.append({
+                    "case": case,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": round(after / before - 1, 3),
+                })
+    return regressions
+
+
+def format_results(results: Dict[str, Dict], regressions: List[Dict] = ()) -> str:
+    flagged = {r["case"] for r in regressions}
+    lines = [f"{'case':<52}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}{'RSS MB':>9}"]
+    for case, stats in results.items():
+        throughput = stats["throughput_per_s"]
+        lines.append(f"{case:<52}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                     f"{throughput if throughput is not None else float('nan'):>12.1f}"
+                     f"{stats['peak_rss_mb'] or 0:>9.1f}{'  REGRESSION' if case in flagged else ''}")
+    for r in regressions:
+        lines.append(f"! {r['case']} {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ms "
+                     f"({r['change']:+.1%})")
+    return "\n".join(lines)
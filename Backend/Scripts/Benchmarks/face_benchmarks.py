@@ -0,0 +1,106 @@
+"""
+Face Benchmarks Module
+Stage-by-stage timings of the emotion analysis hot path on synthetic frames
+
+Frames are a blurred-noise 640x480 background with 0, 1 or 4 copies of
+fixtures/face.jpg (a grayscale crop of the public-domain NASA "astronaut"
+photo that ships with scikit-image), so the Haar cascade finds exactly that
+many faces and every stage does realistic work without a camera.
+"""
+
+import os
+import sys
+import base64
+import contextlib
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from benchmark_core import measure
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "Face"))
+
+from emotion_analysis import EmotionAnalyzerAPI  # noqa: E402
+from frame_protocol import decode_gray  # noqa: E402
+from face_tracker import detect_faces  # noqa: E402
+
+FACE_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "face.jpg")
+FACE_COUNTS = (0, 1, 4)
+FRAME_SIZE = (640, 480)
+FACE_SIDE = 150
+
+
+def synthetic_frame(face_count: int, seed: int = 0) -> np.ndarray:
+    """Grayscale frame with `face_count` (0, 1 or up to 4) pasted faces"""
+    rng = np.random.default_rng(seed)
+    width, height = FRAME_SIZE
+    frame = cv2.GaussianBlur(rng.integers(60, 200, (height, width), dtype=np.uint8), (0, 0), 6)
+    if face_count == 0:
+        return frame
+
+    face = cv2.resize(cv2.imread(FACE_FIXTURE, cv2.IMREAD_GRAYSCALE), (FACE_SIDE, FACE_SIDE))
+    if face_count == 1:
+        spots = [((width - FACE_SIDE) // 2, (height - FACE_SIDE) // 2)]
+    else:
+        spots = [(60, 40), (width - 60 - FACE_SIDE, 40),
+                 (60, height - 40 - FACE_SIDE), (width - 60 - FACE_SIDE, height - 40 - FACE_SIDE)]
+    for x, y in spots[:face_count]:
+        frame[y:y + FACE_SIDE, x:x + FACE_SIDE] = face
+    return frame
+
+
+def encode_frame(gray: np.ndarray) -> bytes:
+    """JPEG-encode a frame the way the browser sends webcam snapshots"""
+    ok, jpeg = cv2.imencode(".jpg", cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 80])
+    if not ok:
+        raise RuntimeError("Could not encode synthetic frame")
+    return jpeg.tobytes()
+
+
+def run_face_benchmarks(iterations: int = 50, backend: str = "keras",
+                        analyzer: Optional[EmotionAnalyzerAPI] = None) -> Dict[str, Dict]:
+    """Benchmark every stage of analyze_frame for frames with 0, 1 and 4 faces"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+        analyzer = analyzer or EmotionAnalyzerAPI(backend=backend)
+
+    results = {}
+    for face_count in FACE_COUNTS:
+        gray = synthetic_frame(face_count)
+        jpeg = encode_frame(gray)
+        data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+        faces = detect_faces(analyzer.face_detector, gray)
+        if len(faces) != face_count:
+            print(f"Warning: expected {face_count} faces, detector found {len(faces)}", file=sys.stderr)
+        crops = [gray[y:y + h, x:x + w] for (x, y, w, h) in faces]
+        label = f"{face_count}_faces"
+
+        results[f"face.decode_data_url.{label}"] = measure(lambda: analyzer.decode_frame(data_url), iterations)
+        results[f"face.decode_binary.{label}"] = measure(lambda: decode_gray(jpeg), iterations)
+        results[f"face.detect.{label}"] = measure(lambda: detect_faces(analyzer.face_detector, gray), iterations)
+
+        if crops:
+            def fill_batch():
+                for slot, crop in enumerate(crops):
+                    analyzer._fill_batch_slot(slot, crop)
+
+            def preprocess_each():
+                for crop in crops:
+                    analyzer.preprocess_face(crop)
+
+            batch = analyzer.batch_buffer[:len(crops)]
+            fill_batch()
+            results[f"face.preprocess_face.{label}"] = measure(preprocess_each, iterations, items=len(crops))
+            results[f"face.fill_batch.{label}"] = measure(fill_batch, iterations, items=len(crops))
+            results[f"face.inference.{label}"] = measure(
+                lambda: analyzer.emotion_classifier.predict(batch), iterations, items=len(crops))
+
+        # End to end, including report bookkeeping; per-face log lines go to /dev/null
+        session_id = f"benchmark-{label}"
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            results[f"face.analyze_frame.{label}"] = measure(
+                lambda: analyzer.analyze_frame(data_url, session_id), iterations)
+        analyzer.sessions.pop(session_id, None)
+
+    return results
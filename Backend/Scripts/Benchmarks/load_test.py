@@ -0,0 +1,681 @@
+"""
+Load Test Module
+Drives the face and text analysis workers with many concurrent simulated sessions
+
+Usage:
+    python load_test.py face --sessions 8 --rate 5 --duration 60 --ramp-up 10
+    python load_test.py face --frames recording.mp4 --worker-args="--workers 2 --max-batch 16"
+    python load_test.py text --sessions 20 --rate 0.5 --mode incremental --report load.json
+    python load_test.py face --url http://127.0.0.1:8765 --pid 12345
+
+By default the real entry point (Face/emotion_analysis.py or Text/text_speed.py
+--worker) is spawned and driven over its stdin/stdout protocol, as the Node
+backend drives it; with --url the analysis_server.py HTTP/WebSocket API is used
+instead. Sessions start evenly over --ramp-up seconds and each sends at --rate
+requests per second whether or not earlier requests were answered (open loop),
+so an overloaded worker shows up as growing latency, dropped frames and
+timeouts rather than as a politely slower client.
+
+The report holds throughput, latency percentiles, error/drop/timeout rates and
+a timeline (one row per --sample-interval) with the worker's CPU and RSS, read
+from /proc (or psutil where available) for the worker and its child processes.
+Everything runs locally; --max-error-rate / --max-p95-ms turn it into a
+pass/fail regression check.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional
+
+from startup_report import TARGETS
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+FACE_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "face.jpg")
+PERCENTILES = (50, 90, 95, 99)
+
+# Sentences of mixed sentiment; typing texts are random runs of them
+TEXT_SENTENCES = [
+    "I felt anxious before the exam this morning.",
+    "The walk in the park really helped me calm down.",
+    "Honestly I am exhausted and nothing seems to go right.",
+    "My friends surprised me with dinner and I loved it!",
+    "Work was okay, nothing special happened today.",
+    "I can't sleep because I keep worrying about money.",
+    "Feeling grateful for my family :)",
+    "The deadline is stressing me out but I will manage.",
+    "I am so happy with how the project turned out!!",
+    "Sometimes I feel lonely even when people are around.",
+    "Today was not bad at all, actually pretty good.",
+    "I'm frustrated that the meeting ran late again.",
+    "Meditation in the evening makes me feel peaceful.",
+    "Everything feels overwhelming lately and I'm tired.",
+]
+
+
+# -------------------------------
+# Request sources
+# -------------------------------
+def typing_texts(count: int, seed: int = 0) -> List[str]:
+    """Varied typing-test texts of 1-6 sentences"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(TEXT_SENTENCES) for _ in range(rng.randint(1, 6))) for _ in range(count)]
+
+
+def _data_url(image) -> str:
+    import cv2
+    ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    if not ok:
+        raise ValueError("Could not encode frame as JPEG")
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii")
+
+
+def synthetic_frames(count: int = 24, size=(640, 480), seed: int = 0) -> List[str]:
+    """Webcam-like frames: the fixture face at drifting positions, lighting and sensor noise"""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    face = cv2.imread(FACE_FIXTURE, cv2.IMREAD_GRAYSCALE)
+    width, height = size
+    side = min(height // 2, face.shape[0] * 2)
+    face = cv2.resize(face, (side, side))
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width), 90, dtype=np.float32)
+        x = int((width - side) / 2 + 40 * np.sin(i / 4))
+        y = int((height - side) / 2 + 20 * np.cos(i / 5))
+        frame[y:y + side, x:x + side] = face
+        frame = frame * rng.uniform(0.85, 1.15) + rng.normal(0, 4, frame.shape)
+        frames.append(_data_url(cv2.cvtColor(np.clip(frame, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)))
+    return frames
+
+
+def recorded_frames(path: str, limit: int = 120) -> List[str]:
+    """Frames from a video file or the images in a directory, spread over the whole recording"""
+    import cv2
+    images = []
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path)
+                       if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp", ".webp")))
+        step = max(1, len(names) // limit)
+        for name in names[::step][:limit]:
+            image = cv2.imread(os.path.join(path, name))
+            if image is not None:
+                images.append(image)
+    else:
+        capture = cv2.VideoCapture(path)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        step = max(1, total // limit) if total else 1
+        index = 0
+        while len(images) < limit:
+            ok = capture.grab()
+            if not ok:
+                break
+            if index % step == 0:
+                ok, image = capture.retrieve()
+                if ok:
+                    images.append(image)
+            index += 1
+        capture.release()
+    if not images:
+        raise ValueError(f"No frames could be read from {path}")
+    return [_data_url(image) for image in images]
+
+
+def face_payloads(session_id: str, frames: List[str], offset: int) -> Iterator[Dict]:
+    i = offset
+    while True:
+        yield {"type": "frame", "session_id": session_id, "frame": frames[i % len(frames)]}
+        i += 1
+
+
+def text_payloads(session_id: str, texts: List[str], offset: int, incremental: bool,
+                  words_per_update: int = 3) -> Iterator[Dict]:
+    """Whole-text analyze requests, or incremental typing sessions fed a few words at a time"""
+    i = offset
+    typing_round = 0
+    while True:
+        text = texts[i % len(texts)]
+        i += 1
+        if not incremental:
+            yield {"op": "analyze", "text": text, "duration": max(5, len(text.split()) * 1.5)}
+            continue
+        typing_id = f"{session_id}-{typing_round}"
+        typing_round += 1
+        words = text.split(" ")
+        typed = 0
+        for start in range(0, len(words), words_per_update):
+            chunk = " ".join(words[start:start + words_per_update])
+            insert = chunk if start == 0 else " " + chunk
+            yield {"op": "session_update", "session_id": typing_id, "position": typed, "insert": insert,
+                   "timestamp": time.time()}
+            typed += len(insert)
+        yield {"op": "session_finish", "session_id": typing_id}
+
+
+# -------------------------------
+# Worker CPU / RSS
+# -------------------------------
+class ResourceSampler:
+    """CPU % and RSS of a process and its descendants, from /proc or psutil"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks_per_second = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.use_proc = os.path.isdir(f"/proc/{pid}")
+        self.last_cpu: Dict[int, float] = {}
+        self.last_time = None
+
+    def _proc_tree(self) -> Dict[int, Dict]:
+        """{pid: {"cpu": seconds, "rss": bytes}} for the process and its descendants"""
+        stats = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                stats[int(entry)] = fields
+            except (OSError, IndexError):
+                continue
+        children = defaultdict(list)
+        for pid, fields in stats.items():
+            children[int(fields[1])].append(pid)
+        tree, todo = {}, [self.pid]
+        while todo:
+            pid = todo.pop()
+            if pid not in stats:
+                continue
+            fields = stats[pid]
+            tree[pid] = {"cpu": (int(fields[11]) + int(fields[12])) / self.ticks_per_second,
+                         "rss": int(fields[21]) * self.page_size}
+            todo.extend(children[pid])
+        return tree
+
+    def _psutil_tree(self) -> Dict[int, Dict]:
+        import psutil
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return {}
+        tree = {}
+        for process in processes:
+            try:
+                times = process.cpu_times()
+                tree[process.pid] = {"cpu": times.user + times.system, "rss": process.memory_info().rss}
+            except psutil.Error:
+                continue
+        return tree
+
+    def sample(self) -> Optional[Dict]:
+        try:
+            tree = self._proc_tree() if self.use_proc else self._psutil_tree()
+        except ImportError:
+            return None
+        if not tree:
+            return None
+        now = time.monotonic()
+        # Only processes seen in both samples count, so exiting children don't go negative
+        cpu_delta = sum(info["cpu"] - self.last_cpu[pid] for pid, info in tree.items() if pid in self.last_cpu)
+        sample = {"rss_mb": round(sum(info["rss"] for info in tree.values()) / (1024 * 1024), 1),
+                  "processes": len(tree)}
+        if self.last_time is not None:
+            sample["cpu_percent"] = round(max(0.0, cpu_delta) / (now - self.last_time) * 100, 1)
+        self.last_cpu = {pid: info["cpu"] for pid, info in tree.items()}
+        self.last_time = now
+        return sample
+
+
+# -------------------------------
+# Transports
+# -------------------------------
+class StdioWorker:
+    """Spawns the real entry point and matches its stdout lines to requests"""
+
+    def __init__(self, target: str, extra_args: List[str]):
+        self.target = target
+        self.script, args = TARGETS[target]
+        self.command = [sys.executable, self.script] + args + extra_args
+        self.proc = None
+        self.ready: Dict = {}
+        self.pending_ids: Dict[str, asyncio.Future] = {}
+        self.pending_frames: Dict[str, deque] = defaultdict(deque)
+        self.dropped_seen: Dict[str, int] = defaultdict(int)
+        self.uncorrelated = 0
+        self.stderr_tail: deque = deque(maxlen=20)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.proc.pid if self.proc else None
+
+    async def start(self, timeout: float = 300.0) -> Dict:
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.command, cwd=os.path.dirname(self.script), env=env, limit=16 * 1024 * 1024,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        asyncio.get_running_loop().create_task(self._drain_stderr())
+        while True:
+            line = await asyncio.wait_for(self.proc.stdout.readline(), timeout)
+            if not line:
+                raise RuntimeError(f"{self.target} worker exited before its readiness handshake:\n"
+                                   + "".join(self.stderr_tail))
+            message = json.loads(line)
+            if message.get("type") == "ready":
+                self.ready = message
+                break
+        asyncio.get_running_loop().create_task(self._read_replies())
+        return message
+
+    async def _drain_stderr(self) -> None:
+        async for line in self.proc.stderr:
+            self.stderr_tail.append(line.decode("utf-8", "replace"))
+
+    async def _read_replies(self) -> None:
+        async for line in self.proc.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                self.uncorrelated += 1
+                continue
+            if self.target == "text":
+                future = self.pending_ids.pop(reply.get("id"), None)
+                if future is None:
+                    self.uncorrelated += 1
+                elif not future.done():
+                    future.set_result(reply)
+            else:
+                self._resolve_frame(reply)
+        # Worker exited: everything still waiting fails
+        for future in list(self.pending_ids.values()) + [f for q in self.pending_frames.values() for f in q]:
+            if not future.done():
+                future.set_result({"success": False, "error": "worker exited"})
+
+    def _resolve_frame(self, reply: Dict) -> None:
+        """Frame results carry no request id: per session they answer frames in order, minus dropped ones"""
+        session_id = reply.get("session_id")
+        waiting = self.pending_frames.get(session_id)
+        if reply.get("type") in ("report", "closed", "evicted") or not waiting:
+            if reply.get("type") is None:
+                self.uncorrelated += 1
+            return
+        dropped = reply.get("dropped_frames", self.dropped_seen[session_id])
+        for _ in range(max(0, dropped - self.dropped_seen[session_id])):
+            if waiting:
+                self._settle(waiting.popleft(), {"dropped": True})
+        self.dropped_seen[session_id] = dropped
+        if waiting:
+            self._settle(waiting.popleft(), reply)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, reply: Dict) -> None:
+        # A request that already timed out has its future cancelled; its late reply is just discarded
+        if not future.done():
+            future.set_result(reply)
+
+    async def send(self, request_id: str, session_id: str, payload: Dict) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if self.target == "text":
+            self.pending_ids[request_id] = future
+        else:
+            self.pending_frames[session_id].append(future)
+        self.proc.stdin.write((json.dumps(dict(payload, id=request_id)) + "\n").encode("utf-8"))
+        await self.proc.stdin.drain()
+        return future
+
+    async def close(self, timeout: float = 30.0) -> None:
+        if self.proc is None or self.proc.returncode is not None:
+            return
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+class ServerClient:
+    """analysis_server.py: one WebSocket per face session, POST /text for text"""
+
+    def __init__(self, url: str, target: str):
+        self.url = url.rstrip("/")
+        self.target = target
+        self.http = None
+        self.sockets: Dict[str, object] = {}
+        self.pending_ids: Dict[str, asyncio.Future] = {}
+        self.uncorrelated = 0
+        self.ready: Dict = {}
+
+    async def start(self) -> Dict:
+        self.http = aiohttp.ClientSession()
+        async with self.http.get(f"{self.url}/health") as response:
+            self.ready = await response.json()
+        if not self.ready.get(self.target):
+            raise RuntimeError(f"{self.url} does not serve {self.target} analysis: {self.ready}")
+        return self.ready
+
+    async def _socket(self, session_id: str):
+        ws = self.sockets.get(session_id)
+        if ws is None:
+            ws = self.sockets[session_id] = await self.http.ws_connect(f"{self.url}/ws/face",
+                                                                       max_msg_size=16 * 1024 * 1024)
+            asyncio.get_running_loop().create_task(self._read_socket(ws))
+        return ws
+
+    async def _read_socket(self, ws) -> None:
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            reply = json.loads(message.data)
+            future = self.pending_ids.pop(reply.get("id"), None)
+            if future is None:
+                self.uncorrelated += 1
+            elif not future.done():
+                future.set_result(reply)
+
+    async def _post_text(self, payload: Dict) -> Dict:
+        try:
+            async with self.http.post(f"{self.url}/text", json=payload) as response:
+                return await response.json()
+        except (aiohttp.ClientError, ValueError) as e:
+            return {"success": False, "error": str(e)}
+
+    async def send(self, request_id: str, session_id: str, payload: Dict) -> asyncio.Future:
+        payload = dict(payload, id=request_id)
+        if self.target == "text":
+            payload.pop("op", None)
+            return asyncio.get_running_loop().create_task(self._post_text(payload))
+        future = asyncio.get_running_loop().create_future()
+        self.pending_ids[request_id] = future
+        await (await self._socket(session_id)).send_str(json.dumps(payload))
+        return future
+
+    async def close(self, timeout: float = 30.0) -> None:
+        for ws in self.sockets.values():
+            await ws.close()
+        if self.http is not None:
+            await self.http.close()
+
+
+# -------------------------------
+# Measurements
+# -------------------------------
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    values = sorted(latencies)
+    summary = {f"p{p}": round(percentile(values, p) * 1000, 1) if values else None for p in PERCENTILES}
+    summary["max"] = round(values[-1] * 1000, 1) if values else None
+    summary["mean"] = round(sum(values) / len(values) * 1000, 1) if values else None
+    return summary
+
+
+class LoadStats:
+    """Outcome counts and latencies, overall and per timeline interval"""
+
+    OUTCOMES = ("ok", "error", "dropped", "timeout")
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.totals = defaultdict(int)
+        self.latencies: List[float] = []
+        self.buckets: Dict[int, Dict] = defaultdict(lambda: {"sent": 0, "ok": 0, "error": 0, "dropped": 0,
+                                                             "timeout": 0, "latencies": []})
+        self.resources: Dict[int, Dict] = {}
+        self.active_sessions: Dict[int, int] = {}
+        self.errors = defaultdict(int)
+
+    def _bucket(self) -> Dict:
+        return self.buckets[int((time.perf_counter() - self.started) / self.interval)]
+
+    def sent(self) -> None:
+        self.totals["sent"] += 1
+        self._bucket()["sent"] += 1
+
+    def record(self, outcome: str, latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        self.totals[outcome] += 1
+        bucket = self._bucket()
+        bucket[outcome] += 1
+        if latency is not None:
+            self.latencies.append(latency)
+            bucket["latencies"].append(latency)
+        if error:
+            self.errors[error[:120]] += 1
+
+    def timeline(self) -> List[Dict]:
+        rows = []
+        for index in range(max(list(self.buckets) + list(self.resources), default=-1) + 1):
+            bucket = self.buckets[index]
+            latencies = sorted(bucket["latencies"])
+            row = {"t": round((index + 1) * self.interval, 1), "sessions": self.active_sessions.get(index, 0),
+                   "sent": bucket["sent"]}
+            row.update({outcome: bucket[outcome] for outcome in self.OUTCOMES})
+            row["throughput_per_second"] = round(bucket["ok"] / self.interval, 2)
+            row["p50_ms"] = round(percentile(latencies, 50) * 1000, 1) if latencies else None
+            row["p95_ms"] = round(percentile(latencies, 95) * 1000, 1) if latencies else None
+            row.update(self.resources.get(index, {}))
+            rows.append(row)
+        return rows
+
+
+async def await_reply(stats: LoadStats, future: asyncio.Future, sent_at: float, timeout: float) -> None:
+    try:
+        reply = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        stats.record("timeout")
+        return
+    latency = time.perf_counter() - sent_at
+    if reply.get("dropped"):
+        stats.record("dropped")
+    elif not reply.get("success", True):
+        stats.record("error", latency, reply.get("error", "unknown error"))
+    else:
+        stats.record("ok", latency)
+
+
+async def run_session(client, stats: LoadStats, session_id: str, payloads: Iterator[Dict], rate: float,
+                      start_at: float, stop_at: float, timeout: float, replies: List[asyncio.Task]) -> None:
+    """Open-loop sender: one request every 1/rate seconds from start_at until stop_at"""
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / rate
+    await asyncio.sleep(max(0.0, start_at - loop.time()))
+    next_at = start_at
+    sequence = 0
+    while loop.time() < stop_at:
+        sent_at = time.perf_counter()
+        try:
+            future = await client.send(f"{session_id}-{sequence}", session_id, next(payloads))
+        except (ConnectionError, RuntimeError) as e:
+            stats.sent()
+            stats.record("error", error=f"send failed: {e}")
+            break
+        stats.sent()
+        replies.append(loop.create_task(await_reply(stats, future, sent_at, timeout)))
+        sequence += 1
+        # Fixed schedule; if sending fell a whole interval behind, don't burst to catch up
+        next_at = max(next_at + interval, loop.time() - interval)
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+
+async def sample_resources(stats: LoadStats, sampler: Optional[ResourceSampler], session_starts: List[float],
+                           stop_at: float, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    if sampler is not None:
+        sampler.sample()  # CPU baseline
+    index = 0
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), stats.interval)
+        except asyncio.TimeoutError:
+            pass
+        now = loop.time()
+        stats.active_sessions[index] = sum(1 for start in session_starts if start <= now < stop_at)
+        sample = sampler.sample() if sampler is not None else None
+        if sample is not None:
+            stats.resources[index] = sample
+        index += 1
+
+
+async def run_load(args) -> Dict:
+    if args.url:
+        client = ServerClient(args.url, args.target)
+    else:
+        client = StdioWorker(args.target, args.worker_args.split())
+    print(f"Starting {args.target} {'server client' if args.url else 'worker'}...", file=sys.stderr)
+    ready = await client.start()
+    pid = args.pid or getattr(client, "pid", None)
+    sampler = ResourceSampler(pid) if pid else None
+
+    if args.target == "face":
+        frames = recorded_frames(args.frames) if args.frames else synthetic_frames()
+        sources = [face_payloads(f"load-{i}", frames, i * 7) for i in range(args.sessions)]
+    else:
+        texts = typing_texts(max(50, args.sessions * 4))
+        sources = [text_payloads(f"load-{i}", texts, i * 3, args.mode == "incremental")
+                   for i in range(args.sessions)]
+
+    stats = LoadStats(args.sample_interval)
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    stop_at = begin + args.duration
+    session_starts = [begin + (args.ramp_up * i / args.sessions if args.sessions else 0.0)
+                      for i in range(args.sessions)]
+    stop_sampling = asyncio.Event()
+    sampler_task = loop.create_task(sample_resources(stats, sampler, session_starts, stop_at, stop_sampling))
+    replies: List[asyncio.Task] = []
+    print(f"Running {args.sessions} sessions at {args.rate}/s for {args.duration:.0f}s "
+          f"(ramp-up {args.ramp_up:.0f}s)...", file=sys.stderr)
+    try:
+        await asyncio.gather(*(run_session(client, stats, f"load-{i}", sources[i], args.rate, session_starts[i],
+                                           stop_at, args.timeout, replies) for i in range(args.sessions)))
+        send_seconds = loop.time() - begin
+        await asyncio.gather(*replies)
+    finally:
+        stop_sampling.set()
+        await sampler_task
+        await client.close()
+
+    totals = {key: stats.totals[key] for key in ("sent",) + LoadStats.OUTCOMES}
+    answered = totals["sent"] or 1
+    samples = [row for row in stats.resources.values() if "cpu_percent" in row]
+    report = {
+        "target": args.target,
+        "transport": args.url or "stdio",
+        "config": {"sessions": args.sessions, "rate_per_session": args.rate, "duration": args.duration,
+                   "ramp_up": args.ramp_up, "timeout": args.timeout,
+                   "source": args.frames or ("synthetic" if args.target == "face" else args.mode),
+                   "worker_args": args.worker_args if not args.url else None},
+        "worker": ready,
+        "totals": totals,
+        "uncorrelated_replies": client.uncorrelated,
+        "throughput_per_second": round(totals["ok"] / send_seconds, 2) if send_seconds else None,
+        "offered_per_second": round(totals["sent"] / send_seconds, 2) if send_seconds else None,
+        "error_rate": round(totals["error"] / answered, 4),
+        "drop_rate": round(totals["dropped"] / answered, 4),
+        "timeout_rate": round(totals["timeout"] / answered, 4),
+        "latency_ms": latency_summary(stats.latencies),
+        "resources": {
+            "cpu_percent_mean": round(sum(s["cpu_percent"] for s in samples) / len(samples), 1) if samples else None,
+            "cpu_percent_max": max((s["cpu_percent"] for s in samples), default=None),
+            "rss_mb_max": max((s["rss_mb"] for s in stats.resources.values()), default=None),
+        },
+        "errors": dict(sorted(stats.errors.items(), key=lambda kv: -kv[1])[:10]),
+        "timeline": stats.timeline(),
+    }
+    return report
+
+
+def format_report(report: Dict) -> str:
+    totals, latency, resources = report["totals"], report["latency_ms"], report["resources"]
+    lines = [
+        f"{report['target']} load test via {report['transport']}: {report['config']['sessions']} sessions x "
+        f"{report['config']['rate_per_session']}/s for {report['config']['duration']:.0f}s",
+        f"  sent {totals['sent']}  ok {totals['ok']}  errors {totals['error']}  dropped {totals['dropped']}  "
+        f"timeouts {totals['timeout']}",
+        f"  throughput {report['throughput_per_second']}/s of {report['offered_per_second']}/s offered  "
+        f"error rate {report['error_rate']:.2%}  drop rate {report['drop_rate']:.2%}",
+        "  latency ms  " + "  ".join(f"{key} {value}" for key, value in latency.items()),
+        f"  worker cpu mean {resources['cpu_percent_mean']}%  max {resources['cpu_percent_max']}%  "
+        f"rss max {resources['rss_mb_max']} MB",
+        "",
+        f"  {'t':>6} {'sess':>5} {'sent':>6} {'ok':>6} {'err':>5} {'drop':>5} {'tmo':>5} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'cpu %':>7} {'rss MB':>8}",
+    ]
+    for row in report["timeline"]:
+        lines.append(f"  {row['t']:>6} {row['sessions']:>5} {row['sent']:>6} {row['ok']:>6} {row['error']:>5} "
+                     f"{row['dropped']:>5} {row['timeout']:>5} {str(row['p50_ms']):>9} {str(row['p95_ms']):>9} "
+                     f"{str(row.get('cpu_percent', '-')):>7} {str(row.get('rss_mb', '-')):>8}")
+    for error, count in report["errors"].items():
+        lines.append(f"  error x{count}: {error}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the face/text analysis workers")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--rate", type=float, help="requests (frames) per second per session "
+                                                   "(default 5 for face, 1 for text)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of sending")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which sessions start")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request counts as timed out")
+    parser.add_argument("--frames", help="video file or image directory to send instead of synthetic frames")
+    parser.add_argument("--mode", choices=("analyze", "incremental"), default="analyze",
+                        help="text: whole-text requests or incremental typing sessions")
+    parser.add_argument("--worker-args", default="", help="extra arguments for the spawned worker")
+    parser.add_argument("--url", help="drive analysis_server.py at this URL instead of spawning a worker")
+    parser.add_argument("--pid", type=int, help="process to sample CPU/RSS for (default: the spawned worker)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds per timeline row")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--max-error-rate", type=float, help="fail if errors + timeouts exceed this fraction")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if p95 latency exceeds this")
+    args = parser.parse_args()
+
+    if args.rate is None:
+        args.rate = 5.0 if args.target == "face" else 1.0
+    if args.rate <= 0 or args.sessions < 1:
+        parser.error("--rate and --sessions must be positive")
+    if args.url and aiohttp is None:
+        parser.error("--url needs aiohttp (pip install aiohttp)")
+    if args.url and args.target == "text" and args.mode == "incremental":
+        parser.error("analysis_server.py only serves whole-text analysis; drop --mode incremental")
+
+    report = asyncio.run(run_load(args))
+    print(format_report(report), file=sys.stderr)
+
+    failures = []
+    failed_rate = (report["totals"]["error"] + report["totals"]["timeout"]) / (report["totals"]["sent"] or 1)
+    if args.max_error_rate is not None and failed_rate > args.max_error_rate:
+        failures.append(f"error rate {failed_rate:.2%} > {args.max_error_rate:.2%}")
+    p95 = report["latency_ms"]["p95"]
+    if args.max_p95_ms is not None and (p95 is None or p95 > args.max_p95_ms):
+        failures.append(f"p95 latency {p95} ms > {args.max_p95_ms} ms")
+    report["passed"] = not failures
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
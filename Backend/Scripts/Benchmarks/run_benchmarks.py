@@ -0,0 +1,83 @@
+"""
+Benchmark Runner
+Offline microbenchmarks for the face and text hot paths, with baseline comparison
+
+Usage:
+    python run_benchmarks.py --output baseline.json
+    python run_benchmarks.py --suite face --backend onnx --baseline baseline.json
+    python run_benchmarks.py --baseline baseline.json --threshold 0.15
+
+Each suite runs in its own process so peak RSS is attributable to it. With
+--baseline, cases whose p50 or p95 latency grew by more than --threshold are
+listed as regressions and the exit code is 1.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from typing import Dict
+
+from benchmark_core import DEFAULT_THRESHOLD, compare, format_results, run_metadata
+
+SUITES = ("face", "text")
+
+
+def run_suite(suite: str, iterations: int, backend: str) -> Dict[str, Dict]:
+    if suite == "face":
+        from face_benchmarks import run_face_benchmarks
+        return run_face_benchmarks(iterations, backend)
+    from text_benchmarks import run_text_benchmarks
+    return run_text_benchmarks(iterations)
+
+
+def run_suite_subprocess(suite: str, iterations: int, backend: str) -> Dict[str, Dict]:
+    """Run one suite in a fresh interpreter and return its results"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, f"{suite}.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--suite", suite,
+                        "--iterations", str(iterations), "--backend", backend,
+                        "--output", output, "--quiet"], check=True)
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)["results"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks for the analysis hot paths")
+    parser.add_argument("--suite", choices=SUITES + ("all",), default="all")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per case (text scales down)")
+    parser.add_argument("--backend", default="keras", help="face inference backend")
+    parser.add_argument("--output", help="write results JSON here (usable later as --baseline)")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative p50/p95 increase counted as a regression")
+    parser.add_argument("--quiet", action="store_true", help="do not print the results table")
+    args = parser.parse_args()
+
+    if args.suite == "all":
+        results = {}
+        for suite in SUITES:
+            results.update(run_suite_subprocess(suite, args.iterations, args.backend))
+    else:
+        results = run_suite(args.suite, args.iterations, args.backend)
+
+    report = {"meta": {**run_metadata(), "suite": args.suite, "iterations": args.iterations,
+                       "backend": args.backend},
+              "results": results}
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        report["baseline"] = {"path": args.baseline, "meta": baseline.get("meta"),
+                              "threshold": args.threshold, "regressions": regressions}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not args.quiet:
+        print(format_results(results, regressions))
+    sys.exit(1 if regressions else 0)
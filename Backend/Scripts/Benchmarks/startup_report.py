@@ -0,0 +1,141 @@
+"""
+Startup Report Module
+Breaks down where a freshly spawned analysis worker spends its start-up time
+
+Usage:
+    python startup_report.py face [--backend onnx]
+    python startup_report.py text --json
+
+The worker is started with `python -X importtime`, so import cost is reported
+per top-level package (self time, so nothing is counted twice). Model load and
+warm-up come from the worker's own readiness handshake, and one probe request
+measures the time to the first result once the worker is ready.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "face": (os.path.join(SCRIPTS_DIR, "Face", "emotion_analysis.py"), []),
+    "text": (os.path.join(SCRIPTS_DIR, "Text", "text_speed.py"), ["--worker"]),
+}
+
+
+def probe_request(target: str) -> str:
+    """One representative request line for the target worker"""
+    if target == "text":
+        return json.dumps({"id": "probe", "text": "I felt anxious this morning but the walk helped.",
+                           "duration": 30})
+    import cv2
+    import numpy as np
+    ok, jpeg = cv2.imencode(".jpg", np.full((240, 320), 128, dtype=np.uint8))
+    frame = "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii")
+    return json.dumps({"type": "frame", "session_id": "probe", "frame": frame})
+
+
+def parse_importtime(lines: List[str]) -> Dict[str, float]:
+    """Sum `-X importtime` self times (ms) per top-level package"""
+    per_package = defaultdict(float)
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line.split(":", 1)[1].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us = int(fields[0])
+        except ValueError:
+            continue
+        per_package[fields[2].strip().split(".")[0]] += self_us / 1000.0
+    return dict(per_package)
+
+
+def measure_startup(target: str, extra_args: List[str], timeout: float = 300.0) -> Dict:
+    script, args = TARGETS[target]
+    command = [sys.executable, "-X", "importtime", script] + args + extra_args
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+
+    spawned = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=os.path.dirname(script), env=env, text=True,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_lines: List[str] = []
+    stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+    stderr_thread.start()
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+
+    try:
+        ready, ready_at = None, None
+        for line in proc.stdout:
+            message = json.loads(line)
+            if message.get("type") == "ready":
+                ready, ready_at = message, time.perf_counter()
+                break
+        if ready is None:
+            raise RuntimeError(f"{target} worker exited before its readiness handshake")
+
+        proc.stdin.write(probe_request(target) + "\n")
+        proc.stdin.flush()
+        first_line = proc.stdout.readline()
+        first_result_at = time.perf_counter()
+        if not first_line:
+            raise RuntimeError(f"{target} worker exited before answering the probe request")
+
+        proc.stdin.close()
+        proc.wait()
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        stderr_thread.join(timeout=5)
+
+    imports = parse_importtime(stderr_lines)
+    return {
+        "target": target,
+        "spawn_to_ready_ms": round((ready_at - spawned) * 1000, 1),
+        "ready_to_first_result_ms": round((first_result_at - ready_at) * 1000, 1),
+        "import_total_ms": round(sum(imports.values()), 1),
+        "imports_ms": {name: round(ms, 1) for name, ms in sorted(imports.items(), key=lambda kv: -kv[1])},
+        "stages_ms": ready.get("startup", {}),
+    }
+
+
+def format_report(report: Dict, top: int = 12) -> str:
+    lines = [
+        f"Startup report: {report['target']}",
+        f"  spawn -> ready          {report['spawn_to_ready_ms']:>10.1f} ms",
+        f"  ready -> first result   {report['ready_to_first_result_ms']:>10.1f} ms",
+        f"  imports (total)         {report['import_total_ms']:>10.1f} ms",
+    ]
+    imports: List[Tuple[str, float]] = list(report["imports_ms"].items())
+    for name, ms in imports[:top]:
+        lines.append(f"    {name:<22}{ms:>10.1f} ms")
+    if len(imports) > top:
+        rest = sum(ms for _, ms in imports[top:])
+        lines.append(f"    {'(' + str(len(imports) - top) + ' others)':<22}{rest:>10.1f} ms")
+    lines.append("  worker stages")
+    for stage, ms in report["stages_ms"].items():
+        lines.append(f"    {stage:<22}{ms:>10.1f} ms")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import and model-load cost of an analysis worker")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--backend", help="face inference backend (keras/direct/tflite/onnx)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    extra = ["--backend", args.backend] if args.backend and args.target == "face" else []
+    report = measure_startup(args.target, extra)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
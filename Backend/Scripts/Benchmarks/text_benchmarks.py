@@ -0,0 +1,84 @@
+"""
+Text Benchmarks Module
+Timings of keyword detection, sentiment and full typing analysis from 10 to 10,000 words,
+and of per-text vs vectorized batch sentiment
+"""
+
+import os
+import sys
+import random
+from typing import Dict, List
+
+from benchmark_core import measure
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "Text"))
+
+from text_speed import TypingSpeedAnalyzer  # noqa: E402
+
+WORD_COUNTS = (10, 100, 1000, 10000)
+BATCH_TEXTS = 1000
+
+SUBJECTS = ["I", "We", "My friend", "My family", "Everyone at work", "She", "He", "They"]
+VERBS = ["felt", "was", "seemed", "kept feeling", "have been", "got", "stayed", "became"]
+STATES = ["happy", "anxious", "tired", "calm", "stressed", "grateful", "lonely", "excited",
+          "overwhelmed", "hopeful", "restless", "content", "worried", "motivated", "sad", "fine"]
+FILLER = ["today", "this morning", "after the meeting", "at night", "during lunch", "all week",
+          "before the exam", "with friends", "at home", "on the bus", "again", "for a while",
+          "because of the deadline", "after a long walk", "without much sleep", "really", "very"]
+ENDINGS = [".", ".", ".", "!", "?"]
+
+
+def synthetic_text(word_count: int, seed: int = 0) -> str:
+    """Journal-like text of exactly `word_count` words with varied sentences"""
+    rng = random.Random(seed)
+    words: List[str] = []
+    sentences = []
+    while len(words) < word_count:
+        sentence = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(STATES)}"
+        for _ in range(rng.randint(1, 4)):
+            sentence += " " + rng.choice(FILLER if rng.random() < 0.7 else STATES)
+        sentence_words = sentence.split()[:word_count - len(words)]
+        words.extend(sentence_words)
+        sentences.append(" ".join(sentence_words) + rng.choice(ENDINGS))
+    return " ".join(sentences)
+
+
+def iterations_for(word_count: int, iterations: int) -> int:
+    """Fewer repetitions for the long texts so the suite stays in the minutes range"""
+    return max(5, min(iterations, iterations * 100 // word_count))
+
+
+def run_text_benchmarks(iterations: int = 50) -> Dict[str, Dict]:
+    """Benchmark the text analysis entry points across text lengths"""
+    analyzer = TypingSpeedAnalyzer()
+    text_analyzer = analyzer.text_analyzer
+    text_analyzer.warmup()
+
+    results = {}
+    for word_count in WORD_COUNTS:
+        text = synthetic_text(word_count)
+        runs = iterations_for(word_count, iterations)
+        label = f"{word_count}_words"
+        clear_cache = text_analyzer.sentiment_cache.clear
+
+        results[f"text.detect_wellness_keywords.{label}"] = measure(
+            lambda: text_analyzer.detect_wellness_keywords(text), runs, items=word_count)
+        # Cold: the text is scored; cached: a resubmitted text
+        results[f"text.analyze_sentiment.{label}"] = measure(
+            lambda: text_analyzer.analyze_sentiment(text), runs, items=word_count, setup=clear_cache)
+        results[f"text.analyze_sentiment_cached.{label}"] = measure(
+            lambda: text_analyzer.analyze_sentiment(text), runs, items=word_count)
+        results[f"text.run_analysis.{label}"] = measure(
+            lambda: analyzer.run_analysis(text, 60), runs, items=word_count, setup=clear_cache)
+
+    # Many short entries: one analyze_sentiment call each vs one vectorized batch
+    texts = [synthetic_text(50, seed) for seed in range(BATCH_TEXTS)]
+    runs = max(3, iterations // 10)
+    results[f"text.analyze_sentiment_loop.{BATCH_TEXTS}_texts"] = measure(
+        lambda: [text_analyzer.analyze_sentiment(text) for text in texts], runs, items=BATCH_TEXTS,
+        setup=clear_cache)
+    results[f"text.analyze_sentiment_batch.{BATCH_TEXTS}_texts"] = measure(
+        lambda: text_analyzer.analyze_sentiment_batch(texts), runs, items=BATCH_TEXTS)
+
+    return results
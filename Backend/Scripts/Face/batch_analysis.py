@@ -0,0 +1,254 @@
+"""
+Offline emotion analysis of a video file or a directory of images.
+
+  python batch_analysis.py recording.mp4 --stride 5 --jsonl frames.jsonl
+  python batch_analysis.py dataset/ --detect-threads 4 --report report.json
+
+A reader thread pulls frames from cv2.VideoCapture (frames skipped by
+--stride are only grabbed, never decoded) or lists the image files; detector
+threads convert to grayscale and run Haar detection, each with its own
+cascade since CascadeClassifier is not safe to share between threads. The
+main thread puts frames back in order and classifies their faces in batches
+of up to --max-batch frames through EmotionAnalyzerAPI.analyze_detected(), so
+the model sees large batches while OpenCV work overlaps on the other threads.
+
+The whole input is one session: the final report is generate_report() (plus
+throughput figures) and every analysed frame is one line of --jsonl.
+Detect-then-track is not used here because detection runs out of order.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+
+import cv2
+
+from inference_backends import BACKENDS
+from emotion_analysis import EmotionAnalyzerAPI
+from face_tracker import detect_faces
+from rate_limited_logging import configure_logging
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+# -------------------------------
+# Frame sources
+# -------------------------------
+def video_frames(path, stride=1):
+    """Yield (index, seconds into the video, BGR frame) for every stride-th frame"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    index = 0
+    try:
+        while True:
+            if index % stride:
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, round(index / fps, 3) if fps else None, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def image_files(directory, stride=1):
+    """Yield (index, None, path) for every stride-th image under directory, in path order"""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    for index, path in enumerate(sorted(paths)[::stride]):
+        yield index * stride, None, path
+
+
+def video_info(path):
+    capture = cv2.VideoCapture(path)
+    info = {"fps": capture.get(cv2.CAP_PROP_FPS) or 0.0,
+            "frames": int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)}
+    capture.release()
+    return info
+
+
+# -------------------------------
+# Detection pipeline
+# -------------------------------
+class DetectionPipeline:
+    """Reader thread -> detector threads -> detected frames in source order"""
+
+    def __init__(self, source, cascade_path, threads=2, queue_size=64):
+        self.source = source
+        self.cascade_path = cascade_path
+        self.threads = max(1, threads)
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self.detected = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self._read, daemon=True).start()
+        for _ in range(self.threads):
+            threading.Thread(target=self._detect, daemon=True).start()
+        return self
+
+    def _read(self):
+        try:
+            for sequence, item in enumerate(self.source):
+                self.tasks.put((sequence, item))
+        except Exception as e:
+            self.error = str(e)
+        for _ in range(self.threads):
+            self.tasks.put(None)
+
+    def _detect(self):
+        detector = cv2.CascadeClassifier(self.cascade_path)
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self.detected.put(None)
+                return
+            sequence, (index, seconds, frame) = task
+            record = {"sequence": sequence, "index": index, "seconds": seconds}
+            try:
+                if isinstance(frame, str):
+                    record["path"] = frame
+                    gray = cv2.imread(frame, cv2.IMREAD_GRAYSCALE)
+                    if gray is None:
+                        raise ValueError(f"Could not read image {frame}")
+                else:
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                started = time.perf_counter()
+                faces = detect_faces(detector, gray)
+                record["detect"] = time.perf_counter() - started
+                record["faces"] = faces
+                record["crops"] = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+            except Exception as e:
+                record["error"] = str(e)
+            self.detected.put(record)
+
+    def __iter__(self):
+        """Detected frames in source order"""
+        waiting = {}
+        expected = 0
+        finished = 0
+        while finished < self.threads:
+            record = self.detected.get()
+            if record is None:
+                finished += 1
+                continue
+            waiting[record["sequence"]] = record
+            while expected in waiting:
+                yield waiting.pop(expected)
+                expected += 1
+
+
+def analyze_batches(analyzer, detected, max_frames, session_id, jsonl=None):
+    """Classify detected frames in batches; writes one JSONL line per frame.
+
+    Returns (frames analysed, last video position in seconds or None).
+    """
+    batch = []
+    frames = 0
+    last_seconds = None
+
+    def flush():
+        results = analyzer.analyze_detected(batch, session_id)
+        for record, result in zip(batch, results):
+            if jsonl is not None:
+                line = {"frame_index": record["index"], "seconds": record["seconds"]}
+                if "path" in record:
+                    line["path"] = record["path"]
+                line["faces_detected"] = result.get("faces_detected", 0)
+                line["emotions"] = result.get("emotions", [])
+                if not result["success"]:
+                    line["error"] = result["error"]
+                jsonl.write(json.dumps(line) + "\n")
+        batch.clear()
+
+    for record in detected:
+        batch.append(record)
+        frames += 1
+        if record["seconds"] is not None:
+            last_seconds = record["seconds"]
+        if len(batch) >= max_frames:
+            flush()
+    if batch:
+        flush()
+    return frames, last_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emotion analysis of a video file or an image directory")
+    parser.add_argument("input", help="video file or directory of images")
+    parser.add_argument("--stride", type=int, default=1, help="analyse every N-th frame/image")
+    parser.add_argument("--detect-threads", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="threads decoding frames and running face detection")
+    parser.add_argument("--max-batch", type=int, default=64, help="frames classified per batch")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras")
+    parser.add_argument("--min-conf", type=float, default=0.36)
+    parser.add_argument("--jsonl", help="write one JSON line per analysed frame here ('-' for stdout)")
+    parser.add_argument("--report", help="write the final report here instead of stdout")
+    parser.add_argument("--archive-dir", help="also append the frames to a session archive")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    if args.stride < 1:
+        parser.error("--stride must be at least 1")
+    is_video = not os.path.isdir(args.input)
+    if is_video and not os.path.isfile(args.input):
+        parser.error(f"No such file or directory: {args.input}")
+
+    session_id = os.path.basename(os.path.normpath(args.input))
+    analyzer = EmotionAnalyzerAPI(min_conf=args.min_conf, max_batch_size=args.max_batch, backend=args.backend,
+                                  archive_dir=args.archive_dir)
+    source = video_frames(args.input, args.stride) if is_video else image_files(args.input, args.stride)
+    pipeline = DetectionPipeline(source, analyzer.cascade_path, args.detect_threads).start()
+
+    jsonl = None
+    if args.jsonl == "-":
+        jsonl = sys.stdout
+    elif args.jsonl:
+        jsonl = open(args.jsonl, "w", encoding="utf-8")
+
+    started = time.perf_counter()
+    try:
+        frames, last_seconds = analyze_batches(analyzer, pipeline, args.max_batch, session_id, jsonl)
+    except KeyboardInterrupt:
+        print("\n>>> Analysis interrupted by user <<<", file=sys.stderr)
+        frames, last_seconds = analyzer.get_session(session_id).frame_count, None
+    finally:
+        if jsonl is not None and jsonl is not sys.stdout:
+            jsonl.close()
+    elapsed = time.perf_counter() - started
+    if pipeline.error:
+        print(f"ERROR: {pipeline.error}", file=sys.stderr)
+
+    analyzer.print_terminal_report(is_final=True, session_id=session_id)
+    report = analyzer.generate_report(session_id)
+    report["batch"] = {
+        "input": args.input,
+        "stride": args.stride,
+        "frames_analyzed": frames,
+        "wall_seconds": round(elapsed, 2),
+        "frames_per_second": round(frames / elapsed, 1) if elapsed else None,
+    }
+    if is_video:
+        info = video_info(args.input)
+        media_seconds = (last_seconds or 0.0) + (args.stride / info["fps"] if info["fps"] else 0.0)
+        report["batch"]["video_fps"] = info["fps"]
+        report["batch"]["video_seconds_covered"] = round(media_seconds, 2)
+        report["batch"]["realtime_factor"] = round(media_seconds / elapsed, 1) if elapsed else None
+    analyzer.close_archive()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
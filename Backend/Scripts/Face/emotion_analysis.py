@@ -8,18 +8,24 @@ import base64
 from io import BytesIO
 from PIL import Image
 import json
+import math
 import time
+import queue
+import logging
+import argparse
+import threading
 
-try:
-    from tensorflow.keras.models import load_model
-    print("TensorFlow imported successfully", file=sys.stderr)
-except Exception:
-    try:
-        from keras.models import load_model
-        print("Keras imported successfully", file=sys.stderr)
-    except Exception as e:
-        print(f"Failed to import keras/tensorflow: {e}", file=sys.stderr)
-        exit(1)
+from inference_backends import BACKENDS, load_backend
+from frame_protocol import read_messages, decode_gray
+from emotion_history import EmotionHistory
+from face_tracker import FaceTracker, detect_faces
+from frame_gate import FrameGate
+from frame_queue import LatestFrameQueue
+from metrics import MetricsRegistry, start_metrics_server
+from rate_limited_logging import configure_logging
+from session_archive import SessionArchiveWriter
+
+logger = logging.getLogger("emotion_analysis")
 
 # -------------------------------
 # Emotion Labels
@@ -34,38 +40,235 @@ EMOTIONS = {
     6: {"emotion": "Neutral", "color": (108, 72, 200)},
 }
 
+EMOTION_NAMES = [EMOTIONS[i]["emotion"] for i in range(len(EMOTIONS))]
+
+DEFAULT_SESSION = "default"
+
+STAGES = ("decode", "color", "detect", "preprocess", "inference", "serialize")
+
+# -------------------------------
+# Worker metrics (Prometheus text format, see metrics.py)
+# -------------------------------
+class EmotionMetrics:
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.frames = r.counter("emotion_frames_total", "Frames analysed", ("result",))
+        self.faces = r.counter("emotion_faces_detected_total", "Faces detected")
+        self.emotions = r.counter("emotion_predictions_total", "Emotions above the confidence threshold",
+                                  ("emotion",))
+        self.sessions = r.gauge("emotion_active_sessions", "Sessions currently held in memory")
+        self.stage_seconds = r.histogram("emotion_stage_seconds", "Time per pipeline stage per frame", ("stage",))
+        self.frame_seconds = r.histogram("emotion_frame_seconds", "Decode-to-result time per frame")
+        self.queue_delay = r.histogram("emotion_queue_delay_seconds", "Time a frame waited before analysis")
+        self.batch_faces = r.histogram("emotion_batch_faces", "Faces per inference call",
+                                       buckets=(1, 2, 4, 8, 16, 32, 64))
+
+# -------------------------------
+# Per-session state
+# -------------------------------
+class EmotionSession:
+    def __init__(self, session_id, history_capacity=9000):
+        self.session_id = session_id
+        self.history = EmotionHistory(len(EMOTIONS), history_capacity)
+        self.frame_count = 0
+        self.start_time = time.time()
+        self.last_seen = time.monotonic()
+        self.tracker = None  # FaceTracker when detect-then-track is enabled
+        self.gate = None  # FrameGate when near-duplicate skipping is enabled
+        self.cached_faces = None  # (faces, predictions) of the last fully analysed frame, for reuse
+        self.user_id = None
+        self.archive_index = None  # row index in the on-disk archive segment, once registered
+
+    @property
+    def emotion_counter(self):
+        return Counter({EMOTION_NAMES[i]: int(n) for i, n in enumerate(self.history.counts) if n})
+
+    @property
+    def emotion_history(self):
+        return self.history.records(EMOTION_NAMES)
+
+    def record_frame(self, frame_number, face_count, detections):
+        self.history.add_frame(frame_number, face_count, detections)
+
+    @staticmethod
+    def _percentages(counts):
+        total = int(counts.sum())
+        if not total:
+            return {}
+        return {EMOTION_NAMES[i]: round(int(n) / total * 100, 2) for i, n in enumerate(counts) if n}
+
+    def generate_report(self):
+        """Generate a consolidated emotion analysis report"""
+        counts = self.history.counts
+        total_detections = self.history.total_detections
+        if not total_detections:
+            report = {
+                "session_id": self.session_id,
+                "total_frames": self.frame_count,
+                "total_faces_detected": 0,
+                "dominant_emotion": "No data",
+                "emotion_percentages": {},
+                "session_duration": time.time() - self.start_time,
+                "timestamp": datetime.now().isoformat()
+            }
+        else:
+            report = {
+                "session_id": self.session_id,
+                "total_frames": self.frame_count,
+                "total_faces_detected": total_detections,
+                "dominant_emotion": EMOTION_NAMES[int(np.argmax(counts))],
+                "emotion_percentages": self._percentages(counts),
+                "session_duration": round(time.time() - self.start_time, 2),
+                "timestamp": datetime.now().isoformat()
+            }
+        if self.gate is not None:
+            report["frames_reused"] = self.gate.stats["reused"]
+            report["reuse_rate"] = round(self.gate.skip_rate, 3)
+        return report
+
+    def window_report(self, seconds=30):
+        """Emotion distribution over the last `seconds`"""
+        counts = self.history.window_counts(seconds)
+        return {
+            "window_seconds": seconds,
+            "faces_detected": int(counts.sum()),
+            "dominant_emotion": EMOTION_NAMES[int(np.argmax(counts))] if counts.any() else "No data",
+            "emotion_percentages": self._percentages(counts)
+        }
+
+    def per_minute_report(self):
+        """Emotion distribution for each minute of the session still in history"""
+        return {str(minute): self._percentages(counts)
+                for minute, counts in self.history.per_minute_counts(self.start_time).items()}
+
 # -------------------------------
 # Emotion Analyzer Class
 # -------------------------------
 class EmotionAnalyzerAPI:
-    def __init__(self, model_path=None, cascade_path=None, min_conf=0.36):
+    def __init__(self, model_path=None, cascade_path=None, min_conf=0.36, max_batch_size=32, backend="keras",
+                 session_timeout=300.0, history_capacity=9000, detect_every=1, detect_scale=1.0,
+                 search_margin=0.4, stage_timings=False, metrics=None, archive_dir=None,
+                 dedup_threshold=0.0, dedup_max_reuse=30, dedup_count=True):
         self.min_conf = min_conf
-        self.emotion_counter = Counter()
-        self.emotion_history = []  # Store all emotion predictions with timestamps
-        self.frame_count = 0
-        self.start_time = time.time()
+        self.max_batch_size = max_batch_size
+        self.backend = backend
+        self.session_timeout = session_timeout
+        self.history_capacity = history_capacity
+        # Detect-then-track: full Haar detection every `detect_every` frames,
+        # ROI re-detection in between (1 / 1.0 keeps full detection on every frame)
+        self.detect_every = detect_every
+        self.detect_scale = detect_scale
+        self.search_margin = search_margin
+        # Near-duplicate skipping: frames that barely differ from the last analysed one
+        # reuse its faces/emotions (0 disables); dedup_count=False keeps them out of the counters
+        self.dedup_threshold = dedup_threshold
+        self.dedup_max_reuse = dedup_max_reuse
+        self.dedup_count = dedup_count
+        # Per-stage timings are measured when either consumer wants them
+        self.stage_timings = stage_timings
+        self.metrics = metrics
+        self.collect_timings = stage_timings or metrics is not None
+        # Every frame is also appended to the on-disk archive (one segment per process)
+        self.archive = SessionArchiveWriter(archive_dir) if archive_dir else None
+        self.sessions = {}  # One loaded model serves many isolated sessions
         self.target_w, self.target_h = 48, 48
         self.face_detector = None
         self.emotion_classifier = None
-        model_path = "D:\\Other_Projects\\Mental_Wellness_New\\Backend\\Scripts\\Face\\emotionModel.hdf5"
+        self.startup_timings = {}  # ms per startup stage, sent with the readiness handshake
+        model_path = model_path or "D:\\Other_Projects\\Mental_Wellness_New\\Backend\\Scripts\\Face\\emotionModel.hdf5"
         self.model_path = self._find_model_path(model_path)
         self.cascade_path = self._find_cascade_path(cascade_path)
 
         success, msg = self.load_models()
         if not success:
             raise Exception(msg)
+
+        # Preallocated inference tensor shared by every batch (N, H, W, 1)
+        self.batch_buffer = np.empty((self.max_batch_size, self.target_h, self.target_w, 1), dtype=np.float32)
+
+        # Warm up so the first real frame doesn't pay for graph tracing / allocation
+        warmup_start = time.perf_counter()
+        self.emotion_classifier.warmup(self.max_batch_size)
+        warmup_ms = (time.perf_counter() - warmup_start) * 1000
+        self.startup_timings["warmup_ms"] = round(warmup_ms, 1)
         
         print("=" * 60, file=sys.stderr)
         print("*** EMOTION ANALYSIS SYSTEM STARTED ***", file=sys.stderr)
         print("=" * 60, file=sys.stderr)
         print(f"Confidence Threshold: {self.min_conf}", file=sys.stderr)
+        print(f"Inference Backend: {self.backend} (warm-up {warmup_ms:.0f} ms)", file=sys.stderr)
         print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", file=sys.stderr)
         print("=" * 60, file=sys.stderr)
 
+    # Single-session compatibility: these read the default session
+    @property
+    def emotion_counter(self):
+        return self.get_session(DEFAULT_SESSION).emotion_counter
+
+    @property
+    def emotion_history(self):
+        return self.get_session(DEFAULT_SESSION).emotion_history
+
+    @property
+    def frame_count(self):
+        return self.get_session(DEFAULT_SESSION).frame_count
+
+    @property
+    def start_time(self):
+        return self.get_session(DEFAULT_SESSION).start_time
+
+    @property
+    def tracking_enabled(self):
+        return self.detect_every > 1 or self.detect_scale != 1.0
+
+    def get_session(self, session_id=DEFAULT_SESSION):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = EmotionSession(session_id, self.history_capacity)
+            if self.tracking_enabled:
+                session.tracker = FaceTracker(self.face_detector, self.detect_every,
+                                              self.search_margin, self.detect_scale)
+            if self.dedup_threshold > 0:
+                session.gate = FrameGate(self.dedup_threshold, self.dedup_max_reuse)
+            self.sessions[session_id] = session
+        return session
+
+    def set_user_id(self, session_id, user_id):
+        """Attach a user id to a session, also if its first frames were archived without one"""
+        session = self.get_session(session_id)
+        if session.user_id == user_id:
+            return
+        session.user_id = user_id
+        if self.archive is not None and session.archive_index is not None:
+            self.archive.update_session(session.archive_index, user_id)
+
+    def close_session(self, session_id):
+        """Drop a session and return its final report (None if unknown)"""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return None
+        if self.archive is not None:
+            self.archive.flush()
+        self.print_terminal_report(is_final=True, session=session)
+        return session.generate_report()
+
+    def evict_idle_sessions(self):
+        """Close sessions idle for longer than session_timeout; returns {session_id: final_report}"""
+        now = time.monotonic()
+        idle = [sid for sid, session in self.sessions.items()
+                if now - session.last_seen > self.session_timeout]
+        return {sid: self.close_session(sid) for sid in idle}
+
+    def close_archive(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
     def _find_model_path(self, provided_path):
         if provided_path and os.path.isfile(provided_path):
             return provided_path
-        possible_paths = ["emotionModel.hdf5"]
+        possible_paths = ["emotionModel.hdf5", os.path.join(os.path.dirname(os.path.abspath(__file__)), "emotionModel.hdf5")]
         for path in possible_paths:
             if os.path.isfile(path):
                 return path
@@ -78,9 +281,12 @@ class EmotionAnalyzerAPI:
 
     def load_models(self):
         try:
-            self.emotion_classifier = load_model(self.model_path, compile=False)
-            self.target_w, self.target_h = self.emotion_classifier.input_shape[1:3]
+            self.emotion_classifier = load_backend(self.backend, self.model_path)
+            self.startup_timings.update(self.emotion_classifier.load_timings)
+            self.target_w, self.target_h = self.emotion_classifier.input_shape
+            cascade_start = time.perf_counter()
             self.face_detector = cv2.CascadeClassifier(self.cascade_path)
+            self.startup_timings["cascade_load_ms"] = round((time.perf_counter() - cascade_start) * 1000, 1)
             if self.face_detector.empty():
                 return False, "Failed to load Haar cascade"
             return True, "Models loaded successfully"
@@ -98,44 +304,112 @@ class EmotionAnalyzerAPI:
         except:
             return None
 
-    def generate_report(self):
-        """Generate a consolidated emotion analysis report"""
-        if not self.emotion_counter:
-            return {
-                "total_frames": self.frame_count,
-                "total_faces_detected": 0,
-                "dominant_emotion": "No data",
-                "emotion_percentages": {},
-                "session_duration": time.time() - self.start_time,
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        total_detections = sum(self.emotion_counter.values())
-        dominant_emotion = self.emotion_counter.most_common(1)[0][0]
-        
-        emotion_percentages = {}
-        for emotion, count in self.emotion_counter.items():
-            percentage = (count / total_detections) * 100
-            emotion_percentages[emotion] = round(percentage, 2)
-        
-        return {
-            "total_frames": self.frame_count,
-            "total_faces_detected": total_detections,
-            "dominant_emotion": dominant_emotion,
-            "emotion_percentages": emotion_percentages,
-            "session_duration": round(time.time() - self.start_time, 2),
-            "timestamp": datetime.now().isoformat()
-        }
+    def _fill_batch_slot(self, slot, gray_face):
+        """Resize and normalize one face crop straight into the batch tensor"""
+        try:
+            face = cv2.resize(gray_face, (self.target_w, self.target_h))
+        except Exception:
+            return False
+        out = self.batch_buffer[slot, :, :, 0]
+        np.multiply(face, 2.0 / 255.0, out=out, casting="unsafe")
+        out -= 1.0
+        return True
+
+    def classify_faces(self, face_crops, stage_times=None):
+        """Classify many gray face crops with one predict call per batch.
+
+        Returns a list aligned with face_crops holding (emotion_index, confidence),
+        or None for crops that could not be preprocessed. If `stage_times` is a
+        dict it receives per-crop "preprocess" seconds and, for the predict call
+        each crop was part of, its "inference" seconds, "batch_faces" and
+        "inference_call" index (-1 for crops that were not classified).
+        """
+        results = [None] * len(face_crops)
+        clock = time.perf_counter if stage_times is not None else None
+        if clock:
+            preprocess = stage_times["preprocess"] = [0.0] * len(face_crops)
+            inference = stage_times["inference"] = [0.0] * len(face_crops)
+            batch_faces = stage_times["batch_faces"] = [0] * len(face_crops)
+            inference_call = stage_times["inference_call"] = [-1] * len(face_crops)
+        for start in range(0, len(face_crops), self.max_batch_size):
+            chunk = face_crops[start:start + self.max_batch_size]
+            slots = []
+            for i, crop in enumerate(chunk):
+                started = clock() if clock else 0.0
+                if self._fill_batch_slot(len(slots), crop):
+                    slots.append(start + i)
+                if clock:
+                    preprocess[start + i] = clock() - started
+            if not slots:
+                continue
+
+            started = clock() if clock else 0.0
+            preds = self.emotion_classifier.predict(self.batch_buffer[:len(slots)])
+            if clock:
+                elapsed = clock() - started
+                for face_i in slots:
+                    inference[face_i] = elapsed
+                    batch_faces[face_i] = len(slots)
+                    inference_call[face_i] = start
+                if self.metrics is not None:
+                    self.metrics.batch_faces.observe(len(slots))
+            indices = np.argmax(preds, axis=1)
+            confidences = np.max(preds, axis=1)
+            for row, face_i in enumerate(slots):
+                results[face_i] = (int(indices[row]), float(confidences[row]))
+        return results
+
+    def to_gray(self, frame, timings=None):
+        """Accept a data-URL string or an already decoded grayscale array.
+
+        With a `timings` dict, records "decode" and "color" seconds.
+        """
+        if isinstance(frame, np.ndarray):
+            return frame
+        if frame is None:
+            raise ValueError("Could not decode frame bytes")
+        if timings is None:
+            return self.decode_frame(frame)
+        started = time.perf_counter()
+        rgb = self.decode_rgb(frame)
+        decoded = time.perf_counter()
+        gray = self.rgb_to_gray(rgb)
+        timings["decode"] = decoded - started
+        timings["color"] = time.perf_counter() - decoded
+        return gray
+
+    @staticmethod
+    def decode_rgb(frame_b64):
+        """Decode a base64 data-URL frame into an RGB array"""
+        img_bytes = base64.b64decode(frame_b64.split(',')[1])
+        return np.array(Image.open(BytesIO(img_bytes)).convert('RGB'))
+
+    @staticmethod
+    def rgb_to_gray(rgb):
+        frame = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    @staticmethod
+    def decode_frame(frame_b64):
+        """Decode a base64 data-URL frame into a grayscale image"""
+        return EmotionAnalyzerAPI.rgb_to_gray(EmotionAnalyzerAPI.decode_rgb(frame_b64))
+
+    def generate_report(self, session_id=DEFAULT_SESSION):
+        """Generate a consolidated emotion analysis report (None if the session is unknown)"""
+        session = self.sessions.get(session_id)
+        return session.generate_report() if session is not None else None
     
-    def print_terminal_report(self, is_final=False):
+    def print_terminal_report(self, is_final=False, session_id=DEFAULT_SESSION, session=None):
         """Print a formatted report to terminal"""
-        report = self.generate_report()
+        session = session or self.get_session(session_id)
+        report = session.generate_report()
         
         header = "*** FINAL EMOTION ANALYSIS REPORT ***" if is_final else "*** EMOTION ANALYSIS REPORT ***"
         
         print("\n" + "=" * 70, file=sys.stderr)
         print(f"{header:^70}", file=sys.stderr)
         print("=" * 70, file=sys.stderr)
+        print(f"Session: {session.session_id}", file=sys.stderr)
         print(f"Session Duration: {report['session_duration']:.2f} seconds", file=sys.stderr)
         print(f"Total Frames Processed: {report['total_frames']}", file=sys.stderr)
         print(f"Total Faces Detected: {report['total_faces_detected']}", file=sys.stderr)
@@ -159,98 +433,567 @@ class EmotionAnalyzerAPI:
             print(f"Analysis completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", file=sys.stderr)
             print("=" * 70 + "\n", file=sys.stderr)
 
-    def analyze_frame(self, frame_b64):
+    def analyze_frame(self, frame_b64, session_id=DEFAULT_SESSION):
+        return self.analyze_frames([frame_b64], [session_id])[0]
+
+    def analyze_frames(self, frames_b64, session_ids=None):
+        """Analyze several frames with a single batched inference pass.
+
+        Frames are data-URL strings or grayscale arrays. Faces from every frame
+        (and every session) are classified together; results come back as one
+        dict per input frame, in input order.
+        """
+        if session_ids is None:
+            session_ids = [DEFAULT_SESSION] * len(frames_b64)
+
+        pending = []
+        face_crops = []
+        # Sessions whose gate reference was replaced in this batch: their cached predictions are
+        # only stored in _finish_frame, so later frames of the batch must not reuse them yet
+        refreshed = set()
+        for frame_b64, session_id in zip(frames_b64, session_ids):
+            entry = self._new_entry(session_id)
+            session = entry["session"]
+            timings = entry["timings"]
+            try:
+                gray = self.to_gray(frame_b64, timings)
+                if session.gate is not None and session.session_id not in refreshed:
+                    dedup_start = time.perf_counter() if timings is not None else 0.0
+                    reuse = session.cached_faces is not None and session.gate.is_duplicate(gray)
+                    if timings is not None:
+                        timings["dedup"] = time.perf_counter() - dedup_start
+                    if reuse:
+                        entry["reused"] = True
+                        entry["faces"], entry["cached_predictions"] = session.cached_faces
+                        entry["first_crop"] = len(face_crops)
+                        pending.append(entry)
+                        continue
+                detect_start = time.perf_counter() if timings is not None else 0.0
+                if session.tracker is not None:
+                    faces = session.tracker.update(gray)
+                else:
+                    faces = detect_faces(self.face_detector, gray)
+                if timings is not None:
+                    timings["detect"] = time.perf_counter() - detect_start
+                if session.gate is not None:
+                    session.gate.update(gray, faces)
+                    refreshed.add(session.session_id)
+                entry["faces"] = faces
+                entry["first_crop"] = len(face_crops)
+                for (x, y, w, h) in faces:
+                    face_crops.append(gray[y:y+h, x:x+w])
+            except Exception as e:
+                entry["error"] = str(e)
+            pending.append(entry)
+
+        return self._classify_entries(pending, face_crops)
+
+    def analyze_detected(self, frames, session_id=DEFAULT_SESSION):
+        """Classify faces that were already detected elsewhere (see batch_analysis.py).
+
+        `frames` holds one dict per frame, in order: {"faces": boxes, "crops":
+        gray face crops, "detect": seconds} or {"error": message}.
+        """
+        pending = []
+        face_crops = []
+        for frame in frames:
+            entry = self._new_entry(session_id)
+            if "error" in frame:
+                entry["error"] = frame["error"]
+            else:
+                if entry["timings"] is not None:
+                    entry["timings"]["detect"] = frame.get("detect", 0.0)
+                entry["faces"] = frame["faces"]
+                entry["first_crop"] = len(face_crops)
+                face_crops.extend(frame["crops"])
+            pending.append(entry)
+        return self._classify_entries(pending, face_crops)
+
+    def _new_entry(self, session_id):
+        session = self.get_session(session_id)
+        session.frame_count += 1
+        session.last_seen = time.monotonic()
+        entry = {"session": session, "frame_number": session.frame_count,
+                 "timestamp": datetime.now().strftime('%H:%M:%S')}
+        entry["timings"] = {"started": time.perf_counter()} if self.collect_timings else None
+        return entry
+
+    def _classify_entries(self, pending, face_crops):
+        stage_times = {} if self.collect_timings else None
         try:
-            self.frame_count += 1
-            current_time = datetime.now().strftime('%H:%M:%S')
-            
-            # Decode base64 frame
-            img_bytes = base64.b64decode(frame_b64.split(',')[1])
-            img = Image.open(BytesIO(img_bytes)).convert('RGB')
-            frame = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
-            frame_emotions = []
-            for (x, y, w, h) in faces:
-                face_gray = gray[y:y+h, x:x+w]
-                face_input = self.preprocess_face(face_gray)
-                if face_input is not None:
-                    preds = self.emotion_classifier.predict(face_input, verbose=0)[0]
-                    idx = int(np.argmax(preds))
-                    conf = float(np.max(preds))
-                    
-                    if conf >= self.min_conf:
-                        emotion = EMOTIONS[idx]["emotion"]
-                        self.emotion_counter[emotion] += 1
-                        frame_emotions.append({
-                            "emotion": emotion,
-                            "confidence": round(conf, 3),
-                            "timestamp": current_time
-                        })
-                        
-                        # Print real-time result to terminal
-                        print(f"[{current_time}] Frame #{self.frame_count}: {emotion} ({conf:.1%})", file=sys.stderr)
-            
-            # Store frame analysis in history
-            self.emotion_history.append({
-                "frame_number": self.frame_count,
-                "timestamp": current_time,
-                "faces_detected": len(faces),
-                "emotions": frame_emotions
-            })
-            
-            # Generate and print report every 10 frames
-            if self.frame_count % 10 == 0:
-                self.print_terminal_report(is_final=False)
-            
-            # Return structured data for Node.js backend
-            return {
-                "success": True,
-                "frame_number": self.frame_count,
-                "faces_detected": len(faces),
-                "emotions": frame_emotions,
-                "current_report": self.generate_report()
-            }
-            
+            predictions = self.classify_faces(face_crops, stage_times)
         except Exception as e:
-            print(f"❌ Error analyzing frame #{self.frame_count}: {str(e)}", file=sys.stderr)
+            for entry in pending:
+                entry.setdefault("error", str(e))
+            predictions = []
+
+        return [self._finish_frame(entry, predictions, stage_times) for entry in pending]
+
+    def _frame_timings(self, entry, stage_times):
+        """Per-stage ms for one frame; inference covers the (shared) predict calls its faces went through"""
+        timings = entry["timings"]
+        first = entry["first_crop"]
+        crops = range(first, first if entry.get("reused") else first + len(entry["faces"]))
+        preprocess = sum((stage_times["preprocess"][i] for i in crops), 0.0)
+        # Each predict call counts once, however many of this frame's faces it carried
+        inference_calls = {}
+        for i in crops:
+            if stage_times["inference_call"][i] >= 0:
+                inference_calls[stage_times["inference_call"][i]] = (stage_times["inference"][i],
+                                                                    stage_times["batch_faces"][i])
+        seconds = {
+            "decode": timings.get("decode", 0.0),
+            "color": timings.get("color", 0.0),
+            "detect": timings.get("detect", 0.0),
+            "preprocess": preprocess,
+            "inference": sum((elapsed for elapsed, _ in inference_calls.values()), 0.0),
+        }
+        if "dedup" in timings:
+            seconds["dedup"] = timings["dedup"]
+        if self.metrics is not None:
+            for stage, value in seconds.items():
+                self.metrics.stage_seconds.observe(value, stage)
+            self.metrics.frame_seconds.observe(time.perf_counter() - timings["started"])
+        result = {f"{stage}_ms": round(value * 1000, 3) for stage, value in seconds.items()}
+        result["batch_faces"] = max((faces for _, faces in inference_calls.values()), default=0)
+        return result
+
+    def _finish_frame(self, entry, predictions, stage_times=None):
+        session = entry["session"]
+        frame_number = entry["frame_number"]
+        if "error" in entry:
+            if session.gate is not None:
+                session.gate.reset()
+                session.cached_faces = None
+            logger.warning("Error analyzing frame #%d (%s): %s", frame_number, session.session_id, entry["error"])
+            if self.metrics is not None:
+                self.metrics.frames.inc("error")
             return {
                 "success": False,
-                "error": str(e),
-                "frame_number": self.frame_count
+                "session_id": session.session_id,
+                "error": entry["error"],
+                "frame_number": frame_number
             }
 
+        current_time = entry["timestamp"]
+        faces = entry["faces"]
+        reused = entry.get("reused", False)
+        if reused:
+            face_predictions = entry["cached_predictions"]
+        else:
+            first = entry["first_crop"]
+            face_predictions = predictions[first:first + len(faces)]
+            if session.gate is not None:
+                session.cached_faces = (faces, face_predictions)
+        frame_emotions = []
+        detections = []
+        for (x, y, w, h), prediction in zip(faces, face_predictions):
+            if prediction is None:
+                continue
+            idx, conf = prediction
+
+            if conf >= self.min_conf:
+                emotion = EMOTIONS[idx]["emotion"]
+                detections.append((idx, conf))
+                frame_emotions.append({
+                    "emotion": emotion,
+                    "confidence": round(conf, 3),
+                    "timestamp": current_time,
+                    "box": [int(x), int(y), int(w), int(h)]
+                })
+                
+                # Real-time result; DEBUG only, rate limited (see rate_limited_logging.py)
+                logger.debug("%s frame #%d: %s (%.1f%%)", session.session_id, frame_number, emotion, conf * 100)
+        
+        # Store frame analysis in the bounded history (O(1) aggregate update)
+        if not reused or self.dedup_count:
+            session.record_frame(frame_number, len(faces), detections)
+        if self.archive is not None and (not reused or self.dedup_count):
+            if session.archive_index is None:
+                session.archive_index = self.archive.register_session(session.session_id, session.start_time,
+                                                                      session.user_id)
+            self.archive.append_frame(session.archive_index, frame_number, len(faces), detections)
+        
+        # Full terminal report every 10 frames, only when debugging
+        if frame_number % 10 == 0 and logger.isEnabledFor(logging.DEBUG):
+            self.print_terminal_report(is_final=False, session=session)
+        
+        # Return structured data for Node.js backend
+        result = {
+            "success": True,
+            "session_id": session.session_id,
+            "frame_number": frame_number,
+            "faces_detected": len(faces),
+            "emotions": frame_emotions,
+            "current_report": session.generate_report()
+        }
+        if reused:
+            result["reused"] = True
+        if self.metrics is not None:
+            self.metrics.frames.inc("reused" if reused else "success")
+            self.metrics.faces.inc(amount=len(faces))
+            for item in frame_emotions:
+                self.metrics.emotions.inc(item["emotion"])
+        if self.collect_timings:
+            timings = self._frame_timings(entry, stage_times)
+            if self.stage_timings:
+                result["timings"] = timings
+        return result
+
+# -------------------------------
+# Micro-batching input
+# -------------------------------
+def start_line_reader(stream, messages):
+    """Parse stdin lines into `messages` on a background thread; None marks end of input"""
+
+    def reader():
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                messages.put(parse_message(line))
+            except ValueError as e:
+                messages.put(invalid_message(line, e))
+        messages.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+    return messages
+
+
+def start_binary_reader(stream, messages, decode=True):
+    """Read length-prefixed binary messages, decoding frames to grayscale on the reader thread.
+
+    With decode=False frames stay encoded bytes (pool mode decodes in the workers).
+    """
+
+    def reader():
+        try:
+            for message_type, session_id, payload in read_messages(stream):
+                message = {"type": message_type, "session_id": session_id or DEFAULT_SESSION}
+                if message_type == "frame" and not decode:
+                    message["frame"] = bytes(payload)  # the payload buffer is reused for the next message
+                elif message_type == "frame":
+                    started = time.perf_counter()
+                    try:
+                        message["frame"] = decode_gray(payload)
+                    except Exception:
+                        message["frame"] = None
+                    # Decoded straight to grayscale here, so there is no separate color stage
+                    message["decode_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                messages.put(message)
+        except Exception as e:
+            logger.error("Binary frame stream failed: %s", e)
+        messages.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+    return messages
+
+
+def next_batch(lines, window, max_frames, poll_interval=None):
+    """Block for one frame, then gather more that arrive within the window.
+
+    Returns (frames, done) where done is True once input has ended. With a
+    poll_interval, returns an empty batch if nothing arrives in that time.
+    """
+    try:
+        first = lines.get(timeout=poll_interval)
+    except queue.Empty:
+        return [], False
+    if first is None:
+        return [], True
+
+    batch = [first]
+    deadline = time.monotonic() + window
+    while len(batch) < max_frames:
+        remaining = deadline - time.monotonic()
+        try:
+            line = lines.get(timeout=remaining) if remaining > 0 else lines.get_nowait()
+        except queue.Empty:
+            break
+        if line is None:
+            return batch, True
+        batch.append(line)
+    return batch, False
+
+
+# -------------------------------
+# Session protocol
+# -------------------------------
+# Each stdin line is either a bare data URL (legacy, goes to the default
+# session) or a JSON message:
+#   {"type": "frame",  "session_id": "...", "frame": "data:image/jpeg;base64,...", "user_id": "..."}
+#   {"type": "report", "session_id": "...", "window_seconds": 30}
+#                                             -> {"type": "report", "report": {...}, "recent": {...}, "per_minute": {...}}
+#                                                (success false, "error": "Unknown session" if it has no frames yet)
+#   {"type": "close",  "session_id": "..."}   -> {"type": "closed", "final_report": {...}}
+# Idle sessions are closed automatically and announced as {"type": "evicted", ...}.
+# With --binary the same messages arrive length-prefixed (see frame_protocol.py).
+def parse_message(line):
+    if not line.startswith("{"):
+        return {"type": "frame", "session_id": DEFAULT_SESSION, "frame": line}
+    return normalize_message(json.loads(line))
+
+
+def invalid_message(line, error):
+    """Stand-in for a line that failed to parse, keeping its session_id when the JSON has one"""
+    message = {"type": "invalid", "error": f"Invalid message: {error}"}
+    try:
+        raw = json.loads(line)
+    except ValueError:
+        return message
+    if isinstance(raw, dict) and raw.get("session_id"):
+        message["session_id"] = str(raw["session_id"])
+    return message
+
+
+def invalid_result(message):
+    """Error output for an "invalid" message"""
+    result = {"success": False}
+    if message.get("session_id"):
+        result["session_id"] = message["session_id"]
+    result["error"] = message.get("error", "Invalid message")
+    return result
+
+
+def normalize_message(message):
+    """Fill in protocol defaults on an already decoded message dict (ValueError if it is malformed)"""
+    message.setdefault("type", "frame")
+    message["session_id"] = str(message.get("session_id") or DEFAULT_SESSION)
+    if "window_seconds" in message:
+        try:
+            window = float(message["window_seconds"])
+        except (TypeError, ValueError):
+            window = math.nan
+        if not (math.isfinite(window) and window > 0):
+            raise ValueError(f"window_seconds must be a positive number, got {message['window_seconds']!r}")
+        message["window_seconds"] = window
+    return message
+
+
+def handle_messages(analyzer, messages):
+    """Process a batch of protocol messages in order; returns the output messages"""
+    outputs = []
+    frame_messages = []
+
+    def flush_frames():
+        if frame_messages:
+            started = time.monotonic()
+            results = analyzer.analyze_frames([m.get("frame", "") for m in frame_messages],
+                                              [m["session_id"] for m in frame_messages])
+            for message, result in zip(frame_messages, results):
+                # Backpressure visibility: time spent waiting and frames superseded so far
+                if "enqueued_at" in message:
+                    result["queue_delay_ms"] = round((started - message["enqueued_at"]) * 1000, 1)
+                    if analyzer.metrics is not None:
+                        analyzer.metrics.queue_delay.observe(started - message["enqueued_at"])
+                if "dropped_frames" in message:
+                    result["dropped_frames"] = message["dropped_frames"]
+                if "decode_ms" in message and "timings" in result:
+                    result["timings"]["decode_ms"] = message["decode_ms"]
+            outputs.extend(results)
+            frame_messages.clear()
+
+    for message in messages:
+        if isinstance(message, str):
+            try:
+                message = parse_message(message)
+            except ValueError as e:
+                message = invalid_message(message, e)
+        if message["type"] == "invalid":
+            # Answered in order: frames queued before the bad message get their results first
+            flush_frames()
+            outputs.append(invalid_result(message))
+            continue
+
+        session_id = message["session_id"]
+        if message["type"] == "frame":
+            if message.get("user_id") is not None:
+                analyzer.set_user_id(session_id, str(message["user_id"]))
+            frame_messages.append(message)
+            continue
+
+        # Control messages see every frame sent before them
+        flush_frames()
+        if message["type"] == "report":
+            # Asking about a session must not create it (it would then live until evicted)
+            session = analyzer.sessions.get(session_id)
+            if session is None:
+                outputs.append({"type": "report", "success": False, "session_id": session_id,
+                                "error": "Unknown session"})
+                continue
+            outputs.append({"type": "report", "success": True, "session_id": session_id,
+                            "report": session.generate_report(),
+                            "recent": session.window_report(message.get("window_seconds", 30)),
+                            "per_minute": session.per_minute_report()})
+        elif message["type"] == "close":
+            final_report = analyzer.close_session(session_id)
+            outputs.append({"type": "closed", "success": final_report is not None,
+                            "session_id": session_id, "final_report": final_report})
+        else:
+            outputs.append({"success": False, "session_id": session_id,
+                            "error": f"Unknown message type: {message['type']}"})
+
+    flush_frames()
+    return outputs
+
+
+def serialize_result(result, metrics=None):
+    """JSON-encode one output message, timing the encode itself.
+
+    The "timings" dict (if any) is appended after measuring so it can carry
+    its own serialize_ms without encoding the message twice.
+    """
+    timings = result.pop("timings", None)
+    started = time.perf_counter()
+    body = json.dumps(result)
+    elapsed = time.perf_counter() - started
+    if metrics is not None and "frame_number" in result:
+        metrics.stage_seconds.observe(elapsed, "serialize")
+    if timings is None or body == "{}":
+        return body
+    timings["serialize_ms"] = round(elapsed * 1000, 3)
+    return body[:-1] + ', "timings": ' + json.dumps(timings) + "}"
+
+
 # -------------------------------
 # Main loop: read base64 frames from stdin
 # -------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emotion analysis over base64 frames on stdin")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                        help="wait this long after a frame for more frames to batch together")
+    parser.add_argument("--max-batch", type=int, default=32,
+                        help="maximum frames (and faces per inference call) in one batch")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras",
+                        help="inference backend (tflite/onnx need inference_backends.py convert first)")
+    parser.add_argument("--session-timeout", type=float, default=300.0,
+                        help="seconds without frames before a session is closed and evicted")
+    parser.add_argument("--history-capacity", type=int, default=9000,
+                        help="detections kept per session for rolling-window queries")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="run full face detection every N frames and track faces in between")
+    parser.add_argument("--detect-scale", type=float, default=1.0,
+                        help="downscale factor for full-frame detection (e.g. 0.5)")
+    parser.add_argument("--search-margin", type=float, default=0.4,
+                        help="tracking search window around the previous box, as a fraction of its size")
+    parser.add_argument("--keep-all-frames", action="store_true",
+                        help="process every frame in order instead of keeping only the newest per session")
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="maximum queued messages before the oldest frame is dropped")
+    parser.add_argument("--binary", action="store_true",
+                        help="read length-prefixed raw JPEG/PNG frames instead of data-URL lines")
+    parser.add_argument("--stage-timings", action="store_true",
+                        help="include per-stage timings (decode, color, detect, preprocess, inference, "
+                             "serialize) in every frame result")
+    parser.add_argument("--metrics-file", help="periodically write Prometheus metrics to this file (single-process mode)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics (single-process mode)")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="seconds between --metrics-file writes")
+    parser.add_argument("--log-level", default="INFO",
+                        help="DEBUG logs every detected face and a report every 10 frames")
+    parser.add_argument("--log-interval", type=float, default=1.0,
+                        help="minimum seconds between repeats of the same log message (0 disables)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="analysis processes, each with its own model; sessions stick to one worker")
+    parser.add_argument("--archive-dir",
+                        help="append every analysed frame to a session archive here (query with session_archive.py)")
+    parser.add_argument("--dedup-threshold", type=float, default=0.0,
+                        help="reuse the previous result for frames whose mean gray-level change is below this "
+                             "(e.g. 2.0; 0 disables)")
+    parser.add_argument("--dedup-max-reuse", type=int, default=30,
+                        help="force a full analysis after this many reused frames in a row")
+    parser.add_argument("--dedup-uncounted", action="store_true",
+                        help="leave reused frames out of the emotion counters and archive")
+    args = parser.parse_args()
+    if args.workers > 1 and (args.metrics_file or args.metrics_port):
+        # Each worker has its own registry and the dispatcher runs no analyzer, so nothing would be counted
+        parser.error("--metrics-file/--metrics-port need single-process mode (--workers 1)")
+    configure_logging(args.log_level, args.log_interval)
+
+    metrics = None
+    if args.metrics_file or args.metrics_port:
+        metrics = EmotionMetrics()
+        if args.metrics_port:
+            start_metrics_server(metrics.registry, args.metrics_port)
+    last_metrics_write = 0.0
+
+    def write_metrics(force=False):
+        global last_metrics_write
+        if metrics is None:
+            return
+        metrics.sessions.set(len(analyzer.sessions))
+        now = time.monotonic()
+        if args.metrics_file and (force or now - last_metrics_write >= args.metrics_interval):
+            metrics.registry.write_file(args.metrics_file)
+            last_metrics_write = now
+
+    def print_final_reports():
+        for session_id in list(analyzer.sessions):
+            analyzer.print_terminal_report(is_final=True, session_id=session_id)
+
+    analyzer_kwargs = dict(max_batch_size=args.max_batch, backend=args.backend,
+                           session_timeout=args.session_timeout, history_capacity=args.history_capacity,
+                           detect_every=args.detect_every, detect_scale=args.detect_scale,
+                           search_margin=args.search_margin, stage_timings=args.stage_timings,
+                           archive_dir=args.archive_dir, dedup_threshold=args.dedup_threshold,
+                           dedup_max_reuse=args.dedup_max_reuse, dedup_count=not args.dedup_uncounted)
+
+    if args.workers > 1:
+        # Multi-process mode: frames go to worker processes through shared memory
+        from worker_pool import run_pool
+        run_pool(args, analyzer_kwargs)
+        sys.exit(0)
+
     try:
-        analyzer = EmotionAnalyzerAPI()
-        
-        for line in sys.stdin:
-            frame_b64 = line.strip()
-            if not frame_b64:
+        analyzer = EmotionAnalyzerAPI(metrics=metrics, **analyzer_kwargs)
+
+        # Readiness handshake: the supervisor routes frames to this process only after this line
+        print(json.dumps({"type": "ready", "pid": os.getpid(), "backend": args.backend,
+                          "startup": analyzer.startup_timings}))
+        sys.stdout.flush()
+
+        lines = LatestFrameQueue(maxsize=args.max_queue, drop_stale=not args.keep_all_frames)
+        if args.binary:
+            start_binary_reader(sys.stdin.buffer, lines)
+        else:
+            start_line_reader(sys.stdin, lines)
+        poll_interval = min(args.session_timeout, 5.0)
+
+        done = False
+        while not done:
+            batch, done = next_batch(lines, args.batch_window_ms / 1000.0, args.max_batch, poll_interval)
+            outputs = handle_messages(analyzer, batch)
+            for session_id, final_report in analyzer.evict_idle_sessions().items():
+                outputs.append({"type": "evicted", "success": True,
+                                "session_id": session_id, "final_report": final_report})
+            for result in outputs:
+                if result.get("type") in ("closed", "evicted"):
+                    lines.forget_session(result["session_id"])
+            write_metrics()
+            if analyzer.archive is not None:
+                analyzer.archive.flush_if_due()
+            if not outputs:
                 continue
-                
-            result = analyzer.analyze_frame(frame_b64)
-            
-            # Output JSON to stdout for Node.js backend
-            print(json.dumps(result))
+
+            # Output JSON to stdout for Node.js backend, one line per message
+            for result in outputs:
+                print(serialize_result(result, metrics))
             sys.stdout.flush()
             
     except KeyboardInterrupt:
         print("\n>>> Analysis interrupted by user <<<", file=sys.stderr)
         if 'analyzer' in locals():
-            analyzer.print_terminal_report(is_final=True)
+            print_final_reports()
     except Exception as e:
         print(f"ERROR: Fatal error: {str(e)}", file=sys.stderr)
         if 'analyzer' in locals():
-            analyzer.print_terminal_report(is_final=True)
+            print_final_reports()
         sys.exit(1)
     finally:
         # Always print final report when script ends normally
         if 'analyzer' in locals():
             print("\n*** Session ended normally ***", file=sys.stderr)
-            analyzer.print_terminal_report(is_final=True)
+            print_final_reports()
+            analyzer.close_archive()
+            write_metrics(force=True)
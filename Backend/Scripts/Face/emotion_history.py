@@ -0,0 +1,107 @@
+"""
+Fixed-capacity emotion history for long-running sessions.
+
+Detections live in a ring buffer of compact NumPy columns instead of a list
+of per-frame dicts, so memory stays flat no matter how long a session runs.
+All-time per-emotion totals are updated in O(1) per detection, which keeps
+report generation constant-cost per frame; rolling-window and per-minute
+summaries are answered from whatever is still in the buffer.
+"""
+
+import time
+from datetime import datetime
+import numpy as np
+
+NO_EMOTION = -1  # row for a frame with no accepted detection
+
+
+class EmotionHistory:
+    def __init__(self, num_emotions, capacity=9000):
+        self.num_emotions = num_emotions
+        self.capacity = capacity
+        self.frame_number = np.zeros(capacity, dtype=np.int64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.face_count = np.zeros(capacity, dtype=np.int16)
+        self.emotion = np.full(capacity, NO_EMOTION, dtype=np.int8)
+        self.confidence = np.zeros(capacity, dtype=np.float32)
+        self.size = 0
+        self.next = 0
+
+        # Running aggregates over the whole session (not limited to capacity)
+        self.counts = np.zeros(num_emotions, dtype=np.int64)
+        self.total_detections = 0
+        self.total_frames = 0
+
+    def _append(self, frame_number, timestamp, face_count, emotion, confidence):
+        i = self.next
+        self.frame_number[i] = frame_number
+        self.timestamp[i] = timestamp
+        self.face_count[i] = face_count
+        self.emotion[i] = emotion
+        self.confidence[i] = confidence
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_frame(self, frame_number, face_count, detections, timestamp=None):
+        """Record one frame; detections is a list of (emotion_index, confidence)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.total_frames += 1
+        if not detections:
+            self._append(frame_number, timestamp, face_count, NO_EMOTION, 0.0)
+            return
+        for emotion, confidence in detections:
+            self._append(frame_number, timestamp, face_count, emotion, confidence)
+            self.counts[emotion] += 1
+            self.total_detections += 1
+
+    def _ordered(self):
+        """Indices of stored rows, oldest first"""
+        if self.size < self.capacity:
+            return np.arange(self.size)
+        return (np.arange(self.capacity) + self.next) % self.capacity
+
+    def _valid_rows(self, since=None):
+        rows = np.arange(self.size)
+        mask = self.emotion[rows] != NO_EMOTION
+        if since is not None:
+            mask &= self.timestamp[rows] >= since
+        return rows[mask]
+
+    def window_counts(self, seconds, now=None):
+        """Per-emotion detection counts over the last `seconds`"""
+        now = time.time() if now is None else now
+        rows = self._valid_rows(since=now - seconds)
+        return np.bincount(self.emotion[rows], minlength=self.num_emotions)
+
+    def per_minute_counts(self, start_time):
+        """{minute_index: counts array} for detections still in the buffer"""
+        rows = self._valid_rows()
+        if not len(rows):
+            return {}
+        minutes = ((self.timestamp[rows] - start_time) // 60).astype(np.int64)
+        minutes = np.maximum(minutes, 0)
+        flat = minutes * self.num_emotions + self.emotion[rows]
+        table = np.bincount(flat, minlength=(minutes.max() + 1) * self.num_emotions)
+        table = table.reshape(-1, self.num_emotions)
+        return {int(m): table[m] for m in np.unique(minutes)}
+
+    def records(self, emotion_names, limit=None):
+        """Stored history as per-frame dicts (oldest first), for debugging/export"""
+        rows = self._ordered()
+        if limit is not None:
+            rows = rows[-limit:]
+        frames = []
+        for i in rows:
+            if not frames or frames[-1]["frame_number"] != int(self.frame_number[i]):
+                frames.append({
+                    "frame_number": int(self.frame_number[i]),
+                    "timestamp": datetime.fromtimestamp(self.timestamp[i]).strftime('%H:%M:%S'),
+                    "faces_detected": int(self.face_count[i]),
+                    "emotions": []
+                })
+            if self.emotion[i] != NO_EMOTION:
+                frames[-1]["emotions"].append({
+                    "emotion": emotion_names[int(self.emotion[i])],
+                    "confidence": round(float(self.confidence[i]), 3)
+                })
+        return frames
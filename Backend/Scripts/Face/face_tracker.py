@@ -0,0 +1,165 @@
+"""
+Detect-then-track face localisation for webcam streams.
+
+Running the Haar cascade over the full frame is the most expensive step per
+frame, but a webcam face barely moves between consecutive frames. FaceTracker
+runs the full detector every `detect_every` frames (optionally on a downscaled
+copy) and in between only re-detects inside a small window around each
+previous box. If any tracked face is not found again the tracker falls back
+to a full detection on that same frame, so faces are never silently dropped.
+"""
+
+import cv2
+import numpy as np
+
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_SIZE = (30, 30)
+
+
+def detect_faces(detector, gray, min_size=MIN_SIZE):
+    """Full-frame Haar detection with the analyzer's standard parameters"""
+    return detector.detectMultiScale(gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=min_size)
+
+
+class FaceTracker:
+    def __init__(self, detector, detect_every=5, search_margin=0.4, detect_scale=1.0):
+        self.detector = detector
+        self.detect_every = max(1, int(detect_every))
+        self.search_margin = search_margin
+        self.detect_scale = detect_scale
+        self.boxes = []
+        self.frames_since_detect = 0
+        self.last_mode = None
+        self.stats = {"full_detections": 0, "tracked_frames": 0, "track_losses": 0}
+
+    def _full_detect(self, gray):
+        self.stats["full_detections"] += 1
+        self.frames_since_detect = 0
+        self.last_mode = "detect"
+        if self.detect_scale == 1.0:
+            faces = detect_faces(self.detector, gray)
+        else:
+            small = cv2.resize(gray, None, fx=self.detect_scale, fy=self.detect_scale, interpolation=cv2.INTER_AREA)
+            min_side = max(12, int(round(MIN_SIZE[0] * self.detect_scale)))
+            faces = detect_faces(self.detector, small, (min_side, min_side))
+            faces = [tuple(int(round(v / self.detect_scale)) for v in box) for box in faces]
+        self.boxes = [tuple(int(v) for v in box) for box in faces]
+        return self.boxes
+
+    def _track_box(self, gray, box):
+        """Re-detect one face inside a margin around its previous box"""
+        x, y, w, h = box
+        frame_h, frame_w = gray.shape[:2]
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        roi = gray[y0:y1, x0:x1]
+
+        min_side = max(MIN_SIZE[0], int(min(w, h) * 0.75))
+        max_side = int(max(w, h) * 1.33)
+        if roi.shape[0] < min_side or roi.shape[1] < min_side:
+            return None
+        found = self.detector.detectMultiScale(roi, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS,
+                                               minSize=(min_side, min_side), maxSize=(max_side, max_side))
+        if len(found) == 0:
+            return None
+
+        # Keep the candidate whose centre is closest to the previous one
+        cx, cy = x + w / 2 - x0, y + h / 2 - y0
+        best = min(found, key=lambda f: (f[0] + f[2] / 2 - cx) ** 2 + (f[1] + f[3] / 2 - cy) ** 2)
+        fx, fy, fw, fh = (int(v) for v in best)
+        return (fx + x0, fy + y0, fw, fh)
+
+    def update(self, gray):
+        """Return face boxes for this frame as a list of (x, y, w, h)"""
+        self.frames_since_detect += 1
+        if not self.boxes or self.frames_since_detect >= self.detect_every:
+            return self._full_detect(gray)
+
+        tracked = []
+        for box in self.boxes:
+            new_box = self._track_box(gray, box)
+            if new_box is None:
+                # Tracking confidence dropped: re-acquire with a full detection now
+                self.stats["track_losses"] += 1
+                return self._full_detect(gray)
+            tracked.append(new_box)
+
+        self.stats["tracked_frames"] += 1
+        self.last_mode = "track"
+        self.boxes = tracked
+        return self.boxes
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def evaluate_tracking(detector, frames, **tracker_kwargs):
+    """Compare a tracker config against full detection on every frame.
+
+    Returns speed (ms/frame for both) and accuracy (mean best-match IoU and
+    recall of full-detection faces at IoU >= 0.5).
+    """
+    import time
+
+    start = time.perf_counter()
+    reference = [list(detect_faces(detector, gray)) for gray in frames]
+    full_ms = (time.perf_counter() - start) * 1000 / max(1, len(frames))
+
+    tracker = FaceTracker(detector, **tracker_kwargs)
+    start = time.perf_counter()
+    tracked = [tracker.update(gray) for gray in frames]
+    tracked_ms = (time.perf_counter() - start) * 1000 / max(1, len(frames))
+
+    ious, hits, total = [], 0, 0
+    for ref_boxes, got_boxes in zip(reference, tracked):
+        for ref in ref_boxes:
+            best = max((box_iou(ref, got) for got in got_boxes), default=0.0)
+            ious.append(best)
+            hits += best >= 0.5
+            total += 1
+    return {
+        "full_detect_ms_per_frame": round(full_ms, 3),
+        "tracked_ms_per_frame": round(tracked_ms, 3),
+        "speedup": round(full_ms / tracked_ms, 2) if tracked_ms else None,
+        "mean_iou": round(float(np.mean(ious)), 3) if ious else None,
+        "recall_at_iou_0_5": round(hits / total, 3) if total else None,
+        **tracker.stats
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Accuracy vs speed of tracking configs on a video or image sequence")
+    parser.add_argument("video", help="video file readable by cv2.VideoCapture")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--cascade", default=cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    args = parser.parse_args()
+
+    capture = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < args.max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    if not frames:
+        print(f"No frames read from {args.video}", file=sys.stderr)
+        sys.exit(1)
+
+    detector = cv2.CascadeClassifier(args.cascade)
+    for detect_every in (1, 5, 10):
+        for detect_scale in (1.0, 0.5):
+            result = evaluate_tracking(detector, frames, detect_every=detect_every, detect_scale=detect_scale)
+            print(json.dumps({"detect_every": detect_every, "detect_scale": detect_scale, **result}))
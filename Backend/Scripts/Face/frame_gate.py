@@ -0,0 +1,76 @@
+"""
+Near-duplicate frame gate for webcam streams.
+
+A user sitting still sends long runs of practically identical frames, and each
+one would otherwise pay for Haar detection and CNN inference. FrameGate keeps
+small thumbnails of the last fully analysed frame - the whole frame and each
+face box found in it - and measures how much a new frame differs from them
+(mean absolute gray-level difference, taking the largest of the frame and
+face regions so a changing expression on a small face is not averaged away).
+Below the threshold the caller reuses the cached faces and emotions. After
+`max_reuse` reused frames in a row a full analysis is forced regardless, so
+slow drift can never freeze the result.
+"""
+
+import cv2
+import numpy as np
+
+THUMB_SIZE = 16
+
+
+def thumbnail(gray, size=THUMB_SIZE):
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class FrameGate:
+    def __init__(self, threshold=2.0, max_reuse=30, size=THUMB_SIZE):
+        self.threshold = threshold
+        self.max_reuse = max(0, int(max_reuse))
+        self.size = size
+        self.frame_shape = None
+        self.frame_thumb = None
+        self.face_thumbs = []  # (box, thumbnail) of the faces in the reference frame
+        self.reuse_run = 0
+        self.last_change = None
+        self.stats = {"analysed": 0, "reused": 0}
+
+    def change(self, gray):
+        """Largest mean absolute difference between gray and the reference frame/faces"""
+        if self.frame_thumb is None or gray.shape[:2] != self.frame_shape:
+            return float("inf")
+        change = float(np.mean(np.abs(thumbnail(gray, self.size) - self.frame_thumb)))
+        for (x, y, w, h), reference in self.face_thumbs:
+            change = max(change, float(np.mean(np.abs(thumbnail(gray[y:y+h, x:x+w], self.size) - reference))))
+        return change
+
+    def is_duplicate(self, gray):
+        """True if this frame may reuse the last analysis (counts it as reused)"""
+        if self.reuse_run >= self.max_reuse:
+            self.last_change = None
+            return False
+        self.last_change = self.change(gray)
+        if self.last_change < self.threshold:
+            self.reuse_run += 1
+            self.stats["reused"] += 1
+            return True
+        return False
+
+    def update(self, gray, boxes):
+        """Make this fully analysed frame the new reference"""
+        self.frame_shape = gray.shape[:2]
+        self.frame_thumb = thumbnail(gray, self.size)
+        self.face_thumbs = [((int(x), int(y), int(w), int(h)), thumbnail(gray[y:y+h, x:x+w], self.size))
+                            for (x, y, w, h) in boxes if w > 0 and h > 0]
+        self.reuse_run = 0
+        self.stats["analysed"] += 1
+
+    def reset(self):
+        """Forget the reference (e.g. after a failed analysis)"""
+        self.frame_thumb = None
+        self.face_thumbs = []
+        self.reuse_run = 0
+
+    @property
+    def skip_rate(self):
+        total = self.stats["analysed"] + self.stats["reused"]
+        return self.stats["reused"] / total if total else 0.0
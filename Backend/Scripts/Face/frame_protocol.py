@@ -0,0 +1,76 @@
+"""
+Binary length-prefixed frame protocol for emotion_analysis.py --binary.
+
+Every message on stdin is a fixed 7-byte big-endian header followed by the
+session id and the payload:
+
+    type        uint8   0 = frame, 1 = report, 2 = close
+    id_length   uint16  length of the UTF-8 session id
+    length      uint32  payload length (raw JPEG/PNG bytes for frames, else 0)
+
+Compared to data-URL lines this skips base64 (33% smaller on the pipe) and
+decodes straight to grayscale with cv2.imdecode instead of going through
+PIL -> RGB -> BGR -> GRAY. Responses are still JSON lines on stdout.
+"""
+
+import struct
+import cv2
+import numpy as np
+
+HEADER = struct.Struct(">BHI")
+MESSAGE_TYPES = {0: "frame", 1: "report", 2: "close"}
+TYPE_CODES = {name: code for code, name in MESSAGE_TYPES.items()}
+
+
+def encode_message(message_type, session_id, payload=b""):
+    """Build one protocol message (used by clients and tests)"""
+    session_bytes = session_id.encode("utf-8")
+    return HEADER.pack(TYPE_CODES[message_type], len(session_bytes), len(payload)) + session_bytes + payload
+
+
+def _read_exact(stream, view):
+    """Fill `view` completely from a binary stream; False on clean EOF"""
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            if filled:
+                raise EOFError("Truncated frame message")
+            return False
+        filled += n
+    return True
+
+
+def read_messages(stream):
+    """Yield (type, session_id, payload) from a binary stream.
+
+    The payload is a memoryview into a single buffer that is reused (and grown
+    only when a larger frame arrives), so it is only valid until the next
+    message is read.
+    """
+    header = bytearray(HEADER.size)
+    buffer = bytearray(1 << 16)
+    while _read_exact(stream, memoryview(header)):
+        code, id_length, length = HEADER.unpack(header)
+        if code not in MESSAGE_TYPES:
+            raise ValueError(f"Unknown frame message type {code}")
+
+        session_bytes = bytearray(id_length)
+        if id_length and not _read_exact(stream, memoryview(session_bytes)):
+            raise EOFError("Truncated frame message")
+
+        if length > len(buffer):
+            buffer = bytearray(max(length, 2 * len(buffer)))
+        payload = memoryview(buffer)[:length]
+        if length and not _read_exact(stream, payload):
+            raise EOFError("Truncated frame message")
+
+        yield MESSAGE_TYPES[code], session_bytes.decode("utf-8"), payload
+
+
+def decode_gray(payload):
+    """Decode JPEG/PNG bytes directly to a single-channel image"""
+    gray = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Could not decode frame bytes")
+    return gray
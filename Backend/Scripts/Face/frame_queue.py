@@ -0,0 +1,83 @@
+"""
+Latest-frame-wins queue between the stdin reader thread and the analyzer.
+
+When inference falls behind, frames for a session that is already waiting
+are replaced rather than queued behind it, so a busy worker always analyses
+the most recent frame for each session and end-to-end latency stays bounded
+instead of growing with the backlog. Control messages (report/close) keep
+their order: a frame sent after a control message never replaces one sent
+before it.
+"""
+
+import time
+import queue
+import threading
+from collections import deque, defaultdict
+
+
+class LatestFrameQueue:
+    def __init__(self, maxsize=256, drop_stale=True):
+        self.maxsize = maxsize
+        self.drop_stale = drop_stale
+        self.items = deque()
+        self.pending_frames = {}  # session_id -> queued frame message that may still be replaced
+        self.dropped = defaultdict(int)
+        self.condition = threading.Condition()
+
+    def put(self, message):
+        """Queue a message dict (or None for end of input)"""
+        with self.condition:
+            if message is not None:
+                message["enqueued_at"] = time.monotonic()
+                session_id = message.get("session_id")
+                if message.get("type") == "frame":
+                    pending = self.pending_frames.get(session_id) if self.drop_stale else None
+                    if pending is not None:
+                        # Keep the queue position, swap in the newer frame
+                        self.dropped[session_id] += 1
+                        pending.clear()
+                        pending.update(message)
+                        return
+                    self.pending_frames[session_id] = message
+                else:
+                    self.pending_frames.pop(session_id, None)
+
+                if len(self.items) >= self.maxsize:
+                    self._drop_oldest_frame()
+            self.items.append(message)
+            self.condition.notify()
+
+    def _drop_oldest_frame(self):
+        for i, item in enumerate(self.items):
+            if item is not None and item.get("type") == "frame":
+                del self.items[i]
+                session_id = item.get("session_id")
+                if self.pending_frames.get(session_id) is item:
+                    del self.pending_frames[session_id]
+                self.dropped[session_id] += 1
+                return
+
+    def get(self, timeout=None):
+        """Pop the next message; raises queue.Empty after `timeout` seconds"""
+        with self.condition:
+            if not self.items and not self.condition.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+            message = self.items.popleft()
+            if message is not None:
+                session_id = message.get("session_id")
+                if self.pending_frames.get(session_id) is message:
+                    del self.pending_frames[session_id]
+                if message.get("type") == "frame":
+                    message["dropped_frames"] = self.dropped[session_id]
+            return message
+
+    def get_nowait(self):
+        with self.condition:
+            if not self.items:
+                raise queue.Empty
+        return self.get(timeout=0)
+
+    def forget_session(self, session_id):
+        """Drop a closed session's dropped-frame count (called from the analyzer thread)"""
+        with self.condition:
+            self.dropped.pop(session_id, None)
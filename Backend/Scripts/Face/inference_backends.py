@@ -0,0 +1,359 @@
+"""
+Inference backends for the 48x48 emotion CNN.
+
+EmotionAnalyzerAPI only needs `input_shape`, `predict(batch)` and `warmup()`
+(plus `load_timings`, the runtime import / model load cost in ms), so the same emotionModel.hdf5 can be served by:
+
+  keras   - Keras model.predict (baseline)
+  direct  - calling the Keras model directly, skipping predict() overhead
+  tflite  - TFLite interpreter on an offline-converted emotionModel.tflite
+  onnx    - ONNX Runtime on an offline-converted emotionModel.onnx
+
+and by post-training quantized variants of those conversions:
+
+  tflite-float16 - float16 weights (emotionModel.float16.tflite)
+  tflite-int8    - int8 weights and activations, calibrated (emotionModel.int8.tflite)
+  onnx-int8      - int8 QDQ model for ONNX Runtime, calibrated (emotionModel.int8.onnx)
+
+The tflite and onnx backends never import TensorFlow when a standalone runtime
+(tflite_runtime / ai_edge_litert / onnxruntime) is installed.
+
+One-time conversion and parity check:
+
+  python inference_backends.py convert --to tflite
+  python inference_backends.py convert --to onnx
+  python inference_backends.py verify --backend tflite
+
+The int8 variants need a calibration set, any folder of face images (48x48
+crops or larger, searched recursively):
+
+  python inference_backends.py convert --to tflite-int8 --calibration faces/train
+
+Quantized variants are not expected to pass the float32 parity check; compare
+their accuracy and latency with model_evaluation.py instead.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+BACKENDS = ("keras", "direct", "tflite", "onnx", "tflite-float16", "tflite-int8", "onnx-int8")
+MODEL_EXTENSIONS = {"tflite": ".tflite", "onnx": ".onnx", "tflite-float16": ".float16.tflite",
+                    "tflite-int8": ".int8.tflite", "onnx-int8": ".int8.onnx"}
+CALIBRATED = ("tflite-int8", "onnx-int8")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# Max absolute difference allowed between a backend's class probabilities and
+# the Keras baseline (float32 conversions typically land around 1e-6).
+PARITY_ATOL = 1e-4
+
+
+def _import_load_model():
+    try:
+        from tensorflow.keras.models import load_model
+        print("TensorFlow imported successfully", file=sys.stderr)
+    except Exception:
+        try:
+            from keras.models import load_model
+            print("Keras imported successfully", file=sys.stderr)
+        except Exception as e:
+            raise ImportError(f"Failed to import keras/tensorflow: {e}")
+    return load_model
+
+
+def _load_timings(start, imported):
+    """Runtime import vs model load split for a backend constructed since `start`"""
+    now = time.perf_counter()
+    return {"runtime_import_ms": round((imported - start) * 1000, 1),
+            "model_load_ms": round((now - imported) * 1000, 1)}
+
+
+def converted_model_path(model_path, backend):
+    """emotionModel.hdf5 -> emotionModel.tflite / emotionModel.onnx / emotionModel.int8.tflite ..."""
+    return os.path.splitext(model_path)[0] + MODEL_EXTENSIONS[backend]
+
+
+def backend_model_path(name, model_path):
+    """The file backend `name` actually loads for the given .hdf5 path"""
+    return converted_model_path(model_path, name) if name in MODEL_EXTENSIONS else model_path
+
+
+def normalize_faces(gray_faces, input_shape):
+    """Gray face crops -> (N, H, W, 1) float32 in [-1, 1], exactly as EmotionAnalyzerAPI feeds the model"""
+    import cv2
+    h, w = input_shape
+    batch = np.empty((len(gray_faces), h, w, 1), dtype=np.float32)
+    for i, face in enumerate(gray_faces):
+        np.multiply(cv2.resize(face, (w, h)), 2.0 / 255.0, out=batch[i, :, :, 0], casting="unsafe")
+    batch -= 1.0
+    return batch
+
+
+def load_face_images(directory, limit=None, seed=0):
+    """Gray faces from every image under directory (a random `limit` of them if given)"""
+    import cv2
+    paths = sorted(os.path.join(root, name) for root, _, files in os.walk(directory)
+                   for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    if limit and len(paths) > limit:
+        rng = np.random.default_rng(seed)
+        paths = [paths[i] for i in sorted(rng.choice(len(paths), limit, replace=False))]
+    faces = [face for face in (cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths) if face is not None]
+    if not faces:
+        raise ValueError(f"No readable images under {directory}")
+    return faces
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, model_path):
+        start = time.perf_counter()
+        load_model = _import_load_model()
+        loaded = time.perf_counter()
+        self.model = load_model(model_path, compile=False)
+        self.input_shape = tuple(self.model.input_shape[1:3])
+        self.load_timings = _load_timings(start, loaded)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+    def warmup(self, max_batch_size=1):
+        h, w = self.input_shape
+        for n in sorted({1, max_batch_size}):
+            self.predict(np.zeros((n, h, w, 1), dtype=np.float32))
+
+
+class DirectCallBackend(KerasBackend):
+    name = "direct"
+
+    def predict(self, batch):
+        return np.asarray(self.model(batch, training=False))
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, model_path):
+        start = time.perf_counter()
+        Interpreter = self._import_interpreter()
+        loaded = time.perf_counter()
+        self.interpreter = Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        shape = self.interpreter.get_input_details()[0]["shape"]
+        self.input_shape = (int(shape[1]), int(shape[2]))
+        self.batch_size = int(shape[0])
+        self.load_timings = _load_timings(start, loaded)
+
+    @staticmethod
+    def _import_interpreter():
+        try:
+            from tflite_runtime.interpreter import Interpreter
+            return Interpreter
+        except ImportError:
+            pass
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+            return Interpreter
+        except ImportError:
+            pass
+        import tensorflow as tf
+        return tf.lite.Interpreter
+
+    def predict(self, batch):
+        n = batch.shape[0]
+        if n != self.batch_size:
+            h, w = self.input_shape
+            self.interpreter.resize_tensor_input(self.input_index, [n, h, w, 1])
+            self.interpreter.allocate_tensors()
+            self.batch_size = n
+        self.interpreter.set_tensor(self.input_index, np.ascontiguousarray(batch, dtype=np.float32))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+    def warmup(self, max_batch_size=1):
+        h, w = self.input_shape
+        for n in sorted({max_batch_size, 1}, reverse=True):
+            self.predict(np.zeros((n, h, w, 1), dtype=np.float32))
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_path):
+        start = time.perf_counter()
+        import onnxruntime as ort
+        loaded = time.perf_counter()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = (int(model_input.shape[1]), int(model_input.shape[2]))
+        self.load_timings = _load_timings(start, loaded)
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+    def warmup(self, max_batch_size=1):
+        h, w = self.input_shape
+        for n in sorted({1, max_batch_size}):
+            self.predict(np.zeros((n, h, w, 1), dtype=np.float32))
+
+
+BACKEND_CLASSES = {
+    "keras": KerasBackend,
+    "direct": DirectCallBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+    "tflite-float16": TFLiteBackend,
+    "tflite-int8": TFLiteBackend,
+    "onnx-int8": OnnxBackend,
+}
+
+
+def load_backend(name, model_path):
+    """Load `name` for the given .hdf5 path (converted siblings for tflite/onnx)"""
+    if name not in BACKEND_CLASSES:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {', '.join(BACKENDS)}")
+    if name in MODEL_EXTENSIONS:
+        converted = converted_model_path(model_path, name)
+        if not os.path.isfile(converted):
+            calibration = " --calibration FACES_DIR" if name in CALIBRATED else ""
+            raise FileNotFoundError(
+                f"{converted} not found; run: python inference_backends.py convert --to {name}{calibration}")
+        model_path = converted
+    return BACKEND_CLASSES[name](model_path)
+
+
+# -------------------------------
+# Offline conversion
+# -------------------------------
+def convert_model(model_path, target, output_path=None, calibration=None):
+    """Write the `target` variant of model_path; int8 targets need `calibration` gray face crops"""
+    if target not in MODEL_EXTENSIONS:
+        raise ValueError(f"Cannot convert to '{target}', expected one of {', '.join(MODEL_EXTENSIONS)}")
+    if target in CALIBRATED and calibration is None:
+        raise ValueError(f"{target} needs a calibration set (--calibration FACES_DIR)")
+    output_path = output_path or converted_model_path(model_path, target)
+
+    if target == "onnx-int8":
+        _quantize_onnx(model_path, output_path, calibration)
+        print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1024:.1f} KB)", file=sys.stderr)
+        return output_path
+
+    load_model = _import_load_model()
+    model = load_model(model_path, compile=False)
+
+    if target.startswith("tflite"):
+        import tensorflow as tf
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        calibration = normalize_faces(calibration, model.input_shape[1:3]) if calibration is not None else None
+        if target == "tflite-float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif target == "tflite-int8":
+            # Full integer kernels; input/output stay float32 so TFLiteBackend feeds it unchanged
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda: ([face[np.newaxis]] for face in calibration)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        with open(output_path, "wb") as f:
+            f.write(converter.convert())
+    else:
+        import tensorflow as tf
+        import tf2onnx
+        h, w = model.input_shape[1:3]
+        signature = (tf.TensorSpec((None, h, w, 1), tf.float32, name="input"),)
+        # Keras 3 models lack the attributes tf2onnx reads; trace through a tf.function instead
+        traced = tf.function(lambda x: model(x, training=False), input_signature=signature)
+        tf2onnx.convert.from_function(traced, input_signature=signature, opset=13, output_path=output_path)
+
+    print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1024:.1f} KB)", file=sys.stderr)
+    return output_path
+
+
+def _quantize_onnx(model_path, output_path, calibration):
+    """Static int8 (QDQ) quantization of the float ONNX model, converting it first if needed"""
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    float_path = converted_model_path(model_path, "onnx")
+    if not os.path.isfile(float_path):
+        convert_model(model_path, "onnx", float_path)
+
+    class FaceReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.samples = iter([{input_name: face[np.newaxis]} for face in calibration])
+
+        def get_next(self):
+            return next(self.samples, None)
+
+    import onnxruntime as ort
+    model_input = ort.InferenceSession(float_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+    calibration = normalize_faces(calibration, model_input.shape[1:3])
+    quantize_static(float_path, output_path, FaceReader(model_input.name), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def verify_backend(model_path, backend, samples=256, batch_size=32, seed=0, atol=PARITY_ATOL):
+    """Compare a backend against Keras on random normalized faces; returns max abs diff"""
+    baseline = KerasBackend(model_path)
+    candidate = load_backend(backend, model_path)
+    h, w = baseline.input_shape
+    rng = np.random.default_rng(seed)
+    faces = rng.uniform(-1.0, 1.0, size=(samples, h, w, 1)).astype(np.float32)
+
+    max_diff = 0.0
+    agree = 0
+    for start in range(0, samples, batch_size):
+        batch = faces[start:start + batch_size]
+        expected = baseline.predict(batch)
+        actual = candidate.predict(batch)
+        max_diff = max(max_diff, float(np.max(np.abs(expected - actual))))
+        agree += int(np.sum(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+
+    print(f"{backend}: max |p - p_keras| = {max_diff:.2e} (tolerance {atol:.0e}), "
+          f"argmax agreement {agree}/{samples}", file=sys.stderr)
+    return max_diff
+
+
+def _default_model_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "emotionModel.hdf5")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert and verify emotion model inference backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert_cmd = sub.add_parser("convert", help="convert emotionModel.hdf5 for a lightweight runtime")
+    convert_cmd.add_argument("--to", choices=sorted(MODEL_EXTENSIONS), required=True)
+    convert_cmd.add_argument("--model", default=_default_model_path())
+    convert_cmd.add_argument("--output", default=None)
+    convert_cmd.add_argument("--calibration", help="folder of face images for int8 calibration")
+    convert_cmd.add_argument("--calibration-size", type=int, default=500,
+                             help="images sampled from --calibration")
+
+    verify_cmd = sub.add_parser("verify", help="check a backend against the Keras baseline")
+    verify_cmd.add_argument("--backend", choices=BACKENDS, required=True)
+    verify_cmd.add_argument("--model", default=_default_model_path())
+    verify_cmd.add_argument("--samples", type=int, default=256)
+    verify_cmd.add_argument("--atol", type=float, default=PARITY_ATOL,
+                            help="allowed max abs probability difference (raise it for quantized variants)")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        calibration = None
+        if args.calibration:
+            calibration = load_face_images(args.calibration, limit=args.calibration_size)
+            print(f"Calibrating on {len(calibration)} faces from {args.calibration}", file=sys.stderr)
+        convert_model(args.model, args.to, args.output, calibration)
+    else:
+        start = time.perf_counter()
+        diff = verify_backend(args.model, args.backend, samples=args.samples, atol=args.atol)
+        print(f"Verified in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        sys.exit(0 if diff <= args.atol else 1)
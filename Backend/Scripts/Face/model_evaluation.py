@@ -0,0 +1,203 @@
+"""
+Accuracy / latency / size comparison of the emotion model's inference backends.
+
+  python model_evaluation.py faces/test --backends keras tflite tflite-float16 tflite-int8
+  python model_evaluation.py faces/test --per-class 200 --report evaluation.json
+
+The test folder holds one sub-folder of face images per emotion, named after
+EMOTIONS in emotion_analysis.py (case-insensitive, e.g. the FER2013 folder
+layout: angry/ disgust/ fear/ happy/ neutral/ sad/ surprise/). Faces are
+normalized exactly as EmotionAnalyzerAPI does before every backend sees them.
+
+The first backend is the baseline. For every backend the report holds overall
+and per-class accuracy (recall), the confusion matrix (rows: true emotion,
+columns: predicted), argmax agreement and probability difference against the
+baseline, per-face latency both batched (--batch) and one face per call, the
+model file size and its load timings. The table goes to stderr, the JSON
+report to stdout or --report.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+import cv2
+
+from inference_backends import BACKENDS, IMAGE_EXTENSIONS, backend_model_path, load_backend, normalize_faces
+from emotion_analysis import EMOTION_NAMES
+
+
+# -------------------------------
+# Labeled test set
+# -------------------------------
+def load_labeled_faces(directory, per_class=None, seed=0):
+    """(gray face crops, labels (N,)) from <directory>/<emotion>/*.png"""
+    labels_by_name = {name.lower(): i for i, name in enumerate(EMOTION_NAMES)}
+    rng = np.random.default_rng(seed)
+    crops, labels = [], []
+    for entry in sorted(os.listdir(directory)):
+        class_dir = os.path.join(directory, entry)
+        if not os.path.isdir(class_dir):
+            continue
+        if entry.lower() not in labels_by_name:
+            print(f"WARNING: skipping {class_dir} (not an emotion name)", file=sys.stderr)
+            continue
+        paths = sorted(os.path.join(root, name) for root, _, files in os.walk(class_dir)
+                       for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+        if per_class and len(paths) > per_class:
+            paths = [paths[i] for i in sorted(rng.choice(len(paths), per_class, replace=False))]
+        for path in paths:
+            face = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if face is not None:
+                crops.append(face)
+                labels.append(labels_by_name[entry.lower()])
+    if not crops:
+        raise ValueError(f"No labeled face images under {directory}")
+    return crops, np.asarray(labels)
+
+
+# -------------------------------
+# Evaluation
+# -------------------------------
+def predict_all(backend, faces, batch_size):
+    """Class probabilities for every face plus the total seconds spent in predict()"""
+    outputs = []
+    elapsed = 0.0
+    for start in range(0, len(faces), batch_size):
+        batch = faces[start:start + batch_size]
+        started = time.perf_counter()
+        outputs.append(np.asarray(backend.predict(batch), dtype=np.float32))
+        elapsed += time.perf_counter() - started
+    return np.concatenate(outputs), elapsed
+
+
+def single_face_latencies(backend, faces, samples):
+    """Seconds per predict() call with one face, as in a live single-user stream"""
+    latencies = []
+    for face in faces[:samples]:
+        started = time.perf_counter()
+        backend.predict(face[np.newaxis])
+        latencies.append(time.perf_counter() - started)
+    return np.asarray(latencies)
+
+
+def confusion_matrix(labels, predicted, classes):
+    return np.bincount(labels * classes + predicted, minlength=classes * classes).reshape(classes, classes)
+
+
+def evaluate_backend(name, model_path, crops, labels, batch_size=32, single_samples=200, baseline=None):
+    """Metrics for one backend; `baseline` is the baseline's probabilities (None for the baseline itself)"""
+    backend = load_backend(name, model_path)
+    faces = normalize_faces(crops, backend.input_shape)
+    backend.warmup(batch_size)
+    probabilities, elapsed = predict_all(backend, faces, batch_size)
+    single = single_face_latencies(backend, faces, single_samples)
+
+    predicted = np.argmax(probabilities, axis=1)
+    classes = len(EMOTION_NAMES)
+    matrix = confusion_matrix(labels, predicted, classes)
+    support = matrix.sum(axis=1)
+    per_class = {EMOTION_NAMES[i]: {"faces": int(support[i]),
+                                    "accuracy": round(float(matrix[i, i] / support[i]), 4)}
+                 for i in range(classes) if support[i]}
+
+    path = backend_model_path(name, model_path)
+    result = {
+        "backend": name,
+        "model": os.path.basename(path),
+        "model_size_kb": round(os.path.getsize(path) / 1024, 1),
+        "load_timings": getattr(backend, "load_timings", {}),
+        "faces": int(len(labels)),
+        "accuracy": round(float(np.mean(predicted == labels)), 4),
+        "per_class": per_class,
+        "confusion_matrix": matrix.tolist(),
+        "latency_ms": {
+            "batched_per_face": round(elapsed / len(faces) * 1000, 3),
+            "batch_size": batch_size,
+            "single_face_p50": round(float(np.percentile(single, 50)) * 1000, 3) if len(single) else None,
+            "single_face_p95": round(float(np.percentile(single, 95)) * 1000, 3) if len(single) else None,
+        },
+    }
+    if baseline is not None:
+        difference = np.abs(probabilities - baseline)
+        result["baseline_agreement"] = round(float(np.mean(predicted == np.argmax(baseline, axis=1))), 4)
+        result["max_probability_diff"] = round(float(difference.max()), 5)
+        result["mean_probability_diff"] = round(float(difference.mean()), 5)
+    return result, probabilities
+
+
+def evaluate(names, model_path, crops, labels, batch_size=32, single_samples=200):
+    """Evaluate every backend in turn, the first being the baseline"""
+    results = []
+    baseline = None
+    for name in names:
+        print(f"Evaluating {name} on {len(labels)} faces...", file=sys.stderr)
+        try:
+            result, probabilities = evaluate_backend(name, model_path, crops, labels, batch_size,
+                                                     single_samples, baseline)
+        except Exception as e:
+            print(f"ERROR: {name}: {e}", file=sys.stderr)
+            results.append({"backend": name, "error": str(e)})
+            continue
+        if baseline is None:
+            baseline = probabilities
+        results.append(result)
+    return results
+
+
+def print_comparison(results):
+    print("\n" + "=" * 98, file=sys.stderr)
+    print(f"{'backend':<16}{'accuracy':>10}{'agreement':>11}{'max diff':>10}"
+          f"{'batch ms/face':>15}{'single p50':>12}{'single p95':>12}{'size KB':>12}", file=sys.stderr)
+    print("-" * 98, file=sys.stderr)
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<16}  FAILED: {r['error']}", file=sys.stderr)
+            continue
+        latency = r["latency_ms"]
+        agreement = f"{r['baseline_agreement']:.2%}" if "baseline_agreement" in r else "baseline"
+        max_diff = f"{r['max_probability_diff']:.4f}" if "max_probability_diff" in r else "-"
+        print(f"{r['backend']:<16}{r['accuracy']:>10.2%}{agreement:>11}{max_diff:>10}"
+              f"{latency['batched_per_face']:>15.3f}{latency['single_face_p50'] or 0:>12.3f}"
+              f"{latency['single_face_p95'] or 0:>12.3f}{r['model_size_kb']:>12.1f}", file=sys.stderr)
+    print("-" * 98, file=sys.stderr)
+    scored = [r for r in results if "per_class" in r]
+    print(f"{'accuracy by class':<18}" + "".join(f"{r['backend']:>16}" for r in scored), file=sys.stderr)
+    for emotion in EMOTION_NAMES:
+        cells = [r["per_class"].get(emotion) for r in scored]
+        if any(cells):
+            print(f"  {emotion:<16}" + "".join(f"{c['accuracy']:>16.2%}" if c else f"{'-':>16}" for c in cells),
+                  file=sys.stderr)
+    print("=" * 98, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare emotion model backends on a labeled face folder")
+    parser.add_argument("test_dir", help="folder with one sub-folder of face images per emotion")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS,
+                        default=["keras", "tflite", "tflite-float16", "tflite-int8"],
+                        help="backends to evaluate; the first is the baseline")
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        "emotionModel.hdf5"))
+    parser.add_argument("--per-class", type=int, help="sample at most this many images per emotion")
+    parser.add_argument("--batch", type=int, default=32, help="faces per predict() call for batched latency")
+    parser.add_argument("--single-samples", type=int, default=200,
+                        help="faces timed one per predict() call (0 skips single-face latency)")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    crops, labels = load_labeled_faces(args.test_dir, args.per_class)
+    results = evaluate(args.backends, args.model, crops, labels, args.batch, args.single_samples)
+    print_comparison(results)
+
+    report = {"test_dir": args.test_dir, "faces": int(len(labels)), "emotions": EMOTION_NAMES,
+              "results": results}
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if any("error" in r for r in results) else 0)
@@ -0,0 +1,59 @@
+"""
+Level-controlled, rate-limited logging for the per-frame hot path.
+
+Per-face and per-frame messages are logged at DEBUG, so at the default INFO
+level they cost one isEnabledFor() check. Anything that does get through is
+limited to one message per `interval` seconds for each call site (logger and
+message template); the next message that passes reports how many similar
+ones were suppressed, so a flood of identical errors cannot stall the worker
+on console I/O.
+"""
+
+import sys
+import time
+import logging
+import threading
+
+LOG_FORMAT = "[%(asctime)s] %(levelname)s %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, interval=1.0):
+        super().__init__()
+        self.interval = interval
+        self.last_emitted = {}  # (logger name, message template) -> monotonic time
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.interval <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_emitted.get(key)
+            if last is not None and now - last < self.interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            self.last_emitted[key] = now
+            suppressed = self.suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+def configure_logging(level="INFO", interval=1.0, loggers=("emotion_analysis",), stream=None):
+    """Send log records to stderr, rate limited per call site.
+
+    `level` applies to the worker's own `loggers`; third-party libraries
+    (TensorFlow, absl) stay at WARNING so DEBUG does not flood the console.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, "%H:%M:%S"))
+    handler.addFilter(RateLimitFilter(interval))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.WARNING)
+    for name in loggers:
+        logging.getLogger(name).setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    return root
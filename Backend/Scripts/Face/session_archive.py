@@ -0,0 +1,308 @@
+"""
+Append-only on-disk archive of emotion sessions.
+
+Each writer process owns a segment directory under the archive root holding
+one fixed-width binary file per column (the same rows EmotionHistory keeps in
+memory, plus the session they belong to):
+
+  session.u4     index into the segment's sessions.jsonl
+  frame.u4       frame number within the session
+  timestamp.f8   unix seconds
+  face_count.i2  faces detected in the frame
+  emotion.i1     emotion index, -1 for a frame with no accepted detection
+  confidence.f4  classifier confidence
+
+sessions.jsonl has one line per session, followed by update lines carrying
+the same index when a user id only arrives after the session's first frame;
+readers merge them.
+
+Rows are buffered in preallocated NumPy arrays and appended to the column
+files in bulk, so recording a frame costs a few array stores. Readers
+memory-map the columns and scan them in chunks, so weekly or cross-session
+queries over months of data never load whole columns into RAM. If a writer
+dies mid-flush, columns can differ in length; readers use the shortest.
+
+  python session_archive.py ARCHIVE_DIR sessions [--user U]
+  python session_archive.py ARCHIVE_DIR weekly [--user U]
+  python session_archive.py ARCHIVE_DIR trends [--user U]
+  python session_archive.py ARCHIVE_DIR report SESSION_ID
+"""
+
+import os
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from emotion_history import NO_EMOTION
+
+COLUMNS = (
+    ("session", np.uint32),
+    ("frame", np.uint32),
+    ("timestamp", np.float64),
+    ("face_count", np.int16),
+    ("emotion", np.int8),
+    ("confidence", np.float32),
+)
+COLUMN_SUFFIX = {np.dtype(np.uint32): "u4", np.dtype(np.float64): "f8", np.dtype(np.int16): "i2",
+                 np.dtype(np.int8): "i1", np.dtype(np.float32): "f4"}
+SESSIONS_FILE = "sessions.jsonl"
+SECONDS_PER_WEEK = 7 * 24 * 3600
+CHUNK_ROWS = 1 << 20
+
+
+def column_path(segment_dir, name, dtype):
+    return os.path.join(segment_dir, f"{name}.{COLUMN_SUFFIX[np.dtype(dtype)]}")
+
+
+# -------------------------------
+# Writer
+# -------------------------------
+class SessionArchiveWriter:
+    def __init__(self, root, buffer_rows=4096, flush_interval=10.0):
+        self.root = root
+        self.segment_dir = os.path.join(root, f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.buffer_rows = buffer_rows
+        self.flush_interval = flush_interval
+        self.buffers = {name: np.empty(buffer_rows, dtype=dtype) for name, dtype in COLUMNS}
+        self.files = {name: open(column_path(self.segment_dir, name, dtype), "ab") for name, dtype in COLUMNS}
+        self.sessions_file = open(os.path.join(self.segment_dir, SESSIONS_FILE), "a", encoding="utf-8")
+        self.session_count = 0
+        self.rows = 0
+        self.last_flush = time.monotonic()
+
+    def register_session(self, session_id, start_time, user_id=None):
+        """Give a session its index in this segment; written through immediately"""
+        index = self.session_count
+        self.session_count += 1
+        self.sessions_file.write(json.dumps({"index": index, "session_id": session_id,
+                                             "user_id": user_id, "start_time": start_time}) + "\n")
+        self.sessions_file.flush()
+        return index
+
+    def update_session(self, session_index, user_id):
+        """Record a user id that arrived after the session was registered (appended, merged on read)"""
+        self.sessions_file.write(json.dumps({"index": session_index, "user_id": user_id}) + "\n")
+        self.sessions_file.flush()
+
+    def append_frame(self, session_index, frame_number, face_count, detections, timestamp=None):
+        """Record one frame (one row per detection, or a single NO_EMOTION row)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for emotion, confidence in detections or ((NO_EMOTION, 0.0),):
+            if self.rows == self.buffer_rows:
+                self.flush()
+            i = self.rows
+            self.buffers["session"][i] = session_index
+            self.buffers["frame"][i] = frame_number
+            self.buffers["timestamp"][i] = timestamp
+            self.buffers["face_count"][i] = face_count
+            self.buffers["emotion"][i] = emotion
+            self.buffers["confidence"][i] = confidence
+            self.rows += 1
+
+    def flush(self):
+        if self.rows:
+            for name, _ in COLUMNS:
+                self.files[name].write(self.buffers[name][:self.rows].tobytes())
+                self.files[name].flush()
+            self.rows = 0
+        self.last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        if self.rows and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        self.sessions_file.close()
+
+
+# -------------------------------
+# Reader
+# -------------------------------
+class Segment:
+    def __init__(self, segment_dir):
+        self.segment_dir = segment_dir
+        records = {}
+        sessions_path = os.path.join(segment_dir, SESSIONS_FILE)
+        if os.path.isfile(sessions_path):
+            with open(sessions_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records.setdefault(record["index"], {}).update(record)
+        self.sessions = [records[i] for i in sorted(records)]
+
+        sizes = []
+        for name, dtype in COLUMNS:
+            path = column_path(segment_dir, name, dtype)
+            sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.isfile(path) else 0)
+        self.rows = min(sizes)
+        self.columns = {}
+        if self.rows:
+            for name, dtype in COLUMNS:
+                self.columns[name] = np.memmap(column_path(segment_dir, name, dtype), dtype=dtype,
+                                               mode="r", shape=(self.rows,))
+
+    def chunks(self, chunk_rows=CHUNK_ROWS):
+        """Yield {column: array} slices of at most chunk_rows rows"""
+        for start in range(0, self.rows, chunk_rows):
+            yield {name: column[start:start + chunk_rows] for name, column in self.columns.items()}
+
+
+class SessionArchiveReader:
+    def __init__(self, root, emotion_names):
+        self.root = root
+        self.emotion_names = list(emotion_names)
+        self.segments = [Segment(os.path.join(root, name)) for name in sorted(os.listdir(root))
+                         if name.startswith("segment-") and os.path.isdir(os.path.join(root, name))]
+
+    def sessions(self, user_id=None):
+        """[(segment, session record)] ordered by start time"""
+        found = [(segment, record) for segment in self.segments for record in segment.sessions
+                 if user_id is None or record.get("user_id") == user_id]
+        return sorted(found, key=lambda item: item[1]["start_time"])
+
+    def _session_mask(self, segment, user_id):
+        if user_id is None:
+            return None
+        selected = np.zeros(max(len(segment.sessions), 1), dtype=bool)
+        for record in segment.sessions:
+            selected[record["index"]] = record.get("user_id") == user_id
+        return selected
+
+    def _percentages(self, counts):
+        total = int(counts.sum())
+        if not total:
+            return {}
+        return {self.emotion_names[i]: round(int(n) / total * 100, 2) for i, n in enumerate(counts) if n}
+
+    def weekly_distribution(self, user_id=None):
+        """{week starting Monday (ISO date): {"detections", "emotion_percentages"}}"""
+        num_emotions = len(self.emotion_names)
+        # Unix epoch was a Thursday; shift so weeks start on Monday 00:00 UTC
+        monday_offset = 3 * 24 * 3600
+        counts = {}
+        for segment in self.segments:
+            selected = self._session_mask(segment, user_id)
+            for chunk in segment.chunks():
+                mask = chunk["emotion"] != NO_EMOTION
+                if selected is not None:
+                    mask &= selected[np.minimum(chunk["session"], len(selected) - 1)]
+                if not mask.any():
+                    continue
+                weeks = ((chunk["timestamp"][mask] + monday_offset) // SECONDS_PER_WEEK).astype(np.int64)
+                emotions = chunk["emotion"][mask].astype(np.int64)
+                first = int(weeks.min())
+                flat = np.bincount((weeks - first) * num_emotions + emotions)
+                flat = np.pad(flat, (0, -len(flat) % num_emotions)).reshape(-1, num_emotions)
+                for offset in np.flatnonzero(flat.sum(axis=1)):
+                    week = first + int(offset)
+                    counts[week] = counts.get(week, np.zeros(num_emotions, dtype=np.int64)) + flat[offset]
+
+        result = {}
+        for week in sorted(counts):
+            start = datetime.fromtimestamp(week * SECONDS_PER_WEEK - monday_offset, timezone.utc).date().isoformat()
+            result[start] = {"detections": int(counts[week].sum()),
+                             "emotion_percentages": self._percentages(counts[week])}
+        return result
+
+    def session_summaries(self, user_id=None):
+        """Per-session distribution and confidence, ordered by start time"""
+        num_emotions = len(self.emotion_names)
+        summaries = []
+        for segment in self.segments:
+            n = max(len(segment.sessions), 1)
+            counts = np.zeros((n, num_emotions), dtype=np.int64)
+            frames = np.zeros(n, dtype=np.int64)
+            confidence = np.zeros(n, dtype=np.float64)
+            last_seen = np.zeros(n, dtype=np.float64)
+            for chunk in segment.chunks():
+                sessions = chunk["session"].astype(np.int64)
+                valid = sessions < n
+                sessions, emotion = sessions[valid], chunk["emotion"][valid]
+                np.maximum.at(last_seen, sessions, chunk["timestamp"][valid])
+                # Frames with several faces have several rows; count each frame once
+                new_frame = np.ones(len(sessions), dtype=bool)
+                new_frame[1:] = (sessions[1:] != sessions[:-1]) | (chunk["frame"][valid][1:] != chunk["frame"][valid][:-1])
+                frames += np.bincount(sessions[new_frame], minlength=n)
+                detected = emotion != NO_EMOTION
+                np.add.at(counts, (sessions[detected], emotion[detected].astype(np.int64)), 1)
+                confidence += np.bincount(sessions[detected], weights=chunk["confidence"][valid][detected],
+                                          minlength=n)
+            for record in segment.sessions:
+                if user_id is not None and record.get("user_id") != user_id:
+                    continue
+                i = record["index"]
+                total = int(counts[i].sum())
+                summaries.append({
+                    "session_id": record["session_id"],
+                    "user_id": record.get("user_id"),
+                    "start_time": datetime.fromtimestamp(record["start_time"]).isoformat(),
+                    "session_duration": round(max(0.0, last_seen[i] - record["start_time"]), 2) if last_seen[i] else 0.0,
+                    "total_frames": int(frames[i]),
+                    "total_faces_detected": total,
+                    "dominant_emotion": self.emotion_names[int(np.argmax(counts[i]))] if total else "No data",
+                    "emotion_percentages": self._percentages(counts[i]),
+                    "mean_confidence": round(confidence[i] / total, 3) if total else None,
+                })
+        return sorted(summaries, key=lambda s: s["start_time"])
+
+    def session_report(self, session_id):
+        """generate_report()-style summary of an archived session (latest one with that id)"""
+        matches = [s for s in self.session_summaries() if s["session_id"] == session_id]
+        return matches[-1] if matches else None
+
+    def trends(self, user_id=None):
+        """Per-emotion share across sessions and its linear trend (percentage points per session)"""
+        summaries = [s for s in self.session_summaries(user_id) if s["total_faces_detected"]]
+        shares = np.array([[s["emotion_percentages"].get(name, 0.0) for name in self.emotion_names]
+                           for s in summaries]).reshape(len(summaries), len(self.emotion_names))
+        slopes = {}
+        if len(summaries) >= 2:
+            x = np.arange(len(summaries), dtype=np.float64)
+            fitted = np.polyfit(x, shares, 1)[0]
+            slopes = {name: round(float(slope), 3) + 0.0 for name, slope in zip(self.emotion_names, fitted)}
+        return {
+            "sessions": len(summaries),
+            "slope_per_session": slopes,
+            "first_session": summaries[0]["start_time"] if summaries else None,
+            "last_session": summaries[-1]["start_time"] if summaries else None,
+            "per_session": [{"session_id": s["session_id"], "start_time": s["start_time"],
+                             "dominant_emotion": s["dominant_emotion"],
+                             "emotion_percentages": s["emotion_percentages"]} for s in summaries],
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query an emotion session archive")
+    parser.add_argument("archive_dir")
+    parser.add_argument("query", choices=("sessions", "weekly", "trends", "report"))
+    parser.add_argument("session_id", nargs="?", help="session to report on (for 'report')")
+    parser.add_argument("--user", help="only sessions recorded for this user id")
+    args = parser.parse_args()
+
+    # Same order as EMOTIONS in emotion_analysis.py (not imported: it pulls in OpenCV and the backends)
+    names = ["Angry", "Disgust", "Fear", "Happy", "Sad", "Surprise", "Neutral"]
+    reader = SessionArchiveReader(args.archive_dir, names)
+    if args.query == "sessions":
+        output = reader.session_summaries(args.user)
+    elif args.query == "weekly":
+        output = reader.weekly_distribution(args.user)
+    elif args.query == "trends":
+        output = reader.trends(args.user)
+    else:
+        if not args.session_id:
+            parser.error("report needs a SESSION_ID")
+        output = reader.session_report(args.session_id)
+        if output is None:
+            print(f"Session {args.session_id!r} not found", file=sys.stderr)
+            sys.exit(1)
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,326 @@
+"""
+Multi-process emotion analysis with shared-memory frames.
+
+The dispatcher (the emotion_analysis.py process) only routes: it copies each
+frame as it arrived (data-URL text or JPEG/PNG bytes; an already decoded
+grayscale array as is) into a slot of a shared-memory block owned by one
+worker process and sends only (slot, length, format, session) over a queue,
+so frame data is never pickled. Each worker decodes its own frames, loads its
+own model and runs the normal handle_messages() batch path on whatever is
+waiting in its queue.
+
+Sessions stick to the worker that saw them first (least-loaded at that
+moment), so per-session state (history, tracker) lives in exactly one
+process. Messages wait in a per-worker backlog until that worker has a free
+slot, so a busy worker never holds up frames for the others; a frame still
+in the backlog is replaced by a newer one from the same session (unless all
+frames are kept). Each backlog and worker queue is in order, which keeps
+results and report/close answers in order per session.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import multiprocessing as mp
+from collections import deque, defaultdict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import emotion_analysis as ea
+
+DEFAULT_SLOTS = 4
+DEFAULT_SLOT_BYTES = 1920 * 1080  # an encoded frame, or a decoded 1080p grayscale one
+
+
+# -------------------------------
+# Worker process
+# -------------------------------
+def _read_slot(buffer, message):
+    """Turn a slot reference back into a frame, decoding it here rather than in the dispatcher"""
+    slot, length, frame_format = message.pop("slot"), message.pop("length"), message.pop("format")
+    data = buffer[slot, :length]
+    if frame_format == "gray":
+        # A view into shared memory; the slot is not reused until we hand it back
+        return data.reshape(message.pop("height"), message.pop("width"))
+    if frame_format == "data_url":
+        return data.tobytes().decode("ascii")  # analyze_frames decodes (and times) it
+    started = time.perf_counter()
+    try:
+        frame = ea.decode_gray(data)
+    except Exception:
+        frame = None
+    message["decode_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return frame
+
+
+def _worker_main(worker_id, shm_name, slots, slot_bytes, tasks, results, analyzer_kwargs, log_level, log_interval):
+    ea.configure_logging(log_level, log_interval)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    analyzer = None
+    try:
+        start = time.perf_counter()
+        analyzer = ea.EmotionAnalyzerAPI(**analyzer_kwargs)
+        results.put(("ready", worker_id, {"pid": os.getpid(),
+                                          "startup_ms": round((time.perf_counter() - start) * 1000, 1),
+                                          **analyzer.startup_timings}))
+        poll_interval = min(analyzer.session_timeout, 5.0)
+        done = False
+        while not done:
+            try:
+                batch = [tasks.get(timeout=poll_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < analyzer.max_batch_size:
+                try:
+                    batch.append(tasks.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is None:
+                batch.pop()
+                done = True
+
+            used_slots = []
+            for message in batch:
+                if message.get("type") == "frame" and "slot" in message:
+                    used_slots.append(message["slot"])
+                    message["frame"] = _read_slot(buffer, message)
+
+            outputs = ea.handle_messages(analyzer, batch)
+            for session_id, final_report in analyzer.evict_idle_sessions().items():
+                outputs.append({"type": "evicted", "success": True,
+                                "session_id": session_id, "final_report": final_report})
+            for message in batch:
+                message.pop("frame", None)
+            if analyzer.archive is not None:
+                analyzer.archive.flush_if_due()
+            if outputs or used_slots:
+                results.put(("results", worker_id, used_slots, outputs))
+    except Exception as e:
+        results.put(("failed", worker_id, str(e)))
+    finally:
+        if analyzer is not None:
+            for session_id in list(analyzer.sessions):
+                analyzer.print_terminal_report(is_final=True, session_id=session_id)
+            analyzer.close_archive()
+        del buffer
+        shm.close()
+        results.put(("exited", worker_id))
+
+
+# -------------------------------
+# Dispatcher
+# -------------------------------
+class FramePool:
+    def __init__(self, num_workers, analyzer_kwargs, slots_per_worker=DEFAULT_SLOTS,
+                 slot_bytes=DEFAULT_SLOT_BYTES, drop_stale=True, log_level="INFO", log_interval=1.0):
+        context = mp.get_context("spawn")  # never fork a process that may hold TensorFlow state
+        self.num_workers = num_workers
+        self.slots_per_worker = slots_per_worker
+        self.slot_bytes = slot_bytes
+        self.drop_stale = drop_stale
+        self.results = context.Queue()
+        self.workers = []
+        self.memory = []
+        self.buffers = []
+        self.tasks = []
+        self.free_slots = []
+        self.backlog = []  # per worker: messages waiting for a free slot, in order
+        self.session_worker = {}  # session_id -> worker index (sticky)
+        self.load = [0] * num_workers  # sessions per worker
+        self.dropped = defaultdict(int)  # session_id -> frames replaced while in the backlog
+        self.ready = {}
+        self.exited = set()
+
+        for worker_id in range(num_workers):
+            shm = shared_memory.SharedMemory(create=True, size=slots_per_worker * slot_bytes)
+            self.memory.append(shm)
+            self.buffers.append(np.ndarray((slots_per_worker, slot_bytes), dtype=np.uint8, buffer=shm.buf))
+            self.tasks.append(context.Queue())
+            self.free_slots.append(list(range(slots_per_worker)))
+            self.backlog.append(deque())
+            process = context.Process(target=_worker_main, daemon=True,
+                                      args=(worker_id, shm.name, slots_per_worker, slot_bytes,
+                                            self.tasks[worker_id], self.results, analyzer_kwargs,
+                                            log_level, log_interval))
+            process.start()
+            self.workers.append(process)
+
+    def wait_ready(self):
+        """Block until every worker has loaded its model; returns their startup info"""
+        while len(self.ready) < self.num_workers:
+            message = self.results.get()
+            if message[0] == "ready":
+                self.ready[message[1]] = message[2]
+            elif message[0] in ("failed", "exited"):
+                raise RuntimeError(f"Worker {message[1]} failed to start: {message[2] if len(message) > 2 else ''}")
+        return [self.ready[i] for i in range(self.num_workers)]
+
+    def worker_for(self, session_id):
+        worker_id = self.session_worker.get(session_id)
+        if worker_id is None:
+            worker_id = min(range(self.num_workers), key=lambda i: self.load[i])
+            self.session_worker[session_id] = worker_id
+            self.load[worker_id] += 1
+        return worker_id
+
+    def forget_session(self, session_id):
+        worker_id = self.session_worker.pop(session_id, None)
+        if worker_id is not None:
+            self.load[worker_id] -= 1
+        self.dropped.pop(session_id, None)
+
+    @staticmethod
+    def encode_frame(frame):
+        """(bytes view, format, shape fields) of a frame as the dispatcher received it"""
+        if isinstance(frame, np.ndarray):
+            height, width = frame.shape[:2]
+            return frame.reshape(-1), "gray", {"height": height, "width": width}
+        if isinstance(frame, str):
+            return np.frombuffer(frame.encode("ascii", "replace"), dtype=np.uint8), "data_url", {}
+        return np.frombuffer(frame, dtype=np.uint8), "bytes", {}
+
+    def submit(self, message, emit):
+        """Queue one protocol message for its session's worker without waiting for it.
+
+        Frames are checked against the slot size and wait in the worker's
+        backlog until a slot frees (see dispatch); results are passed to
+        `emit` by collect().
+        """
+        if message.get("type") == "invalid":
+            # A session's worker answers it after that session's earlier frames
+            worker_id = self.session_worker.get(message.get("session_id"))
+            if worker_id is None:
+                emit([ea.invalid_result(message)])
+                return
+        else:
+            worker_id = self.worker_for(message["session_id"])
+        if not self.workers[worker_id].is_alive():
+            raise RuntimeError(f"Analysis worker {worker_id} is not running")
+        if message.get("type") == "frame" and message.get("frame") is not None:
+            data = self.encode_frame(message["frame"])
+            if data[0].size > self.slot_bytes:
+                emit([{"success": False, "session_id": message["session_id"],
+                       "error": f"Frame larger than {self.slot_bytes} bytes"}])
+                return
+            message = dict(message, frame=data)
+
+        backlog = self.backlog[worker_id]
+        if self.drop_stale and message.get("type") == "frame" and backlog:
+            # Latest frame wins, as in LatestFrameQueue: swap a waiting frame of this session in place
+            for waiting in reversed(backlog):
+                if waiting["session_id"] == message["session_id"]:
+                    if waiting.get("type") == "frame":
+                        self.dropped[message["session_id"]] += 1
+                        waiting.clear()
+                        waiting.update(message)
+                        return
+                    break
+        backlog.append(message)
+        self.dispatch(worker_id)
+
+    def dispatch(self, worker_id):
+        """Move backlog messages to the worker while it has free slots"""
+        backlog, free_slots = self.backlog[worker_id], self.free_slots[worker_id]
+        while backlog:
+            message = backlog[0]
+            if message.get("type") == "frame":
+                if message.get("frame") is not None:
+                    if not free_slots:
+                        return
+                    view, frame_format, shape = message["frame"]
+                    slot = free_slots.pop()
+                    self.buffers[worker_id][slot, :view.size] = view
+                    message = dict(message, slot=slot, length=view.size, format=frame_format, **shape)
+                    message.pop("frame")
+                if self.dropped.get(message["session_id"]):
+                    message["dropped_frames"] = message.get("dropped_frames", 0) + self.dropped[message["session_id"]]
+            backlog.popleft()
+            self.tasks[worker_id].put(message)
+
+    def pending(self):
+        """Messages still waiting for a worker slot"""
+        return sum(len(backlog) for backlog in self.backlog)
+
+    def collect(self, emit, block=False, timeout=None):
+        """Pass finished results to `emit`, recycle their slots and refill the workers"""
+        while True:
+            try:
+                message = self.results.get(timeout=timeout) if block else self.results.get_nowait()
+            except queue.Empty:
+                return
+            block = False
+            kind, worker_id = message[0], message[1]
+            if kind == "results":
+                _, _, slots, outputs = message
+                self.free_slots[worker_id].extend(slots)
+                for result in outputs:
+                    if result.get("type") in ("closed", "evicted"):
+                        self.forget_session(result["session_id"])
+                emit(outputs)
+                self.dispatch(worker_id)
+            elif kind == "failed":
+                print(f"ERROR: Analysis worker {worker_id} failed: {message[2]}", file=sys.stderr)
+            elif kind == "exited":
+                self.exited.add(worker_id)
+
+    def close(self, emit):
+        """Finish queued work, let workers print final reports, and release shared memory"""
+        while self.pending() and any(self.workers[i].is_alive() for i, b in enumerate(self.backlog) if b):
+            self.collect(emit, block=True, timeout=1.0)
+        for worker_id, tasks in enumerate(self.tasks):
+            if worker_id not in self.exited:
+                tasks.put(None)
+        while len(self.exited) < self.num_workers:
+            if not any(w.is_alive() for w in self.workers) and self.results.empty():
+                break
+            self.collect(emit, block=True, timeout=1.0)
+        for process in self.workers:
+            process.join(timeout=5)
+        self.buffers = []
+        for shm in self.memory:
+            shm.close()
+            shm.unlink()
+
+
+def run_pool(args, analyzer_kwargs):
+    """Pool-mode main loop: stdin protocol in, JSON lines out (same as single-process mode)"""
+    pool = FramePool(args.workers, analyzer_kwargs, drop_stale=not args.keep_all_frames,
+                     log_level=args.log_level, log_interval=args.log_interval)
+    lines = ea.LatestFrameQueue(maxsize=args.max_queue, drop_stale=not args.keep_all_frames)
+
+    def emit(outputs):
+        for result in outputs:
+            if result.get("type") in ("closed", "evicted"):
+                lines.forget_session(result["session_id"])
+            print(ea.serialize_result(result))
+        sys.stdout.flush()
+
+    try:
+        startup = pool.wait_ready()
+        print(json.dumps({"type": "ready", "pid": os.getpid(), "backend": analyzer_kwargs.get("backend"),
+                          "workers": len(startup), "startup": startup}))
+        sys.stdout.flush()
+
+        if args.binary:
+            ea.start_binary_reader(sys.stdin.buffer, lines, decode=False)
+        else:
+            ea.start_line_reader(sys.stdin, lines)
+
+        while True:
+            try:
+                message = lines.get(timeout=0.01)
+            except queue.Empty:
+                pool.collect(emit)
+                continue
+            if message is None:
+                break
+            pool.submit(message, emit)
+            pool.collect(emit)
+    except KeyboardInterrupt:
+        print("\n>>> Analysis interrupted by user <<<", file=sys.stderr)
+    finally:
+        pool.close(emit)
@@ -0,0 +1,614 @@
+"""
+Batch Sentiment Module
+Vectorized VADER- and TextBlob-compatible scoring for many texts at once
+
+Usage:
+    python batch_sentiment.py --parity [texts.txt|entries.jsonl] [--repeat 20]
+
+Each text is scored whole (VADER's and pattern's rules reach across
+sentence boundaries); below, a "sentence" is one such text. Each whitespace
+token is tokenized once: its VADER form(s) and TextBlob (pattern) form(s)
+are computed on first sight and cached as integer ids into two
+vocabularies. Every lexicon property (valence, booster, negation,
+polarity/subjectivity/intensity, modifier, ...) lives in an array indexed by
+those ids, so VADER's negation, booster, "no", "least", "but" and idiom rules
+and pattern's modifier/negation chaining become NumPy operations over the
+token ids of the whole batch. The result per text is a 10-field component
+tuple (COMPONENT_FIELDS) that TextSentimentAnalyzer._scores_from_components
+turns into scores with VADER's own punctuation emphasis and normalization.
+
+The two places where the originals are not positional are handled per
+text: VADER's "but" rule (it locates values with list.index) when a text
+repeats a valence, and pattern's tokenizer when a text contains
+emoticon-like symbol tokens.
+
+VADER's token cleanup and "but" rule come from test_sentiment (local copies
+of its private helpers). When built, the engine scores SAMPLE_TEXTS and
+compares them with VADER's polarity_scores and pattern's Sentiment, raising
+RuntimeError if a library or lexicon upgrade has broken parity.
+"""
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from vaderSentiment.vaderSentiment import (BOOSTER_DICT, NEGATE, SPECIAL_CASES, C_INCR, N_SCALAR,
+                                           SentimentIntensityAnalyzer)
+from textblob._text import EMOTICONS, PUNCTUATION
+from test_sentiment import get_pattern_sentiment, strip_punc_if_word, vader_but_check
+
+COMPONENT_FIELDS = ("assessments", "polarity_sum", "subjectivity_sum", "valence_sum", "pos_sum",
+                    "neg_sum", "neu_count", "word_count", "exclamations", "questions")
+
+# Words VADER's rules compare against by identity
+VADER_RULE_WORDS = ("no", "or", "nor", "kind", "of", "never", "so", "this", "without", "doubt",
+                    "least", "at", "very", "but")
+VADER_NEGATE = frozenset(NEGATE)
+PATTERN_EMOTICONS = {e.lower(): p for (_, p), emoticons in EMOTICONS.items() for e in emoticons}
+
+
+def _shift(values: np.ndarray, offset: int, valid: np.ndarray, fill=-1) -> np.ndarray:
+    """values[i - offset] where valid, else fill (negative offset looks ahead)"""
+    shifted = np.full_like(values, fill)
+    if offset > 0:
+        shifted[offset:] = values[:-offset]
+    elif offset < 0:
+        shifted[:offset] = values[-offset:]
+    else:
+        shifted[:] = values
+    return np.where(valid, shifted, fill)
+
+
+def _last_before(mask: np.ndarray) -> np.ndarray:
+    """Index of the last True strictly before each position (-1 if none)"""
+    index = np.where(mask, np.arange(len(mask)), -1)
+    last = np.maximum.accumulate(index) if len(index) else index
+    return np.concatenate(([-1], last[:-1])) if len(last) else last
+
+
+class Vocabulary:
+    """Token -> id, with per-id properties kept in growable columns"""
+
+    def __init__(self, columns: Dict[str, Tuple[type, object]]):
+        self.ids: Dict[str, int] = {}
+        self.words: List[str] = []
+        self.defaults = {name: default for name, (_, default) in columns.items()}
+        self.dtypes = {name: dtype for name, (dtype, _) in columns.items()}
+        self.values: Dict[str, List] = {name: [] for name in columns}
+        self._arrays = None
+
+    def add(self, word: str, properties: Dict) -> int:
+        token_id = self.ids.get(word)
+        if token_id is None:
+            token_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+            for name, column in self.values.items():
+                column.append(properties.get(name, self.defaults[name]))
+            self._arrays = None
+        return token_id
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Property arrays, with one extra neutral entry so id -1 (no token) is safe to index"""
+        if self._arrays is None:
+            self._arrays = {name: np.array(column + [self.defaults[name]], dtype=self.dtypes[name])
+                            for name, column in self.values.items()}
+        return self._arrays
+
+
+class TokenTable:
+    """Whitespace token -> id, and each token's VADER / pattern id sequences in flat pools"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.columns = {name: [] for name in ("vader_start", "vader_count", "pattern_start",
+                                              "pattern_count", "symbols")}
+        self.pools = {name: [] for name in ("vader_pool", "upper_pool", "pattern_pool")}
+        self._arrays = None
+
+    def add(self, token: str, vader_ids: List[int], upper: List[bool], pattern_ids: List[int],
+            symbols: bool) -> int:
+        token_id = self.ids[token] = len(self.ids)
+        columns, pools = self.columns, self.pools
+        columns["vader_start"].append(len(pools["vader_pool"]))
+        columns["vader_count"].append(len(vader_ids))
+        columns["pattern_start"].append(len(pools["pattern_pool"]))
+        columns["pattern_count"].append(len(pattern_ids))
+        columns["symbols"].append(symbols)
+        pools["vader_pool"].extend(vader_ids)
+        pools["upper_pool"].extend(upper)
+        pools["pattern_pool"].extend(pattern_ids)
+        self._arrays = None
+        return token_id
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = {name: np.array(values, dtype=bool if name in ("symbols", "upper_pool") else np.int64)
+                            for name, values in {**self.columns, **self.pools}.items()}
+        return self._arrays
+
+    @staticmethod
+    def expand(start: np.ndarray, count: np.ndarray, token_ids: np.ndarray, pool: np.ndarray) -> np.ndarray:
+        """Concatenate pool[start[t]:start[t] + count[t]] for every token id t"""
+        counts = count[token_ids]
+        offsets = np.repeat(start[token_ids] - (np.cumsum(counts) - counts), counts)
+        return pool[offsets + np.arange(len(offsets))]
+
+
+class BatchSentimentEngine:
+    def __init__(self, vader_analyzer: SentimentIntensityAnalyzer = None, pattern_sentiment=None):
+        """Build lexicon arrays from the same VADER and pattern lexicons the per-text scorers use"""
+        self.vader = vader_analyzer or SentimentIntensityAnalyzer()
+        if pattern_sentiment is None:
+            pattern_sentiment = get_pattern_sentiment()
+        self.pattern = pattern_sentiment
+        if dict.__len__(self.pattern) == 0:
+            self.pattern.load()
+
+        self.vader_vocab = Vocabulary({
+            "valence": (np.float64, 0.0), "in_lexicon": (bool, False), "booster": (np.float64, 0.0),
+            "is_booster": (bool, False), "negation": (bool, False)})
+        self.pattern_vocab = Vocabulary({
+            "known": (bool, False), "polarity": (np.float64, 0.0), "subjectivity": (np.float64, 0.0),
+            "intensity": (np.float64, 1.0), "modifier": (bool, False), "negation": (bool, False),
+            "ly": (bool, False), "long": (bool, False), "long_unquoted": (bool, False),
+            "exclamation": (bool, False), "emoticon": (bool, False), "emoticon_polarity": (np.float64, 0.0)})
+        self.rule_ids = {word: self._vader_id(word) for word in VADER_RULE_WORDS}
+        # Idioms and multi-word boosters, as id tuples (words are registered now so ids are stable)
+        self.special_cases = [(tuple(self._vader_id(w) for w in phrase.split()), value)
+                              for phrase, value in SPECIAL_CASES.items() if " " in phrase]
+        self.phrase_boosters = [(tuple(self._vader_id(w) for w in phrase.split()), value)
+                                for phrase, value in BOOSTER_DICT.items() if " " in phrase]
+        self.tokens = TokenTable()
+        self.check_parity(SAMPLE_TEXTS)
+
+    # -------------------------------
+    # Tokenization (once per distinct whitespace token)
+    # -------------------------------
+    def _vader_id(self, word: str) -> int:
+        token_id = self.vader_vocab.ids.get(word)
+        if token_id is not None:
+            return token_id
+        lexicon = self.vader.lexicon
+        return self.vader_vocab.add(word, {
+            "valence": lexicon.get(word, 0.0), "in_lexicon": word in lexicon,
+            "booster": BOOSTER_DICT.get(word, 0.0), "is_booster": word in BOOSTER_DICT,
+            "negation": word in VADER_NEGATE or "n't" in word})
+
+    def _pattern_id(self, word: str) -> int:
+        token_id = self.pattern_vocab.ids.get(word)
+        if token_id is not None:
+            return token_id
+        entry = dict.get(self.pattern, word)
+        properties = {
+            "negation": word in self.pattern.negations, "ly": word.endswith("ly"),
+            "long": len(word) > 2, "long_unquoted": len(word.strip("'")) > 1, "exclamation": word == "!"}
+        if entry is not None and None in entry:
+            p, s, i = entry[None]
+            properties.update(known=True, polarity=p, subjectivity=s, intensity=i,
+                              modifier=any(pos in entry for pos in self.pattern.modifiers))
+        elif word == "(!)":
+            properties.update(emoticon=True, emoticon_polarity=0.0)
+        elif not word.isalpha() and len(word) <= 5 and word not in PUNCTUATION and word in PATTERN_EMOTICONS:
+            properties.update(emoticon=True, emoticon_polarity=PATTERN_EMOTICONS[word])
+        return self.pattern_vocab.add(word, properties)
+
+    def _vader_forms(self, token: str) -> List[str]:
+        """VADER's emoji expansion and punctuation stripping, applied to one whitespace token"""
+        emojis = self.vader.emojis
+        if any(ch in emojis for ch in token):
+            expanded, prev_space = "", True
+            for ch in token:
+                if ch in emojis:
+                    if not prev_space:
+                        expanded += " "
+                    expanded += emojis[ch]
+                    prev_space = False
+                else:
+                    expanded += ch
+                    prev_space = ch == " "
+            words = expanded.split()
+        else:
+            words = [token]
+        return [strip_punc_if_word(word) for word in words]
+
+    def _token_id(self, token: str) -> int:
+        """Id of a whitespace token, tokenizing it for VADER and pattern on first sight"""
+        token_id = self.tokens.ids.get(token)
+        if token_id is None:
+            vader_forms = self._vader_forms(token)
+            pattern_forms = " ".join(self.pattern.tokenizer(token)).split()
+            # pattern's tokenizer re-joins emoticons across spaces ("; -)"), so sentences
+            # with symbol-only tokens are tokenized whole for pattern instead
+            symbols = not any(ch.isalnum() for ch in token) and bool(token.strip(".!?"))
+            token_id = self.tokens.add(
+                token,
+                [self._vader_id(form.lower()) for form in vader_forms],
+                [form.isupper() for form in vader_forms],
+                [self._pattern_id(form.lower()) for form in pattern_forms],
+                symbols or any(form.lower() in PATTERN_EMOTICONS for form in pattern_forms))
+        return token_id
+
+    def tokenize(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Flat VADER and pattern token-id streams for every text (one "sentence" each)"""
+        token_ids, sentence_lengths, sentence_text, sentences = [], [], [], []
+        lookup = self.tokens.ids.get
+        for text_index, text in enumerate(texts):
+            words = text.split()
+            ids = [lookup(word) for word in words]
+            if None in ids:
+                ids = [self._token_id(word) for word in words]
+            token_ids.extend(ids)
+            sentence_lengths.append(len(ids))
+            sentence_text.append(text_index)
+            sentences.append(text)
+
+        table = self.tokens.arrays()
+        token_ids = np.array(token_ids, dtype=np.int64)
+        sentence_lengths = np.array(sentence_lengths, dtype=np.int64)
+        token_sentence = np.repeat(np.arange(len(sentences)), sentence_lengths)
+
+        # Pattern-tokenize flagged sentences whole; they go after the others in the pattern stream
+        whole = np.zeros(len(sentences), dtype=bool)
+        whole[token_sentence[table["symbols"][token_ids]]] = True
+        keep = ~whole[token_sentence]
+        pattern_ids = self.tokens.expand(table["pattern_start"], table["pattern_count"], token_ids[keep],
+                                         table["pattern_pool"])
+        pattern_lengths = np.bincount(token_sentence[keep], weights=table["pattern_count"][token_ids[keep]],
+                                      minlength=len(sentences)).astype(np.int64)[~whole]
+        pattern_sentence = np.flatnonzero(~whole)
+        extra_ids, extra_lengths = [], []
+        for index in np.flatnonzero(whole):
+            forms = " ".join(self.pattern.tokenizer(sentences[index])).split()
+            extra_ids.extend(self._pattern_id(form.lower()) for form in forms)
+            extra_lengths.append(len(forms))
+
+        return {
+            "vader_ids": self.tokens.expand(table["vader_start"], table["vader_count"], token_ids,
+                                            table["vader_pool"]),
+            "vader_upper": self.tokens.expand(table["vader_start"], table["vader_count"], token_ids,
+                                              table["upper_pool"]),
+            "vader_lengths": np.bincount(token_sentence, weights=table["vader_count"][token_ids],
+                                         minlength=len(sentences)).astype(np.int64),
+            "pattern_ids": np.concatenate((pattern_ids, np.array(extra_ids, dtype=np.int64))),
+            "pattern_lengths": np.concatenate((pattern_lengths, np.array(extra_lengths, dtype=np.int64))),
+            "pattern_sentence": np.concatenate((pattern_sentence, np.flatnonzero(whole))),
+            "sentence_text": np.array(sentence_text, dtype=np.int64),
+        }
+
+    @staticmethod
+    def _positions(lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sentence index, position in sentence, sentence length) for every token"""
+        sentence = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(sentence)) - starts[sentence]
+        return sentence, position, lengths[sentence]
+
+    # -------------------------------
+    # VADER
+    # -------------------------------
+    def vader_valences(self, ids: np.ndarray, upper: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Per-token valences, identical to VADER's sentiment_valence + its "but" rule"""
+        lex = self.vader_vocab.arrays()
+        rule = self.rule_ids
+        sentence, position, length = self._positions(lengths)
+        uppers_per_sentence = np.bincount(sentence, weights=upper, minlength=len(lengths))
+        cap_diff = ((lengths - uppers_per_sentence > 0) & (uppers_per_sentence > 0))[sentence]
+
+        prev = {k: _shift(ids, k, position >= k) for k in (1, 2, 3)}
+        nxt = {k: _shift(ids, -k, position + k < length) for k in (1, 2)}
+        prev_upper = {k: _shift(upper, k, position >= k, False) for k in (1, 2, 3)}
+
+        kind_of = (ids == rule["kind"]) & (nxt[1] == rule["of"])
+        active = lex["in_lexicon"][ids] & ~lex["is_booster"][ids] & ~kind_of
+        base = lex["valence"][ids]
+        valence = base.copy()
+
+        # "no" as a negator of the next lexicon word rather than a word of its own
+        valence[(ids == rule["no"]) & (nxt[1] >= 0) & lex["in_lexicon"][nxt[1]]] = 0.0
+        after_no = ((prev[1] == rule["no"]) | (prev[2] == rule["no"]) |
+                    ((prev[3] == rule["no"]) & ((prev[1] == rule["or"]) | (prev[1] == rule["nor"]))))
+        valence = np.where(after_no, base * N_SCALAR, valence)
+        caps = upper & cap_diff
+        valence = np.where(caps, np.where(valence > 0, valence + C_INCR, valence - C_INCR), valence)
+
+        def so_this(word):
+            return (word == rule["so"]) | (word == rule["this"])
+
+        for start_i in range(3):
+            distance = start_i + 1
+            word = prev[distance]
+            applies = active & (word >= 0) & ~lex["in_lexicon"][word]
+            scalar = lex["booster"][word] * np.where(valence < 0, -1.0, 1.0)
+            boost_caps = lex["is_booster"][word] & prev_upper[distance] & cap_diff
+            scalar = np.where(boost_caps, np.where(valence > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            scalar *= (1.0, 0.95, 0.9)[start_i]
+            valence = np.where(applies, valence + scalar, valence)
+
+            # _negation_check
+            if start_i == 0:
+                factor = np.where(lex["negation"][prev[1]], N_SCALAR, 1.0)
+            elif start_i == 1:
+                never_so = (prev[2] == rule["never"]) & so_this(prev[1])
+                without_doubt = (prev[2] == rule["without"]) & (prev[1] == rule["doubt"])
+                factor = np.where(never_so, 1.25,
+                                  np.where(without_doubt, 1.0, np.where(lex["negation"][prev[2]], N_SCALAR, 1.0)))
+            else:
+                never_so = ((prev[3] == rule["never"]) & so_this(prev[2])) | so_this(prev[1])
+                without_doubt = (prev[3] == rule["without"]) & ((prev[2] == rule["doubt"]) | (prev[1] == rule["doubt"]))
+                factor = np.where(never_so, 1.25,
+                                  np.where(without_doubt, 1.0, np.where(lex["negation"][prev[3]], N_SCALAR, 1.0)))
+            valence = np.where(applies, valence * factor, valence)
+            if start_i == 2:
+                valence = np.where(applies, self._special_idioms(valence, prev, ids, nxt), valence)
+
+        # _least_check
+        least = active & (prev[1] == rule["least"]) & ~lex["in_lexicon"][prev[1]]
+        not_at_least = (position <= 1) | ((prev[2] != rule["at"]) & (prev[2] != rule["very"]))
+        valence = np.where(least & not_at_least, valence * N_SCALAR, valence)
+        valence = np.where(active, valence, 0.0)
+
+        # "but" rule: halve before the first "but" of the sentence, boost after it
+        is_but = ids == rule["but"]
+        first_but = np.full(len(lengths), np.iinfo(np.int64).max)
+        np.minimum.at(first_but, sentence[is_but], position[is_but])
+        but_at = first_but[sentence]
+        scaled = np.where(position < but_at, valence * np.where(but_at < np.iinfo(np.int64).max, 0.5, 1.0),
+                          np.where(position > but_at, valence * 1.5, valence))
+
+        # VADER finds each value with list.index(), so repeated values scale the wrong
+        # position; those (rare) sentences go through vader_but_check, which keeps that quirk
+        starts = np.cumsum(lengths) - lengths
+        for s in np.flatnonzero(first_but < np.iinfo(np.int64).max):
+            span = slice(starts[s], starts[s] + lengths[s])
+            nonzero = valence[span] != 0
+            values = valence[span][nonzero].tolist() + scaled[span][nonzero].tolist()
+            if len(set(values)) < len(values):
+                scaled[span] = vader_but_check(int(first_but[s]), valence[span].tolist())
+        return scaled
+
+    def _special_idioms(self, valence: np.ndarray, prev: Dict, ids: np.ndarray, nxt: Dict) -> np.ndarray:
+        """VADER's _special_idioms_check over every token at once"""
+        def matches(window, phrase):
+            if len(window) != len(phrase):
+                return None
+            mask = np.ones(len(ids), dtype=bool)
+            for column, word_id in zip(window, phrase):
+                mask &= column == word_id
+            return mask
+
+        windows = [(prev[1], ids), (prev[2], prev[1], ids), (prev[2], prev[1]),
+                   (prev[3], prev[2], prev[1]), (prev[3], prev[2])]
+        replaced = np.full(len(ids), np.nan)
+        for window in windows:  # the first matching window wins
+            for phrase, value in self.special_cases:
+                mask = matches(window, phrase)
+                if mask is not None:
+                    replaced = np.where(mask & np.isnan(replaced), value, replaced)
+        for window in ((ids, nxt[1]), (ids, nxt[1], nxt[2])):  # looking ahead overrides
+            for phrase, value in self.special_cases:
+                mask = matches(window, phrase)
+                if mask is not None:
+                    replaced = np.where(mask, value, replaced)
+        valence = np.where(np.isnan(replaced), valence, replaced)
+        for window in ((prev[3], prev[2], prev[1]), (prev[3], prev[2]), (prev[2], prev[1])):
+            for phrase, value in self.phrase_boosters:
+                mask = matches(window, phrase)
+                if mask is not None:
+                    valence = np.where(mask, valence + value, valence)
+        return valence
+
+    # -------------------------------
+    # TextBlob (pattern)
+    # -------------------------------
+    def pattern_assessments(self, ids: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sentence, polarity, subjectivity) of every assessment pattern's Sentiment would make"""
+        lex = self.pattern_vocab.arrays()
+        sentence, position, _ = self._positions(lengths)
+        count = len(ids)
+        index = np.arange(count)
+        starts = index - position
+
+        known = lex["known"][ids]
+        emoticon = lex["emoticon"][ids] & ~known
+        negation = lex["negation"][ids]
+
+        def at(values, where, default):
+            return np.where(where >= 0, values[np.maximum(where, 0)], default)
+
+        # Modifier state: a known modifier word stays active across short unknown words
+        prev_known = _last_before(known)
+        prev_known = np.where(prev_known >= starts, prev_known, -1)
+        prev_known_id = at(ids, prev_known, -1)
+        prev_is_modifier = (prev_known >= 0) & lex["modifier"][prev_known_id]
+        prev_is_ly = (prev_known >= 0) & lex["ly"][prev_known_id]
+        kills_modifier = ~known & lex["long"][ids] & ~(negation & prev_is_ly)
+        modifier_alive = prev_is_modifier & (_last_before(kills_modifier) < prev_known)
+        merged = known & modifier_alive
+        # "really not good": the negation attaches to the modifier's assessment
+        negates_modifier = ~known & negation & modifier_alive & prev_is_ly
+
+        # Negation state: kept across short words, consumed by the next known word
+        last_negation = _last_before(negation)
+        resets_negation = ~known & ~negation & lex["long_unquoted"][ids]
+        negated_here = (known & (last_negation >= np.maximum(starts, prev_known)) &
+                        (_last_before(resets_negation) < last_negation) &
+                        ~at(negates_modifier, last_negation, False))
+
+        # Assessments: a new one per unmerged known word or emoticon; merged words update the last one
+        member = known | emoticon
+        chain_start = (known & ~merged) | emoticon
+        chain = np.cumsum(chain_start) - 1
+        intensity = np.where(known, lex["intensity"][ids], 1.0)
+        intensity = np.where(negated_here, 1.0 / np.where(intensity == 0, 1.0, intensity), intensity)
+        polarity = np.where(emoticon, lex["emoticon_polarity"][ids], lex["polarity"][ids])
+        subjectivity = np.where(emoticon, 1.0, lex["subjectivity"][ids])
+        prev_member = _last_before(member)
+        scale = at(intensity, prev_member, 1.0)
+        polarity = np.where(merged, np.clip(polarity * scale, -1.0, 1.0), polarity)
+        subjectivity = np.where(merged, np.clip(subjectivity * scale, -1.0, 1.0), subjectivity)
+
+        members = np.flatnonzero(member)
+        if not len(members):
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        member_chain = chain[members]
+        last_member = members[np.r_[member_chain[1:] != member_chain[:-1], True]]
+        chains = len(last_member)
+        chain_sentence = sentence[last_member]
+
+        # Events attach to the current assessment only if it belongs to the same sentence
+        has_chain = (chain >= 0) & (at(chain_sentence, chain, -1) == sentence)
+        exclamation = lex["exclamation"][ids] & has_chain & (index > at(last_member, chain, count))
+        boosts = np.bincount(chain[exclamation], minlength=chains)
+        negated = np.zeros(chains, dtype=bool)
+        negated[chain[member & negated_here]] = True
+        negated[chain[negates_modifier & has_chain]] = True
+
+        chain_polarity = np.clip(polarity[last_member] * 1.25 ** boosts, -1.0, 1.0)
+        chain_polarity = np.where(negated, chain_polarity * -0.5, chain_polarity)
+        return chain_sentence, chain_polarity, subjectivity[last_member]
+
+    # -------------------------------
+    # Components
+    # -------------------------------
+    def sentence_components(self, tokens: Dict[str, np.ndarray]) -> np.ndarray:
+        """(sentences, 8) array: the first eight component fields of every sentence"""
+        sentences = len(tokens["sentence_text"])
+        out = np.zeros((sentences, 8))
+        valence = self.vader_valences(tokens["vader_ids"], tokens["vader_upper"], tokens["vader_lengths"])
+        vader_sentence = np.repeat(np.arange(sentences), tokens["vader_lengths"])
+        out[:, 3] = np.bincount(vader_sentence, weights=valence, minlength=sentences)
+        out[:, 4] = np.bincount(vader_sentence, weights=np.where(valence > 0, valence + 1, 0.0), minlength=sentences)
+        out[:, 5] = np.bincount(vader_sentence, weights=np.where(valence < 0, valence - 1, 0.0), minlength=sentences)
+        out[:, 6] = np.bincount(vader_sentence, weights=valence == 0, minlength=sentences)
+        out[:, 7] = tokens["vader_lengths"]
+
+        chain_sentence, polarity, subjectivity = self.pattern_assessments(tokens["pattern_ids"],
+                                                                          tokens["pattern_lengths"])
+        chain_sentence = tokens["pattern_sentence"][chain_sentence]
+        out[:, 0] = np.bincount(chain_sentence, minlength=sentences)
+        out[:, 1] = np.bincount(chain_sentence, weights=polarity, minlength=sentences)
+        out[:, 2] = np.bincount(chain_sentence, weights=subjectivity, minlength=sentences)
+        return out
+
+    def text_components(self, texts: Sequence[str]) -> List[Tuple]:
+        """Per-text component tuples (COMPONENT_FIELDS)"""
+        tokens = self.tokenize(texts)
+        per_sentence = self.sentence_components(tokens)
+        totals = np.zeros((len(texts), 8))
+        np.add.at(totals, tokens["sentence_text"], per_sentence)
+        results = []
+        for text, row in zip(texts, totals.tolist()):
+            results.append((int(row[0]), row[1], row[2], row[3], row[4], row[5], int(row[6]), int(row[7]),
+                            text.count("!"), text.count("?")))
+        return results
+
+    def check_parity(self, texts: Sequence[str], tolerance: float = 1e-6) -> None:
+        """Raise RuntimeError unless `texts` score as VADER's polarity_scores and pattern's Sentiment score them"""
+        from test_sentiment import TextSentimentAnalyzer
+
+        for text, components in zip(texts, self.text_components(texts)):
+            actual = TextSentimentAnalyzer._scores_from_components(components)
+            polarity, subjectivity = self.pattern(text)
+            vader = self.vader.polarity_scores(text)
+            expected = {"textblob_polarity": polarity, "textblob_subjectivity": subjectivity,
+                        "vader_positive": vader["pos"], "vader_negative": vader["neg"],
+                        "vader_neutral": vader["neu"], "vader_compound": vader["compound"]}
+            mismatched = [field for field, value in expected.items() if abs(actual[field] - value) > tolerance]
+            if mismatched:
+                raise RuntimeError(f"Batch sentiment engine disagrees with vaderSentiment/textblob on "
+                                   f"{mismatched} for {text!r}; check the pinned library versions")
+
+
+# -------------------------------
+# Parity check
+# -------------------------------
+SAMPLE_TEXTS = [
+    "I'm feeling really anxious about my job interview tomorrow. I can't stop worrying about it.",
+    "I'm so happy today! Everything is going great and I feel optimistic about the future.",
+    "I've been feeling really down lately. Nothing seems to matter anymore.",
+    "I need to practice more self-care. Maybe I should try meditation or yoga.",
+    "The day was not bad, but the evening was VERY stressful!!",
+    "I am not happy. I am not really happy either. Never so tired in my life.",
+    "It was kind of ok, sort of fine, at least not terrible :)",
+    "Without a doubt the best session yet. No worries, no regrets.",
+    "That movie was the bomb, but the ending was a bit sad...",
+    "I feel GREAT today, though my friends seem extremely worried??",
+    "Honestly? I don't know. Everything feels pointless and empty.",
+    "Slept badly again. Very very tired, incredibly irritable, but hopeful.",
+]
+
+
+def load_texts(path: str) -> List[str]:
+    """Texts from a plain file (one per line) or JSONL records with a "text" field"""
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                texts.append(json.loads(line).get("text", ""))
+            else:
+                texts.append(line)
+    return texts
+
+
+def parity_report(texts: List[str], repeat: int = 1, tolerance: float = 0.01) -> Dict:
+    """Compare analyze_sentiment against the batch engine on `texts`, with timings"""
+    from test_sentiment import TextSentimentAnalyzer
+
+    analyzer = TextSentimentAnalyzer()
+    analyzer.warmup()
+    batch = texts * repeat
+
+    start = time.perf_counter()
+    expected = []
+    for text in batch:
+        analyzer.sentiment_cache.clear()  # score every text, as for new text
+        expected.append(analyzer.analyze_sentiment(text))
+    per_text_seconds = time.perf_counter() - start
+
+    analyzer.analyze_sentiment_batch(texts[:1])  # build the engine outside the timing
+    start = time.perf_counter()
+    actual = analyzer.analyze_sentiment_batch(batch)
+    batch_seconds = time.perf_counter() - start
+
+    fields = [key for key in expected[0] if key != "overall_sentiment"] if expected else []
+    max_diff = {field: max(abs(e[field] - a[field]) for e, a in zip(expected, actual)) for field in fields}
+    worst = max(range(len(batch)), key=lambda i: max(abs(expected[i][f] - actual[i][f]) for f in fields)) \
+        if batch else None
+    label_agreement = sum(e["overall_sentiment"] == a["overall_sentiment"] for e, a in zip(expected, actual))
+    return {
+        "texts": len(batch),
+        "max_abs_diff": {field: round(value, 6) for field, value in max_diff.items()},
+        "within_tolerance": all(value <= tolerance for value in max_diff.values()),
+        "tolerance": tolerance,
+        "label_agreement": round(label_agreement / len(batch), 4) if batch else 1.0,
+        "worst_text": batch[worst] if worst is not None else None,
+        "per_text_seconds": round(per_text_seconds, 3),
+        "batch_seconds": round(batch_seconds, 3),
+        "speedup": round(per_text_seconds / batch_seconds, 1) if batch_seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized batch sentiment engine")
+    parser.add_argument("--parity", action="store_true",
+                        help="compare against TextSentimentAnalyzer.analyze_sentiment and time both")
+    parser.add_argument("texts", nargs="?", help="text file (one per line) or JSONL with a text field")
+    parser.add_argument("--repeat", type=int, default=20, help="repeat the texts to make a larger batch")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="maximum allowed absolute score difference")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts) if args.texts else SAMPLE_TEXTS
+    if args.parity:
+        report = parity_report(texts, args.repeat, args.tolerance)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["within_tolerance"] else 1)
+
+    engine = BatchSentimentEngine()
+    for text, components in zip(texts, engine.text_components(texts)):
+        print(json.dumps({"text": text, **dict(zip(COMPONENT_FIELDS, components))}))
@@ -0,0 +1,202 @@
+"""
+Bulk Text Analysis Module
+Re-scores a JSONL file of {id, text, duration} records across a process pool
+
+Usage:
+    python bulk_analysis.py entries.jsonl results.jsonl --workers 8
+    python bulk_analysis.py entries.jsonl results.jsonl --resume
+
+Each worker process keeps its own warm TypingSpeedAnalyzer. Records are sent
+in chunks with a bounded number of chunks in flight, and results are written
+in input order, so memory stays flat on multi-million-record files and an
+interrupted job can resume: every input record (malformed ones included)
+produces exactly one output line carrying its input line number, so --resume
+skips as many records as there are complete output lines and checks that the
+line numbers agree before appending.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_analyzer = None
+
+
+def _init_worker() -> None:
+    """Load the analyzers once per worker process"""
+    global _analyzer
+    from text_speed import TypingSpeedAnalyzer
+    _analyzer = TypingSpeedAnalyzer()
+    _analyzer.text_analyzer.warmup()
+
+
+def _analyze_chunk(records: List[Tuple[int, Dict]]) -> List[Dict]:
+    """Analyze a chunk of (line number, record) pairs inside a worker process"""
+    results = []
+    for line_number, record in records:
+        if "_error" in record:
+            results.append({"id": None, "line": line_number, "success": False, "error": record["_error"]})
+            continue
+        try:
+            result = _analyzer.run_analysis(
+                user_text=record.get("text", ""),
+                duration=record.get("duration", 60)
+            )
+            results.append({"id": record.get("id"), "line": line_number, "success": True, "result": result})
+        except Exception as e:
+            results.append({"id": record.get("id"), "line": line_number, "success": False, "error": str(e)})
+    return results
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, record) pairs from a JSONL file, skipping blank lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                record = {"id": None, "_error": f"line {line_number}: {e}"}
+            yield line_number, record
+
+
+def completed_lines(path: str) -> Tuple[int, Optional[int]]:
+    """(complete lines, input line number of the last one) in an output file.
+
+    A partial trailing line left by an interrupted run is truncated first.
+    """
+    if not os.path.isfile(path):
+        return 0, None
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return 0, None
+
+        # Walk back from the end to find the last newline-terminated record
+        block = 1 << 16
+        pos = end
+        tail = b""
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            if tail.count(b"\n") >= 2 or (pos == 0 and b"\n" in tail):
+                break
+
+        complete_end = tail.rfind(b"\n")
+        if complete_end == -1:
+            f.truncate(0)
+            return 0, None
+        if pos + complete_end + 1 != end:
+            f.truncate(pos + complete_end + 1)
+        last_line = json.loads(tail[:complete_end].split(b"\n")[-1]).get("line")
+
+        f.seek(0)
+        count = sum(data.count(b"\n") for data in iter(lambda: f.read(1 << 20), b""))
+        return count, last_line
+
+
+def skip_completed(records: Iterator[Tuple[int, Dict]], count: int,
+                   last_line: Optional[int]) -> Iterator[Tuple[int, Dict]]:
+    """Drop the `count` records already in the output, checking the resume point really matches"""
+    skipped = list(islice((line_number for line_number, _ in records), count - 1, count))
+    if not skipped:
+        raise ValueError(f"Cannot resume: the output has {count} results but the input has fewer records")
+    if last_line is not None and skipped[0] != last_line:
+        raise ValueError(f"Cannot resume: result {count} came from input line {last_line}, "
+                         f"but record {count} is on line {skipped[0]} (was the input changed?)")
+    return records
+
+
+def chunked(records: Iterator[Tuple[int, Dict]], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_bulk(input_path: str, output_path: str, workers: int = None, chunk_size: int = 64,
+             resume: bool = False, progress_every: float = 5.0) -> Dict:
+    """Analyze every record of input_path into output_path; returns job statistics"""
+    workers = workers or os.cpu_count() or 1
+    records = read_records(input_path)
+
+    mode = "w"
+    if resume:
+        # Never truncate on resume: at worst there is nothing to skip and we append to an empty file
+        mode = "a"
+        count, last_line = completed_lines(output_path)
+        if count:
+            records = skip_completed(records, count, last_line)
+            sys.stderr.write(f"Resuming after {count} completed records (input line {last_line})\n")
+
+    stats = {"processed": 0, "failed": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    last_report = start
+    max_in_flight = workers * 4
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+            open(output_path, mode, encoding="utf-8") as out:
+        in_flight = deque()
+        chunks = chunked(records, chunk_size)
+
+        def submit_next() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            in_flight.append(pool.submit(_analyze_chunk, chunk))
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
+
+        while in_flight:
+            # Oldest chunk first keeps the output in input order (needed for resume)
+            for result in in_flight.popleft().result():
+                out.write(json.dumps(result) + "\n")
+                stats["processed"] += 1
+                stats["failed"] += not result["success"]
+            out.flush()
+            submit_next()
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                last_report = now
+                rate = stats["processed"] / (now - start)
+                sys.stderr.write(f"Processed {stats['processed']} records ({rate:.1f} records/s, "
+                                 f"{stats['failed']} failed)\n")
+                sys.stderr.flush()
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["records_per_second"] = round(stats["processed"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk re-score journal entries (JSONL in, JSONL out)")
+    parser.add_argument("input", help="JSONL file of {id, text, duration} records")
+    parser.add_argument("output", help="JSONL file for {id, line, success, result|error} lines")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="records sent to a worker at a time")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the records already completed in the output file and append the rest")
+    args = parser.parse_args()
+    try:
+        stats = run_bulk(args.input, args.output, args.workers, args.chunk_size, args.resume)
+    except ValueError as e:
+        sys.stderr.write(f"❌ {e}\n")
+        sys.exit(1)
+    sys.stderr.write(f"✅ Done: {json.dumps(stats)}\n")
@@ -0,0 +1,94 @@
+"""
+Keyword Matcher Module
+Single-pass, word-boundary-aware matching of the wellness keyword lexicon
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Split lowercased text into (token, start, end) word tokens"""
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text.lower())]
+
+
+class KeywordMatcher:
+    """Token trie over a {category: [keyword, ...]} lexicon.
+
+    Keywords are matched on whole tokens, so 'down' does not fire inside
+    'download'. Multi-word and hyphenated phrases ('panic attack', 'self-care')
+    become token sequences; 'self-care' and 'self care' are the same phrase.
+    Each text is scanned once regardless of lexicon size.
+    """
+
+    def __init__(self, lexicon: Dict[str, List[str]]):
+        self.categories = list(lexicon.keys())
+        self.root: Dict = {}
+        self.max_phrase_length = 0
+        # Canonical keyword order per category (first spelling wins, duplicates dropped)
+        self.keyword_order: Dict[str, Dict[str, int]] = {}
+
+        for category, keywords in lexicon.items():
+            order = self.keyword_order.setdefault(category, {})
+            seen_phrases = {}
+            for keyword in keywords:
+                phrase = tuple(token for token, _, _ in tokenize(keyword))
+                if not phrase or phrase in seen_phrases:
+                    continue
+                seen_phrases[phrase] = keyword
+                order[keyword] = len(order)
+                self._insert(phrase, category, keyword)
+
+    def _insert(self, phrase: Tuple[str, ...], category: str, keyword: str) -> None:
+        node = self.root
+        for token in phrase:
+            node = node.setdefault(token, {})
+        node.setdefault(None, []).append((category, keyword))
+        self.max_phrase_length = max(self.max_phrase_length, len(phrase))
+
+    def find(self, text: str) -> List[Dict]:
+        """All keyword hits in text order: {'category', 'keyword', 'start', 'end'}"""
+        tokens = tokenize(text)
+        hits = []
+        for i in range(len(tokens)):
+            node = self.root
+            for j in range(i, min(len(tokens), i + self.max_phrase_length)):
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                for category, keyword in node.get(None, ()):
+                    hits.append({
+                        'category': category,
+                        'keyword': keyword,
+                        'start': tokens[i][1],
+                        'end': tokens[j][2]
+                    })
+        return hits
+
+    def find_by_category(self, text: str) -> Dict[str, List[Dict]]:
+        """Keyword hits with positions grouped by category"""
+        grouped: Dict[str, List[Dict]] = {}
+        for hit in self.find(text):
+            grouped.setdefault(hit['category'], []).append(
+                {'keyword': hit['keyword'], 'start': hit['start'], 'end': hit['end']})
+        return grouped
+
+    def detect(self, text: str) -> Dict[str, List[str]]:
+        """Distinct keywords found per category, in lexicon order"""
+        found: Dict[str, List[str]] = {}
+        for hit in self.find(text):
+            found.setdefault(hit['category'], []).append(hit['keyword'])
+        return self.combine([found])
+
+    def combine(self, detections: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+        """Merge several detect() results (e.g. per sentence) into one"""
+        found: Dict[str, set] = {}
+        for detected in detections:
+            for category, keywords in detected.items():
+                found.setdefault(category, set()).update(keywords)
+        return {
+            category: sorted(found[category], key=self.keyword_order[category].get)
+            for category in self.categories if category in found
+        }
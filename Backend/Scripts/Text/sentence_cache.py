@@ -0,0 +1,87 @@
+"""
+Sentence Cache Module
+Sentence splitting and a bounded LRU cache of per-sentence sentiment pieces
+"""
+
+import re
+import sys
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# A sentence ends at whitespace after a word followed by . ! or ?, so sentences
+# are whole runs of the whitespace tokens VADER and pattern work on ("e.g.",
+# "3.5" and "?!" stay inside their sentence). No break before a lone "O":
+# pattern would join "no. O" into the o.O emoticon across it.
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:(?<=[^\W_])[.!?]+(?=\s+(?!O(?!\w))|\s*$)|$)", re.DOTALL)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping terminal punctuation with each one"""
+    return [match.group().rstrip() for match in SENTENCE_PATTERN.finditer(text)]
+
+
+def text_key(text: str) -> bytes:
+    """Hash of the exact text (case and whitespace are kept, both can change the scores)"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SentimentCache:
+    """LRU cache keyed by text hash (documents) or tuples of strings (sentences), evicting by approximate byte size"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, Tuple]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: Hashable, value: Tuple) -> int:
+        size = sys.getsizeof(key) + sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+        if isinstance(key, tuple):
+            size += sum(sys.getsizeof(part) for part in key)
+        return size
+
+    def get(self, key: Hashable) -> Optional[Tuple]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Tuple) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= self._entry_size(key, old)
+        self.entries[key] = value
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.current_bytes -= self._entry_size(old_key, old_value)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
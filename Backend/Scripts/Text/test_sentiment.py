@@ -4,15 +4,79 @@ Analyzes text input for sentiment and mental wellness keywords
 """
 
 import re
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import math
+import time
+import string
+from collections import namedtuple
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, SentimentIntensityAnalyzer, normalize
+from keyword_matcher import KeywordMatcher
+from sentence_cache import SentimentCache, split_sentences, text_key
 from typing import Dict, List, Tuple
 import logging
 
+
+_pattern_sentiment = None
+
+
+def get_pattern_sentiment():
+    """TextBlob's pattern sentiment, imported on first use.
+
+    Importing textblob pulls in NLTK (well over a second), so modules that only
+    need the keyword matcher or sentence cache do not pay for it.
+    """
+    global _pattern_sentiment
+    if _pattern_sentiment is None:
+        from textblob.en import sentiment
+        _pattern_sentiment = sentiment
+    return _pattern_sentiment
+
+
+SCORE_FIELDS = ('textblob_polarity', 'textblob_subjectivity', 'vader_positive',
+                'vader_negative', 'vader_neutral', 'vader_compound')
+
+# VADER's sentiment_valence reads at most 3 tokens before and 2 after the word it scores
+VADER_CONTEXT_BEFORE = 3
+VADER_CONTEXT_AFTER = 2
+
+# Stands in for vaderSentiment's SentiText: sentiment_valence only reads these two fields
+VaderWindow = namedtuple('VaderWindow', ['words_and_emoticons', 'is_cap_diff'])
+
+# Known pattern word that is neither a modifier nor a negation, used to probe whether
+# a run of words leaves modifier/negation state behind or boosts an earlier assessment
+PATTERN_PROBE = 'good'
+
+
+def strip_punc_if_word(token: str) -> str:
+    """VADER's token cleanup: strip surrounding punctuation unless two characters or fewer remain (emoticons)"""
+    stripped = token.strip(string.punctuation)
+    if len(stripped) <= 2:
+        return token
+    return stripped
+
+
+def vader_but_check(but_index: int, sentiments: List[float]) -> List[float]:
+    """VADER's 'but' rule: halve valences before the first 'but', boost the ones after it.
+
+    Kept as VADER writes it, locating each valence with list.index, so texts
+    that repeat a valence get the same (position-shifted) result.
+    """
+    for sentiment in sentiments:
+        si = sentiments.index(sentiment)
+        if si < but_index:
+            sentiments.pop(si)
+            sentiments.insert(si, sentiment * 0.5)
+        elif si > but_index:
+            sentiments.pop(si)
+            sentiments.insert(si, sentiment * 1.5)
+    return sentiments
+
+
 class TextSentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, cache_max_bytes: int = 8 * 1024 * 1024):
         """Initialize the text sentiment analyzer"""
         self.vader_analyzer = SentimentIntensityAnalyzer()
+        # Per-sentence pieces and whole-document scores (see _sentence_components)
+        self.sentiment_cache = SentimentCache(cache_max_bytes)
         self.logger = logging.getLogger(__name__)
         
         # Mental wellness keywords categorized by type
@@ -52,39 +116,239 @@ class TextSentimentAnalyzer:
                 'relaxation', 'breathing', 'yoga', 'meditation'
             ]
         }
+        
+        # Compiled once; scans each text in a single word-boundary-aware pass
+        self.keyword_matcher = KeywordMatcher(self.wellness_keywords)
+        self.batch_engine = None  # BatchSentimentEngine, built on first analyze_sentiment_batch
+    
+    def _vader_text(self, text: str) -> str:
+        """Text with emojis replaced by their descriptions, as VADER's polarity_scores does"""
+        emojis = self.vader_analyzer.emojis
+        converted = []
+        prev_space = True
+        for char in text:
+            if char in emojis:
+                if not prev_space:
+                    converted.append(' ')
+                converted.append(emojis[char])
+                prev_space = False
+            else:
+                converted.append(char)
+                prev_space = char == ' '
+        return ''.join(converted)
+
+    def _pattern_run(self, words: Tuple[str, ...]) -> Tuple:
+        """pattern assessments of a run of words, and whether the run joins its neighbours cleanly
+
+        Two runs score the same apart as together unless the first leaves a
+        modifier or negation pending (it would chain into the next word) or the
+        second has a '!' before its first assessment (it would boost the last
+        assessment of the first). Both are detected with PATTERN_PROBE.
+        """
+        assess = get_pattern_sentiment().assessments
+        tagged = [(w, None) for w in words]
+        probe = assess([(PATTERN_PROBE, None)])
+        pairs = tuple((p, s) for _, p, s, _ in assess(tagged))
+        clean_start = assess([(PATTERN_PROBE, None)] + tagged)[0] == probe[0]
+        clean_end = assess(tagged + [(PATTERN_PROBE, None)])[-1] == probe[0]
+        return pairs, clean_start, clean_end
+
+    def _sentence_parts(self, sentence: str) -> Tuple:
+        """Context-free pieces of one sentence, cached by its text:
+        (VADER tokens, all-caps token count, index of the first 'but' or -1,
+        '!' count, '?' count, pattern words, pattern assessment (p, s) pairs,
+        clean pattern start, clean pattern end)
+        """
+        key = ('sentence', sentence)
+        parts = self.sentiment_cache.get(key)
+        if parts is None:
+            vader_text = self._vader_text(sentence)
+            tokens = tuple(strip_punc_if_word(word) for word in vader_text.split())
+            lowered = [token.lower() for token in tokens]
+            but_index = lowered.index('but') if 'but' in lowered else -1
+            pattern_words = tuple(w.lower() for w in " ".join(get_pattern_sentiment().tokenizer(sentence)).split())
+            parts = (tokens, sum(token.isupper() for token in tokens), but_index,
+                     vader_text.count('!'), vader_text.count('?'), pattern_words) + self._pattern_run(pattern_words)
+            self.sentiment_cache.put(key, parts)
+        return parts
+
+    def _vader_valences(self, sentence: str, tokens: Tuple[str, ...], before: List[str], after: List[str],
+                        is_cap_diff: bool) -> Tuple[float, ...]:
+        """VADER's per-token valences (before the 'but' rule) for one sentence in its context"""
+        key = ('vader', sentence, tuple(before), tuple(after), is_cap_diff)
+        valences = self.sentiment_cache.get(key)
+        if valences is None:
+            window = list(before) + list(tokens) + list(after)
+            sentitext = VaderWindow(window, is_cap_diff)
+            sentiments = []
+            for i in range(len(before), len(before) + len(tokens)):
+                item = window[i]
+                # Same skips as polarity_scores before it calls sentiment_valence
+                if item.lower() in BOOSTER_DICT or (
+                        i < len(window) - 1 and item.lower() == 'kind' and window[i + 1].lower() == 'of'):
+                    sentiments.append(0)
+                    continue
+                self.vader_analyzer.sentiment_valence(0, sentitext, item, i, sentiments)
+            valences = tuple(sentiments)
+            self.sentiment_cache.put(key, valences)
+        return valences
+
+    def _sentence_components(self, sentences: List[str]) -> Tuple:
+        """Component tuple (see batch_sentiment.COMPONENT_FIELDS) of a text from its sentences
+
+        Only new or edited sentences are scored. VADER valences are cached per
+        sentence together with the few neighbouring tokens sentiment_valence
+        reads; pattern assessments per sentence, with neighbouring sentences
+        scored as one run where pattern's state carries across them. The
+        document-level steps (capitalization differential, 'but' rule,
+        punctuation, sums) run over the cached pieces, so the result equals
+        scoring the whole text.
+        """
+        parts = [self._sentence_parts(sentence) for sentence in sentences]
+
+        tokens = [token for part in parts for token in part[0]]
+        all_caps = sum(part[1] for part in parts)
+        is_cap_diff = 0 < len(tokens) - all_caps < len(tokens)
+        sentiments = []
+        but_index = -1
+        offset = 0
+        for sentence, part in zip(sentences, parts):
+            end = offset + len(part[0])
+            sentiments.extend(self._vader_valences(
+                sentence, part[0], tokens[max(0, offset - VADER_CONTEXT_BEFORE):offset],
+                tokens[end:end + VADER_CONTEXT_AFTER], is_cap_diff))
+            if but_index < 0 and part[2] >= 0:
+                but_index = offset + part[2]
+            offset = end
+        if but_index >= 0:
+            vader_but_check(but_index, sentiments)
+
+        pos_sum, neg_sum, neu_count = 0.0, 0.0, 0
+        for sentiment in sentiments:
+            if sentiment > 0:
+                pos_sum += (float(sentiment) + 1)
+            if sentiment < 0:
+                neg_sum += (float(sentiment) - 1)
+            if sentiment == 0:
+                neu_count += 1
+
+        # pattern: join runs of sentences whose boundary is not clean
+        runs = []  # [first sentence index, words, pairs, clean start, clean end]
+        for index, part in enumerate(parts):
+            runs.append([index, part[5], part[6], part[7], part[8]])
+            # A joined run can start unclean ('!' before its first assessment), so keep joining backwards
+            while len(runs) > 1 and not (runs[-2][4] and runs[-1][3]):
+                first, words = runs[-2][0], runs[-2][1] + runs.pop()[1]
+                key = ('pattern',) + tuple(sentences[first:index + 1])
+                run = self.sentiment_cache.get(key)
+                if run is None:
+                    run = self._pattern_run(words)
+                    self.sentiment_cache.put(key, run)
+                runs[-1] = [first, words] + list(run)
+        polarity_sum, subjectivity_sum, assessments = 0, 0, 0
+        for run in runs:
+            for polarity, subjectivity in run[2]:
+                polarity_sum += polarity
+                subjectivity_sum += subjectivity
+                assessments += 1
+
+        return (assessments, polarity_sum, subjectivity_sum, float(sum(sentiments)), pos_sum, neg_sum,
+                neu_count, len(tokens), sum(part[3] for part in parts), sum(part[4] for part in parts))
+
+    def _document_scores(self, text: str, sentences: List[str] = None) -> Dict[str, float]:
+        """TextBlob and VADER scores of a text; resubmitted texts come from the cache whole"""
+        key = text_key(text)
+        scores = self.sentiment_cache.get(key)
+        if scores is None:
+            if sentences is None:
+                sentences = split_sentences(text)
+            scores = self._scores_from_components(self._sentence_components(sentences))
+            self.sentiment_cache.put(key, tuple(scores[field] for field in SCORE_FIELDS))
+            return scores
+        return dict(zip(SCORE_FIELDS, scores))
+    
+    @staticmethod
+    def _scores_from_components(components: Tuple) -> Dict[str, float]:
+        """TextBlob and VADER scores from one text's components (see batch_sentiment.COMPONENT_FIELDS)"""
+        assessments, polarity_sum, subjectivity_sum, valence_sum, pos_sum, neg_sum, neu_count, \
+            word_count, exclamations, questions = components
+        
+        scores = {
+            'textblob_polarity': polarity_sum / assessments if assessments else 0.0,
+            'textblob_subjectivity': subjectivity_sum / assessments if assessments else 0.0,
+            'vader_positive': 0.0,
+            'vader_negative': 0.0,
+            'vader_neutral': 0.0,
+            'vader_compound': 0.0
+        }
+        if not word_count:
+            return scores
+        
+        # Same punctuation emphasis and normalization as VADER's score_valence
+        punct_emph_amplifier = min(exclamations, 4) * 0.292
+        if questions > 1:
+            punct_emph_amplifier += questions * 0.18 if questions <= 3 else 0.96
+        if valence_sum > 0:
+            valence_sum += punct_emph_amplifier
+        elif valence_sum < 0:
+            valence_sum -= punct_emph_amplifier
+        if pos_sum > math.fabs(neg_sum):
+            pos_sum += punct_emph_amplifier
+        elif pos_sum < math.fabs(neg_sum):
+            neg_sum -= punct_emph_amplifier
+        
+        total = pos_sum + math.fabs(neg_sum) + neu_count
+        scores['vader_positive'] = round(math.fabs(pos_sum / total), 3)
+        scores['vader_negative'] = round(math.fabs(neg_sum / total), 3)
+        scores['vader_neutral'] = round(math.fabs(neu_count / total), 3)
+        scores['vader_compound'] = round(normalize(valence_sum), 4)
+        return scores
     
-    def analyze_sentiment(self, text: str) -> Dict[str, float]:
-        """Analyze sentiment using multiple methods"""
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Hit/miss statistics of the sentiment cache (sentence pieces and whole documents)"""
+        return self.sentiment_cache.stats()
+
+    def warmup(self) -> Dict[str, float]:
+        """Load everything the first request would otherwise pay for; returns ms per step"""
+        timings = {}
+        start = time.perf_counter()
+        sentiment = get_pattern_sentiment()
+        timings['textblob_import_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        # Pattern reads its lexicon XML lazily on the first call
+        start = time.perf_counter()
+        sentiment("I feel fine today.")
+        self.vader_analyzer.polarity_scores("I feel fine today.")
+        timings['lexicon_load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return timings
+
+    def _with_overall(self, sentiment_analysis: Dict[str, float]) -> Dict[str, float]:
+        """Add the overall label and score to TextBlob/VADER scores"""
+        # Determine overall sentiment
+        overall_sentiment = self._determine_overall_sentiment(sentiment_analysis)
+        sentiment_analysis['overall_sentiment'] = overall_sentiment
+        sentiment_analysis['overall_score'] = self._get_overall_score(sentiment_analysis)
+        
+        return sentiment_analysis
+    
+    def analyze_sentiment(self, text: str, sentences: List[str] = None) -> Dict[str, float]:
+        """Analyze sentiment using multiple methods; pass split_sentences(text) if it is already at hand"""
         try:
-            # TextBlob sentiment
-            blob = TextBlob(text)
-            textblob_polarity = blob.sentiment.polarity
-            textblob_subjectivity = blob.sentiment.subjectivity
-            
-            # VADER sentiment
-            vader_scores = self.vader_analyzer.polarity_scores(text)
-            
-            # Combine results
-            sentiment_analysis = {
-                'textblob_polarity': textblob_polarity,
-                'textblob_subjectivity': textblob_subjectivity,
-                'vader_positive': vader_scores['pos'],
-                'vader_negative': vader_scores['neg'],
-                'vader_neutral': vader_scores['neu'],
-                'vader_compound': vader_scores['compound']
-            }
-            
-            # Determine overall sentiment
-            overall_sentiment = self._determine_overall_sentiment(sentiment_analysis)
-            sentiment_analysis['overall_sentiment'] = overall_sentiment
-            sentiment_analysis['overall_score'] = self._get_overall_score(sentiment_analysis)
-            
-            return sentiment_analysis
+            # TextBlob + VADER, reusing the scored pieces of unchanged sentences
+            return self._with_overall(self._document_scores(text, sentences))
             
         except Exception as e:
             self.logger.error(f"Error analyzing sentiment: {e}")
             return {}
     
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """analyze_sentiment for many texts at once, scored by the vectorized batch engine"""
+        if self.batch_engine is None:
+            from batch_sentiment import BatchSentimentEngine
+            self.batch_engine = BatchSentimentEngine(self.vader_analyzer, get_pattern_sentiment())
+        return [self._with_overall(self._scores_from_components(components))
+                for components in self.batch_engine.text_components(texts)]
+    
     def _determine_overall_sentiment(self, sentiment_data: Dict[str, float]) -> str:
         """Determine overall sentiment from analysis results"""
         compound_score = sentiment_data.get('vader_compound', 0)
@@ -109,19 +373,11 @@ class TextSentimentAnalyzer:
     
     def detect_wellness_keywords(self, text: str) -> Dict[str, List[str]]:
         """Detect mental wellness keywords in text"""
-        text_lower = text.lower()
-        detected_keywords = {}
-        
-        for category, keywords in self.wellness_keywords.items():
-            found_keywords = []
-            for keyword in keywords:
-                if keyword in text_lower:
-                    found_keywords.append(keyword)
-            
-            if found_keywords:
-                detected_keywords[category] = found_keywords
-        
-        return detected_keywords
+        return self.keyword_matcher.detect(text)
+    
+    def find_wellness_keywords(self, text: str) -> Dict[str, List[Dict]]:
+        """Detect mental wellness keywords with their character positions"""
+        return self.keyword_matcher.find_by_category(text)
     
     def analyze_text_comprehensive(self, text: str) -> Dict:
         """Comprehensive text analysis combining sentiment and keyword detection"""
@@ -151,6 +407,20 @@ class TextSentimentAnalyzer:
             'original_text': text
         }
     
+    def combine_sentence_analyses(self, text: str, sentences: List[str],
+                                  sentence_keywords: List[Dict[str, List[str]]]) -> Dict:
+        """analyze_text_comprehensive-shaped result from split_sentences(text) and their keyword hits"""
+        if not text.strip():
+            return self.analyze_text_comprehensive(text)
+        
+        return {
+            'sentiment_analysis': self.analyze_sentiment(text, sentences),
+            'wellness_keywords': self.keyword_matcher.combine(sentence_keywords),
+            'text_length': len(text),
+            'word_count': len(text.split()),
+            'original_text': text
+        }
+    
     def get_wellness_summary(self, analysis_result: Dict) -> Dict[str, any]:
         """Get a summary of wellness indicators from analysis"""
         sentiment = analysis_result.get('sentiment_analysis', {})
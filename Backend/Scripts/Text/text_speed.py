@@ -1,7 +1,11 @@
+import os
 import time
 import json
 import sys
+import argparse
+from typing import Dict, List, Optional
 from test_sentiment import TextSentimentAnalyzer
+from sentence_cache import split_sentences
 
 class TypingSpeedAnalyzer:
     def __init__(self):
@@ -17,12 +21,20 @@ class TypingSpeedAnalyzer:
             return 0.0
         return round(word_count / minutes, 2)
 
+    def start_session(self, start_time: Optional[float] = None) -> "IncrementalTypingSession":
+        """Begin scoring a typing test incrementally while it is typed"""
+        return IncrementalTypingSession(self, start_time)
+
     def run_analysis(self, user_text: str, duration: float) -> dict:
         """Run typing + sentiment analysis and return results"""
+        sentiment_result = self.text_analyzer.analyze_text_comprehensive(user_text)
+        return self.build_result(user_text, duration, sentiment_result)
+
+    def build_result(self, user_text: str, duration: float, sentiment_result: Dict) -> dict:
+        """Assemble the run_analysis result from a comprehensive text analysis"""
         wpm = self.calculate_wpm(user_text, duration)
 
         # Sentiment analysis
-        sentiment_result = self.text_analyzer.analyze_text_comprehensive(user_text)
         wellness_summary = self.text_analyzer.get_wellness_summary(sentiment_result)
 
         # Calculate wellness score (0-100 scale)
@@ -81,7 +93,184 @@ class TypingSpeedAnalyzer:
         }
 
 
+class IncrementalTypingSession:
+    """Scores a typing test while it is being typed.
+
+    Text arrives as deltas with timestamps and is split into sentences once
+    per delta. Keyword hits are kept per sentence and only changed sentences
+    are re-scanned; the sentiment cache does the same for sentence scores,
+    so an update costs about one sentence of scoring and finish() after the
+    last update is nearly instant.
+    """
+
+    def __init__(self, analyzer: TypingSpeedAnalyzer, start_time: Optional[float] = None):
+        self.analyzer = analyzer
+        self.text = ""
+        self.start_time = start_time
+        self.last_time = start_time
+        self.last_seen = time.monotonic()  # worker clock, for idle eviction
+        self.sentences: List[str] = []  # split_sentences(self.text)
+        self.sentence_results: Dict[str, Dict[str, List[str]]] = {}  # sentence -> keyword hits
+
+    def apply_delta(self, position: Optional[int] = None, delete: int = 0, insert: str = "",
+                    timestamp: Optional[float] = None, text: Optional[str] = None) -> Dict:
+        """Apply an edit (or a full `text` snapshot) and return a live snapshot.
+
+        position defaults to the end of the text; `delete` characters are
+        removed at position before `insert` is added.
+        """
+        if text is not None:
+            self.text = text
+        else:
+            position = len(self.text) if position is None else max(0, min(position, len(self.text)))
+            self.text = self.text[:position] + insert + self.text[position + delete:]
+
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.start_time is None:
+            self.start_time = timestamp
+        self.last_time = timestamp
+
+        self._rescore()
+        return self.snapshot()
+
+    def _rescore(self) -> None:
+        self.sentences = split_sentences(self.text)
+        for sentence in self.sentences:
+            if sentence not in self.sentence_results:
+                self.sentence_results[sentence] = self.analyzer.text_analyzer.detect_wellness_keywords(sentence)
+        for sentence in set(self.sentence_results) - set(self.sentences):
+            del self.sentence_results[sentence]
+
+    def elapsed(self) -> float:
+        if self.start_time is None or self.last_time is None:
+            return 0.0
+        return max(0.0, self.last_time - self.start_time)
+
+    def _analysis(self) -> Dict:
+        results = [self.sentence_results[sentence] for sentence in self.sentences]
+        return self.analyzer.text_analyzer.combine_sentence_analyses(self.text, self.sentences, results)
+
+    def snapshot(self) -> Dict:
+        """Running WPM, sentiment and keyword hits for the text so far"""
+        analysis = self._analysis()
+        sentiment = analysis.get('sentiment_analysis', {})
+        return {
+            "words_per_minute": self.analyzer.calculate_wpm(self.text, self.elapsed()),
+            "elapsed": round(self.elapsed(), 2),
+            "total_words": len(self.text.split()),
+            "overall_sentiment": sentiment.get('overall_sentiment', 'neutral'),
+            "sentiment_score": sentiment.get('overall_score', 0),
+            "wellness_keywords": analysis.get('wellness_keywords', {})
+        }
+
+    def finish(self, duration: Optional[float] = None) -> dict:
+        """Final run_analysis-shaped result; duration defaults to the observed typing time"""
+        duration = self.elapsed() if duration is None else duration
+        return self.analyzer.build_result(self.text, duration, self._analysis())
+
+
+def evict_idle_sessions(sessions: Dict[str, IncrementalTypingSession], timeout: float) -> List[str]:
+    """Drop typing sessions with no update for `timeout` seconds (abandoned tabs, crashed clients)"""
+    now = time.monotonic()
+    idle = [session_id for session_id, session in sessions.items() if now - session.last_seen > timeout]
+    for session_id in idle:
+        del sessions[session_id]
+    return idle
+
+
+def run_worker(analyzer: TypingSpeedAnalyzer, stdin=sys.stdin, stdout=sys.stdout,
+               session_timeout: float = 300.0) -> None:
+    """Serve newline-delimited JSON requests until stdin closes.
+
+    Each request looks like {"id": ..., "text": ..., "duration": ...} and is
+    answered with exactly one line carrying the same "id", so the caller can
+    correlate responses while the analyzers stay loaded between requests.
+
+    Incremental sessions use "op": "session_update" (with "session_id" and a
+    delta: "position"/"delete"/"insert" or a full "text", plus "timestamp")
+    and "op": "session_finish" (optional "duration"). Sessions idle for longer
+    than session_timeout are dropped (checked as requests arrive).
+    """
+    sessions: Dict[str, IncrementalTypingSession] = {}
+    last_eviction = time.monotonic()
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        if time.monotonic() - last_eviction >= min(session_timeout, 5.0):
+            last_eviction = time.monotonic()
+            for session_id in evict_idle_sessions(sessions, session_timeout):
+                sys.stderr.write(f"Typing session {session_id} evicted after {session_timeout:.0f}s idle\n")
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            op = request.get("op", "analyze")
+            if op == "analyze":
+                result = analyzer.run_analysis(
+                    user_text=request.get("text", ""),
+                    duration=request.get("duration", 60)
+                )
+            elif op in ("session_update", "session_finish") and request.get("session_id") is None:
+                raise ValueError(f"{op} requires a session_id")
+            elif op == "session_update":
+                session_id = str(request["session_id"])
+                session = sessions.get(session_id)
+                if session is None:
+                    session = sessions[session_id] = analyzer.start_session()
+                session.last_seen = time.monotonic()
+                result = session.apply_delta(
+                    position=request.get("position"),
+                    delete=request.get("delete", 0),
+                    insert=request.get("insert", ""),
+                    timestamp=request.get("timestamp"),
+                    text=request.get("text")
+                )
+            elif op == "session_finish":
+                session_id = str(request["session_id"])
+                session = sessions.pop(session_id, None)
+                if session is None:
+                    raise ValueError(f"Unknown typing session {session_id!r}")
+                result = session.finish(request.get("duration"))
+            else:
+                raise ValueError(f"Unknown op {op!r}")
+            response = {"id": request_id, "success": True, "result": result}
+        except Exception as e:
+            sys.stderr.write(f"❌ Error in text_speed.py worker (id={request_id}): {str(e)}\n")
+            sys.stderr.flush()
+            response = {"id": request_id, "success": False, "error": str(e)}
+
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Typing speed and sentiment analysis (one JSON request on stdin)")
+    parser.add_argument("--worker", action="store_true",
+                        help="stay resident and answer newline-delimited JSON requests")
+    parser.add_argument("--session-timeout", type=float, default=300.0,
+                        help="seconds before an idle typing session is evicted (worker mode)")
+    args = parser.parse_args()
+
+    if args.worker:
+        # Long-lived mode: load the analyzers once and answer requests line by line
+        start = time.perf_counter()
+        analyzer = TypingSpeedAnalyzer()
+        startup = {"analyzer_init_ms": round((time.perf_counter() - start) * 1000, 1)}
+        startup.update(analyzer.text_analyzer.warmup())
+
+        # Readiness handshake: the supervisor only routes requests after this line
+        print(json.dumps({"type": "ready", "pid": os.getpid(), "startup": startup}), flush=True)
+        sys.stderr.write(f"✅ text_speed.py worker ready {json.dumps(startup)}\n")
+        sys.stderr.flush()
+        try:
+            run_worker(analyzer, session_timeout=args.session_timeout)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     try:
         # Read input from stdin
         input_text = sys.stdin.read()
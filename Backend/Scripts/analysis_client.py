@@ -0,0 +1,106 @@
+"""
+Analysis Client
+Command-line client for analysis_server.py, for local testing
+
+Usage:
+    python analysis_client.py text "I felt anxious before the exam" --duration 20
+    python analysis_client.py face photo1.jpg photo2.jpg --session demo --repeat 10
+    python analysis_client.py face photo.jpg --sessions 4 --report
+
+Face frames are sent over one WebSocket without waiting for earlier answers;
+every reply is matched to its request by correlation id, and the client fails
+if any id is missing, duplicated or unknown.
+
+Requires aiohttp (optional dependency: pip install aiohttp).
+"""
+
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import mimetypes
+from typing import Dict, List
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def data_url(path: str) -> str:
+    mime = mimetypes.guess_type(path)[0] or "image/jpeg"
+    with open(path, "rb") as f:
+        return f"data:{mime};base64," + base64.b64encode(f.read()).decode("ascii")
+
+
+async def analyze_text(base_url: str, text: str, duration: float) -> Dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/text", json={"id": "text-1", "text": text,
+                                                          "duration": duration}) as response:
+            return await response.json()
+
+
+async def analyze_faces(base_url: str, frames: List[str], sessions: int, session_prefix: str,
+                        report: bool) -> List[Dict]:
+    """Send every frame for every session at once; returns replies in request order"""
+    requests = []
+    for i, frame in enumerate(frames):
+        for s in range(sessions):
+            requests.append({"id": f"frame-{s}-{i}", "type": "frame",
+                             "session_id": f"{session_prefix}{s}", "frame": frame})
+    if report:
+        requests += [{"id": f"report-{s}", "type": "report", "session_id": f"{session_prefix}{s}"}
+                     for s in range(sessions)]
+
+    sent_at, replies = {}, {}
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"{base_url}/ws/face", max_msg_size=16 * 1024 * 1024) as ws:
+            for request in requests:
+                sent_at[request["id"]] = time.perf_counter()
+                await ws.send_str(json.dumps(request))
+            while len(replies) < len(requests):
+                reply = json.loads((await ws.receive()).data)
+                request_id = reply.get("id")
+                if request_id not in sent_at or request_id in replies:
+                    raise RuntimeError(f"Unexpected or duplicate reply id {request_id!r}")
+                reply["latency_ms"] = round((time.perf_counter() - sent_at[request_id]) * 1000, 1)
+                replies[request_id] = reply
+    return [replies[request["id"]] for request in requests]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local test client for analysis_server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    text_parser = commands.add_parser("text", help="POST one text for typing/sentiment analysis")
+    text_parser.add_argument("text")
+    text_parser.add_argument("--duration", type=float, default=60)
+
+    face_parser = commands.add_parser("face", help="send image files as frames over the WebSocket")
+    face_parser.add_argument("images", nargs="+")
+    face_parser.add_argument("--repeat", type=int, default=1, help="send the image list this many times")
+    face_parser.add_argument("--sessions", type=int, default=1, help="concurrent sessions sending the frames")
+    face_parser.add_argument("--session", default="client-", help="session id prefix")
+    face_parser.add_argument("--report", action="store_true", help="request each session's report at the end")
+    args = parser.parse_args()
+
+    if aiohttp is None:
+        print("ERROR: analysis_client.py needs aiohttp (pip install aiohttp)", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "text":
+        print(json.dumps(asyncio.run(analyze_text(args.url, args.text, args.duration)), indent=2))
+    else:
+        frames = [data_url(path) for path in args.images] * args.repeat
+        started = time.perf_counter()
+        replies = asyncio.run(analyze_faces(args.url, frames, args.sessions, args.session, args.report))
+        elapsed = time.perf_counter() - started
+        for reply in replies:
+            emotions = ", ".join(f"{e['emotion']} {e['confidence']:.0%}" for e in reply.get("emotions", []))
+            print(f"{reply['id']:<16} {reply.get('session_id', ''):<12} "
+                  f"{'ok' if reply.get('success') else 'FAILED':<7} {reply['latency_ms']:>8.1f} ms  "
+                  f"{emotions or reply.get('error', '') or reply.get('type', '')}")
+        print(f"{len(replies)} replies in {elapsed:.2f}s, all correlation ids matched", file=sys.stderr)
@@ -0,0 +1,306 @@
+"""
+Analysis Server
+Resident asyncio HTTP/WebSocket server for face emotion and typing/text analysis
+
+Usage:
+    python analysis_server.py --port 8765 [--backend onnx] [--batch-window-ms 5]
+
+Endpoints (every response echoes the request's correlation "id"; one is
+generated if the request has none):
+    GET  /health                -> {"status": "ok", "face": bool, "text": bool}
+    POST /text                  {"id", "text", "duration"} -> {"id", "success", "result"|"error"}
+    POST /face                  {"id", "session_id", "frame"} -> frame result
+    WS   /ws/face               JSON messages {"id", "type": "frame"|"report"|"close", "session_id", ...}
+                                answered one-for-one, possibly out of order across sessions
+
+EmotionAnalyzerAPI and TypingSpeedAnalyzer are loaded once at start-up and
+each is driven by its own single-thread executor (neither is thread-safe), so
+the event loop never blocks on inference. Face messages that arrive together,
+from any connection, are analysed as one batch through handle_messages().
+
+Requires aiohttp (optional dependency: pip install aiohttp).
+"""
+
+import os
+import sys
+import json
+import math
+import uuid
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "Face"))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "Text"))
+
+try:
+    from aiohttp import web, WSMsgType
+except ImportError:
+    web = None
+
+FACE_MESSAGE_TYPES = ("frame", "report", "close")
+BUSY_ERROR = "Face analysis queue is full, try again later"
+
+
+def correlation_id(payload, request=None):
+    request_id = payload.get("id") if isinstance(payload, dict) else None
+    if request_id is None and request is not None:
+        request_id = request.headers.get("X-Request-ID")
+    return request_id if request_id is not None else uuid.uuid4().hex
+
+
+async def read_json_object(request):
+    """(payload, None) for a JSON object body, else (None, 400 response carrying an id)"""
+    try:
+        payload = await request.json()
+        if not isinstance(payload, dict):
+            raise ValueError("expected a JSON object")
+    except ValueError as e:
+        return None, web.json_response({"id": correlation_id(None, request), "success": False,
+                                        "error": f"Invalid JSON: {e}"}, status=400)
+    return payload, None
+
+
+class FaceBatcher:
+    """Collects face protocol messages and analyses whatever is pending as one batch"""
+
+    def __init__(self, analyzer, executor, max_batch, window, max_queue=256):
+        self.analyzer = analyzer
+        self.executor = executor
+        self.max_batch = max_batch
+        self.window = window
+        # Bounded: when inference falls this far behind, new messages are refused rather than queued
+        self.pending = asyncio.Queue(maxsize=max_queue)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def submit(self, message):
+        """Validate and queue one protocol message; resolves to its output"""
+        from emotion_analysis import normalize_message
+
+        try:
+            message = normalize_message(message)
+        except ValueError as e:
+            return {"success": False, "error": f"Invalid message: {e}"}
+        if message["type"] not in FACE_MESSAGE_TYPES:
+            return {"success": False, "session_id": message["session_id"],
+                    "error": f"Unknown message type: {message['type']}"}
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.pending.put_nowait((message, future))
+        except asyncio.QueueFull:
+            return {"success": False, "session_id": message["session_id"], "error": BUSY_ERROR}
+        return await future
+
+    async def evict_idle_sessions(self):
+        evicted = await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                   self.analyzer.evict_idle_sessions)
+        for session_id in evicted:
+            print(f"Session {session_id} evicted after {self.analyzer.session_timeout:.0f}s idle",
+                  file=sys.stderr)
+
+    async def run(self):
+        from emotion_analysis import handle_messages
+
+        loop = asyncio.get_running_loop()
+        poll_interval = min(self.analyzer.session_timeout, 5.0)
+        last_eviction = loop.time()
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self.pending.get(), poll_interval)]
+            except asyncio.TimeoutError:
+                batch = []
+            if batch:
+                if self.window:
+                    await asyncio.sleep(self.window)
+                while len(batch) < self.max_batch and not self.pending.empty():
+                    batch.append(self.pending.get_nowait())
+
+                messages = [message for message, _ in batch]
+                try:
+                    # One output per message, in order (see handle_messages)
+                    outputs = await loop.run_in_executor(self.executor, handle_messages, self.analyzer, messages)
+                except Exception as e:
+                    outputs = [{"success": False, "error": str(e)}] * len(batch)
+                for (_, future), output in zip(batch, outputs):
+                    if not future.done():
+                        future.set_result(output)
+
+            # On a timer, not only when idle: under steady traffic abandoned sessions must still go
+            if loop.time() - last_eviction >= poll_interval:
+                last_eviction = loop.time()
+                await self.evict_idle_sessions()
+
+
+class AnalysisServer:
+    def __init__(self, face_kwargs, batch_window=0.0, load_face=True, load_text=True, max_queue=256):
+        self.face_kwargs = face_kwargs
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.load_face = load_face
+        self.load_text = load_text
+        self.face_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face")
+        self.text_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="text")
+        self.face = None
+        self.text = None
+
+    async def on_startup(self, app):
+        loop = asyncio.get_running_loop()
+        if self.load_text:
+            from text_speed import TypingSpeedAnalyzer
+
+            def load_text():
+                analyzer = TypingSpeedAnalyzer()
+                analyzer.text_analyzer.warmup()
+                return analyzer
+            self.text = await loop.run_in_executor(self.text_executor, load_text)
+        if self.load_face:
+            from emotion_analysis import EmotionAnalyzerAPI
+            analyzer = await loop.run_in_executor(self.face_executor,
+                                                  lambda: EmotionAnalyzerAPI(**self.face_kwargs))
+            self.face = FaceBatcher(analyzer, self.face_executor, analyzer.max_batch_size, self.batch_window,
+                                    self.max_queue)
+            self.face.start()
+        print(f"✅ Analysis server ready (face={self.face is not None}, text={self.text is not None})",
+              file=sys.stderr)
+
+    async def on_cleanup(self, app):
+        if self.face is not None and self.face.task is not None:
+            self.face.task.cancel()
+        self.face_executor.shutdown(wait=False)
+        self.text_executor.shutdown(wait=False)
+
+    # -------------------------------
+    # Handlers
+    # -------------------------------
+    async def health(self, request):
+        return web.json_response({"status": "ok", "face": self.face is not None, "text": self.text is not None})
+
+    async def text_analysis(self, request):
+        payload, error = await read_json_object(request)
+        if error is not None:
+            return error
+        request_id = correlation_id(payload, request)
+        if self.text is None:
+            return web.json_response({"id": request_id, "success": False,
+                                      "error": "Text analysis is not enabled"}, status=503)
+        text, duration = payload.get("text"), payload.get("duration")
+        if not text or duration is None:
+            return web.json_response({"id": request_id, "success": False,
+                                      "error": "Text and duration are required"}, status=400)
+        if not isinstance(text, str):
+            return web.json_response({"id": request_id, "success": False,
+                                      "error": "text must be a string"}, status=400)
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) \
+                or not math.isfinite(duration) or duration <= 0:
+            return web.json_response({"id": request_id, "success": False,
+                                      "error": f"duration must be a positive number of seconds, got {duration!r}"},
+                                     status=400)
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.text_executor, self.text.run_analysis, text, duration)
+        except Exception as e:
+            return web.json_response({"id": request_id, "success": False, "error": str(e)}, status=500)
+        return web.json_response({"id": request_id, "success": True, "result": result})
+
+    async def face_message(self, payload):
+        """Analyse one face protocol message; the reply carries the same id"""
+        request_id = correlation_id(payload)
+        if self.face is None:
+            return {"id": request_id, "success": False, "error": "Face analysis is not enabled"}
+        message = {key: value for key, value in payload.items() if key != "id"}
+        message.setdefault("type", "frame")
+        output = await self.face.submit(message)
+        return {"id": request_id, **output}
+
+    async def face_http(self, request):
+        payload, error = await read_json_object(request)
+        if error is not None:
+            return error
+        payload.setdefault("id", correlation_id(payload, request))
+        result = await self.face_message(payload)
+        if result.get("success", True):
+            status = 200
+        else:
+            status = 503 if result.get("error") == BUSY_ERROR else 400
+        return web.json_response(result, status=status)
+
+    async def face_websocket(self, request):
+        ws = web.WebSocketResponse(max_msg_size=16 * 1024 * 1024)
+        await ws.prepare(request)
+        in_flight = set()
+
+        async def answer(payload):
+            result = await self.face_message(payload)
+            if not ws.closed:
+                await ws.send_str(json.dumps(result))
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                if msg.type == WSMsgType.ERROR:
+                    break
+                continue
+            try:
+                payload = json.loads(msg.data)
+                if not isinstance(payload, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                await ws.send_str(json.dumps({"id": None, "success": False, "error": f"Invalid message: {e}"}))
+                continue
+            # Don't wait for the result: later frames can join the same batch
+            task = asyncio.get_running_loop().create_task(answer(payload))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        return ws
+
+    def make_app(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        app.router.add_get("/health", self.health)
+        app.router.add_post("/text", self.text_analysis)
+        app.router.add_post("/face", self.face_http)
+        app.router.add_get("/ws/face", self.face_websocket)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident HTTP/WebSocket server for face and text analysis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--backend", default="keras", help="face inference backend (keras/direct/tflite/onnx)")
+    parser.add_argument("--max-batch", type=int, default=32, help="maximum faces per inference call")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                        help="wait this long after a frame for more frames to batch together")
+    parser.add_argument("--session-timeout", type=float, default=300.0)
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="face messages waiting for analysis before new ones are refused")
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--detect-scale", type=float, default=1.0)
+    parser.add_argument("--stage-timings", action="store_true", help="include per-stage timings in frame results")
+    parser.add_argument("--dedup-threshold", type=float, default=0.0,
+                        help="reuse the previous result for near-duplicate frames (0 disables)")
+    parser.add_argument("--no-face", action="store_true", help="serve text analysis only")
+    parser.add_argument("--no-text", action="store_true", help="serve face analysis only")
+    args = parser.parse_args()
+
+    if web is None:
+        print("ERROR: analysis_server.py needs aiohttp (pip install aiohttp)", file=sys.stderr)
+        sys.exit(1)
+
+    server = AnalysisServer(
+        face_kwargs=dict(backend=args.backend, max_batch_size=args.max_batch,
+                         session_timeout=args.session_timeout, detect_every=args.detect_every,
+                         detect_scale=args.detect_scale, stage_timings=args.stage_timings,
+                         dedup_threshold=args.dedup_threshold),
+        batch_window=args.batch_window_ms / 1000.0,
+        load_face=not args.no_face,
+        load_text=not args.no_text,
+        max_queue=args.max_queue)
+    web.run_app(server.make_app(), host=args.host, port=args.port, print=lambda *a: None)
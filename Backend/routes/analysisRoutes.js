@@ -1,79 +1,99 @@
 const express = require("express");
-const { spawn } = require("child_process");
+const WorkerSupervisor = require("../utils/workerSupervisor");
 const router = express.Router();
 
-let pythonProcess = null;
-let latestAnalysis = null;
+const PYTHON = "D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/venv/Scripts/python.exe";
+const SCRIPTS_DIR = "D:/Other_Projects/Mental_Wellness_New/Backend/Scripts";
+// Pre-warmed standby workers per script, promoted instantly if the active one dies
+const WARM_SPARES = Number(process.env.ANALYSIS_WARM_SPARES || 1);
 
-// Helper to start Python process safely
-function startPythonProcess() {
-  pythonProcess = spawn(
-    "D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/venv/Scripts/python.exe",
-    ["D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/Face/emotion_analysis.py"]
-  );
+// One emotion_analysis.py process serves every session; results are kept per session
+const latestAnalysis = new Map();
+const pendingCloses = new Map();
 
-  pythonProcess.stdout.on("data", (data) => {
-    try {
-      const result = JSON.parse(data.toString());
-      latestAnalysis = result;
+// The frontend sends a session_id per recording. Clients that do not get one derived from
+// their user id or address, so users never share (or close) each other's session.
+function sessionIdFor(req) {
+  const sessionId = req.body?.session_id || req.query?.session_id;
+  if (sessionId) return String(sessionId);
+  const userId = req.body?.user_id || req.query?.user_id;
+  return userId && userId !== "anonymous" ? `user:${userId}` : `client:${req.ip}`;
+}
+
+const faceWorkers = new WorkerSupervisor({
+  name: "Emotion analysis",
+  command: PYTHON,
+  args: [`${SCRIPTS_DIR}/Face/emotion_analysis.py`],
+  options: { cwd: `${SCRIPTS_DIR}/Face` },
+  spares: WARM_SPARES,
+});
+
+// Batched frames come back as several JSON lines in one chunk
+faceWorkers.on("line", (result) => {
+  try {
+    const sessionId = result.session_id || "default";
+
+    // Session closed on request or evicted after going idle: forget it (a /stop_analysis
+    // waiting on the close receives the final report directly)
+    if (result.type === "closed" || result.type === "evicted") {
+      latestAnalysis.delete(sessionId);
+      (pendingCloses.get(sessionId) || []).forEach((resolve) => resolve(result.final_report));
+      pendingCloses.delete(sessionId);
+      console.log(`Session ${sessionId} ${result.type}`);
+      return;
+    }
+    if (result.type === "report") return;
+
+    latestAnalysis.set(sessionId, result);
+    
+    // Log the analysis result to console
+    if (result.success) {
+      console.log(`[${sessionId}] Frame #${result.frame_number}: ${result.faces_detected} face(s) detected`);
+      if (result.emotions && result.emotions.length > 0) {
+        result.emotions.forEach(emotion => {
+          console.log(`  - ${emotion.emotion} (${(emotion.confidence * 100).toFixed(1)}%)`);
+        });
+      }
       
-      // Log the analysis result to console
-      if (result.success) {
-        console.log(`Frame #${result.frame_number}: ${result.faces_detected} face(s) detected`);
-        if (result.emotions && result.emotions.length > 0) {
-          result.emotions.forEach(emotion => {
-            console.log(`  - ${emotion.emotion} (${(emotion.confidence * 100).toFixed(1)}%)`);
-          });
-        }
-        
-        // Log consolidated report every 10 frames
-        if (result.current_report && result.frame_number % 10 === 0) {
-          console.log("\n📊 Consolidated Report:");
-          console.log(`  Dominant Emotion: ${result.current_report.dominant_emotion}`);
-          console.log(`  Session Duration: ${result.current_report.session_duration}s`);
-          console.log(`  Total Faces: ${result.current_report.total_faces_detected}`);
-          console.log("  Emotion Breakdown:");
-          Object.entries(result.current_report.emotion_percentages).forEach(([emotion, percentage]) => {
-            console.log(`    ${emotion}: ${percentage}%`);
-          });
-          console.log("");
-        }
-      } else {
-        console.error(`Frame #${result.frame_number} failed:`, result.error);
+      // Log consolidated report every 10 frames
+      if (result.current_report && result.frame_number % 10 === 0) {
+        console.log("\n📊 Consolidated Report:");
+        console.log(`  Dominant Emotion: ${result.current_report.dominant_emotion}`);
+        console.log(`  Session Duration: ${result.current_report.session_duration}s`);
+        console.log(`  Total Faces: ${result.current_report.total_faces_detected}`);
+        console.log("  Emotion Breakdown:");
+        Object.entries(result.current_report.emotion_percentages).forEach(([emotion, percentage]) => {
+          console.log(`    ${emotion}: ${percentage}%`);
+        });
+        console.log("");
       }
-    } catch (err) {
-      console.error("Parsing Python output failed:", err);
-      console.error("Raw data:", data.toString());
+    } else {
+      console.error(`Frame #${result.frame_number} failed:`, result.error);
     }
-  });
-
-  pythonProcess.stderr.on("data", (data) => {
-    console.error("Python error:", data.toString());
-  });
+  } catch (err) {
+    console.error("Handling Python output failed:", err);
+    console.error("Raw data:", result);
+  }
+});
 
-  pythonProcess.on("exit", () => {
-    console.log("Python process exited");
-    pythonProcess = null;
-  });
-}
+faceWorkers.on("exit", () => {
+  // Sessions lived in the worker that exited; the promoted spare starts fresh
+  latestAnalysis.clear();
+  pendingCloses.forEach((waiters) => waiters.forEach((resolve) => resolve(null)));
+  pendingCloses.clear();
+});
 
 router.post("/face_emotion", (req, res, next) => {
   try {
     const { frame } = req.body;
     if (!frame) return res.status(400).json({ error: "No frame provided" });
 
-    if (!pythonProcess) startPythonProcess();
-
-    // Check if process started successfully
-    if (!pythonProcess) {
-      return res.status(500).json({ error: "Python process failed to start" });
-    }
-
-    // Send frame to Python
-    pythonProcess.stdin.write(frame + "\n");
+    // Send frame to Python, tagged with the session it belongs to
+    const sessionId = sessionIdFor(req);
+    faceWorkers.write(JSON.stringify({ type: "frame", session_id: sessionId, frame }));
 
     // Always respond
-    return res.json({ success: true, analysis: latestAnalysis });
+    return res.json({ success: true, analysis: latestAnalysis.get(sessionId) || null });
   } catch (err) {
     console.error("Route error:", err);
     next(err); // Pass to Express error handler
@@ -83,7 +103,8 @@ router.post("/face_emotion", (req, res, next) => {
 // Route to get the current analysis report
 router.get("/emotion_report", (req, res, next) => {
   try {
-    if (!latestAnalysis) {
+    const analysis = latestAnalysis.get(sessionIdFor(req));
+    if (!analysis) {
       return res.json({ 
         success: false, 
         message: "No analysis data available yet" 
@@ -91,7 +112,7 @@ router.get("/emotion_report", (req, res, next) => {
     }
 
     // Return the complete consolidated report
-    const report = latestAnalysis.current_report || latestAnalysis;
+    const report = analysis.current_report || analysis;
     
     // Build a comprehensive report with formatted details
     const comprehensiveReport = {
@@ -151,6 +172,44 @@ function generateFormattedReport(report) {
 }
 
 //text analysis 
+// A single long-lived text_speed.py worker answers newline-delimited JSON
+// requests, so TextBlob/VADER are loaded once instead of on every submission.
+let textRequestId = 0;
+const pendingTextRequests = new Map();
+
+const textWorkers = new WorkerSupervisor({
+  name: "Text analysis",
+  command: PYTHON,
+  args: [`${SCRIPTS_DIR}/Text/text_speed.py`, "--worker"],
+  options: { cwd: `${SCRIPTS_DIR}/Text` },
+  spares: WARM_SPARES,
+});
+
+textWorkers.on("line", (response) => {
+  const pending = pendingTextRequests.get(response.id);
+  if (!pending) return;
+  pendingTextRequests.delete(response.id);
+
+  if (response.success) {
+    console.log(`✅ Text analysis #${response.id} completed`);
+    pending.res.json({ success: true, analysis: response.result });
+  } else {
+    console.error(`❌ Text analysis #${response.id} failed:`, response.error);
+    pending.res.status(500).json({ success: false, error: response.error });
+  }
+});
+
+textWorkers.on("exit", () => {
+  pendingTextRequests.forEach(({ res }) => {
+    res.status(500).json({ success: false, error: "Python text worker exited unexpectedly" });
+  });
+  pendingTextRequests.clear();
+});
+
+// Warm both pools when the server starts, not on the first request
+faceWorkers.start();
+textWorkers.start();
+
 router.post("/text_analysis", (req, res, next) => {
   try {
     const { text, duration } = req.body;
@@ -161,66 +220,13 @@ router.post("/text_analysis", (req, res, next) => {
       return res.status(400).json({ error: "Text and duration are required" });
     }
 
-    const inputData = { text, duration };
-    console.log("🚀 Spawning Python process for text analysis...");
-    
-    const py = spawn(
-      "D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/venv/Scripts/python.exe",
-      ["D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/Text/text_speed.py"],
-      {
-        cwd: "D:/Other_Projects/Mental_Wellness_New/Backend/Scripts/Text",
-        env: { ...process.env, PYTHONUNBUFFERED: "1" }
-      }
-    );
-
-    let output = "";
-    let errorOutput = "";
-    
-    py.stdout.on("data", (data) => {
-      const chunk = data.toString();
-      console.log("📤 Python stdout:", chunk);
-      output += chunk;
-    });
-
-    py.stderr.on("data", (data) => {
-      const chunk = data.toString();
-      console.error("⚠️  Python stderr:", chunk);
-      errorOutput += chunk;
-    });
+    const id = ++textRequestId;
+    pendingTextRequests.set(id, { res });
 
-    py.on("close", (code) => {
-      console.log(`✅ Python process exited with code: ${code}`);
-      console.log("📊 Full output:", output);
-      
-      try {
-        const result = JSON.parse(output);
-        console.log("✅ Parsed result:", result);
-        res.json({ success: true, analysis: result });
-      } catch (err) {
-        console.error("❌ Failed to parse Python output:", err.message);
-        console.error("Raw output:", output);
-        res.status(500).json({ 
-          success: false, 
-          error: "Failed to parse Python output",
-          raw_output: output,
-          stderr: errorOutput
-        });
-      }
-    });
-
-    py.on("error", (err) => {
-      console.error("❌ Failed to spawn Python process:", err);
-      res.status(500).json({ 
-        success: false, 
-        error: "Failed to start Python process: " + err.message 
-      });
-    });
-
-    // Send JSON input to Python stdin
-    const jsonInput = JSON.stringify(inputData);
-    console.log("📨 Sending to Python stdin:", jsonInput);
-    py.stdin.write(jsonInput + "\n");
-    py.stdin.end();
+    // Send JSON request to the worker's stdin
+    const jsonInput = JSON.stringify({ id, text, duration });
+    console.log("📨 Sending to text worker:", jsonInput);
+    textWorkers.write(jsonInput);
     
   } catch (err) {
     console.error("❌ Route error:", err);
@@ -229,15 +235,25 @@ router.post("/text_analysis", (req, res, next) => {
 });
 
 // Route to stop the analysis and get final report
-router.post("/stop_analysis", (req, res, next) => {
+router.post("/stop_analysis", async (req, res, next) => {
   try {
-    if (pythonProcess) {
-      pythonProcess.kill();
-      pythonProcess = null;
-      console.log("🛑 Analysis stopped by user request");
+    const sessionId = sessionIdFor(req);
+    const analysis = latestAnalysis.get(sessionId);
+    let finalReport = null;
+    if (faceWorkers.active) {
+      // Close only this user's session; the model process stays warm for others
+      const closed = new Promise((resolve) => {
+        pendingCloses.set(sessionId, [...(pendingCloses.get(sessionId) || []), resolve]);
+        setTimeout(() => resolve(null), 5000);
+      });
+      faceWorkers.write(JSON.stringify({ type: "close", session_id: sessionId }));
+      finalReport = await closed;
+      console.log(`🛑 Analysis stopped by user request (session ${sessionId})`);
     }
 
-    const report = latestAnalysis?.current_report || latestAnalysis;
+    latestAnalysis.delete(sessionId);
+    // Fall back to the last frame's report if the worker did not answer in time
+    const report = finalReport || analysis?.current_report || analysis;
     
     // Build comprehensive final report
     const comprehensiveReport = report ? {
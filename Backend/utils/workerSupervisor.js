@@ -0,0 +1,147 @@
+const { spawn } = require("child_process");
+const readline = require("readline");
+const EventEmitter = require("events");
+
+/**
+ * Keeps Python analysis workers pre-warmed so a request never waits for
+ * TensorFlow / TextBlob imports and model loading.
+ *
+ * One worker is active and receives requests; `spares` more are started in
+ * the background and sit idle after their readiness handshake (a
+ * {"type": "ready"} line on stdout). When the active worker exits, a ready
+ * spare is promoted immediately and a replacement spare is spawned.
+ *
+ * Events:
+ *   "line"   (message, worker)  every parsed stdout line from the active worker
+ *   "ready"  (worker)           a worker finished its handshake
+ *   "exit"   (worker, code)     the active worker exited (pending work is lost)
+ */
+class WorkerSupervisor extends EventEmitter {
+  constructor({ name, command, args = [], options = {}, spares = 1, readyTimeoutMs = 120000 }) {
+    super();
+    this.name = name;
+    this.command = command;
+    this.args = args;
+    this.options = options;
+    this.spares = spares;
+    this.readyTimeoutMs = readyTimeoutMs;
+    this.active = null;
+    this.standby = [];
+    this.stopped = false;
+  }
+
+  start() {
+    this.stopped = false;
+    if (!this.active) this.active = this._spawn();
+    while (this.standby.length < this.spares) this.standby.push(this._spawn());
+    return this;
+  }
+
+  // The worker requests should go to. Writes to a worker that is still
+  // starting are buffered by the pipe and answered once it is ready.
+  acquire() {
+    if (!this.active) this.start();
+    return this.active;
+  }
+
+  // Resolves with the active worker once it has completed its handshake
+  whenReady() {
+    const worker = this.acquire();
+    if (worker.ready) return Promise.resolve(worker);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.off("ready", onReady);
+        reject(new Error(`${this.name} worker not ready after ${this.readyTimeoutMs} ms`));
+      }, this.readyTimeoutMs);
+      const onReady = (readyWorker) => {
+        if (readyWorker !== this.active) return;
+        clearTimeout(timer);
+        this.off("ready", onReady);
+        resolve(readyWorker);
+      };
+      this.on("ready", onReady);
+    });
+  }
+
+  write(line) {
+    const worker = this.acquire();
+    worker.process.stdin.write(line + "\n");
+    return worker;
+  }
+
+  stop() {
+    this.stopped = true;
+    [this.active, ...this.standby].forEach((worker) => worker && worker.process.kill());
+    this.active = null;
+    this.standby = [];
+  }
+
+  _spawn() {
+    const worker = { process: null, ready: false, exited: false, startedAt: Date.now(), startup: null };
+    worker.process = spawn(this.command, this.args, {
+      ...this.options,
+      env: { ...process.env, PYTHONUNBUFFERED: "1", ...(this.options.env || {}) },
+    });
+
+    const lines = readline.createInterface({ input: worker.process.stdout });
+    lines.on("line", (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (err) {
+        console.error(`${this.name} worker printed non-JSON output:`, line);
+        return;
+      }
+      if (!worker.ready && message.type === "ready") {
+        worker.ready = true;
+        worker.startup = message.startup || null;
+        console.log(`${this.name} worker ${worker.process.pid} ready in ${Date.now() - worker.startedAt} ms`);
+        this.emit("ready", worker);
+        return;
+      }
+      if (worker === this.active) this.emit("line", message, worker);
+    });
+
+    worker.process.stderr.on("data", (data) => {
+      console.error(`${this.name} worker stderr:`, data.toString());
+    });
+
+    // EPIPE when writing to a worker that is exiting (or never started) must not crash Node;
+    // the worker's "exit" (or spawn "error") below takes care of replacing it
+    worker.process.stdin.on("error", (err) => {
+      console.error(`${this.name} worker ${worker.process.pid} stdin error:`, err.message);
+    });
+
+    // A worker that failed to spawn (e.g. ENOENT) never emits "exit": treat it as exited
+    worker.process.on("error", (err) => {
+      console.error(`Failed to spawn ${this.name} worker:`, err);
+      this._onExit(worker, null);
+    });
+
+    worker.process.on("exit", (code) => this._onExit(worker, code));
+    return worker;
+  }
+
+  _onExit(worker, code) {
+    // "error" and "exit" can both fire for the same process
+    if (worker.exited) return;
+    worker.exited = true;
+    this.standby = this.standby.filter((spare) => spare !== worker);
+    if (worker === this.active) {
+      console.log(`${this.name} worker exited with code: ${code}`);
+      // Prefer a spare that has already finished warming up
+      const next = this.standby.find((spare) => spare.ready) || this.standby[0] || null;
+      this.standby = this.standby.filter((spare) => spare !== next);
+      this.active = next;
+      this.emit("exit", worker, code);
+    }
+    if (this.stopped) return;
+    // Keep the pool topped up; back off briefly if workers die during start-up
+    const delay = worker.ready ? 0 : 1000;
+    setTimeout(() => {
+      if (!this.stopped) this.start();
+    }, delay);
+  }
+}
+
+module.exports = WorkerSupervisor;
@@ -24,6 +24,7 @@ const AnalysisPage = () => {
   const frameIntervalRef = useRef(null); // For live frame streaming
   const recordingTimeoutRef = useRef(null); // Ensures hard stop at 60s
   const isStartingRef = useRef(false); // Prevent double-start
+  const faceSessionRef = useRef(null); // Face analysis session id, new for each recording
   const [typingStartTime, setTypingStartTime] = useState(null);
 
 
@@ -129,7 +130,8 @@ const AnalysisPage = () => {
    */
   const fetchEmotionReport = async () => {
     try {
-      const response = await fetch("http://localhost:8000/api/analysis/emotion_report");
+      const sessionId = encodeURIComponent(faceSessionRef.current || "");
+      const response = await fetch(`http://localhost:8000/api/analysis/emotion_report?session_id=${sessionId}`);
       if (!response.ok) throw new Error("Failed to fetch emotion report");
       const data = await response.json();
       return data;
@@ -251,7 +253,11 @@ const AnalysisPage = () => {
       await fetch("http://localhost:8000/api/analysis/face_emotion", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ frame: base64Frame, user_id: userInfo.id || "anonymous" }),
+        body: JSON.stringify({
+          frame: base64Frame,
+          session_id: faceSessionRef.current,
+          user_id: userInfo.id || "anonymous",
+        }),
       });
     } catch (err) {
       console.error("Error sending frame:", err);
@@ -387,8 +393,9 @@ const AnalysisPage = () => {
         stopVideoRecording();
       }, 60000);
 
-      // Start frame streaming
+      // Start frame streaming under a fresh session, so recordings (and users) never share one
       console.log("🎬 Starting frame streaming");
+      faceSessionRef.current = crypto.randomUUID();
       startFrameStreaming();
       console.log("✅ Recording started successfully!");
       